@@ -1,43 +1,113 @@
+import click
 from flask import Flask
+from flask.cli import with_appcontext
 from config import Config
 from extensions import db
-import models as models
+from cache_util import cache
+from compresion_util import compresion
+from metricas_util import metricas
+from replicas_util import configurar_replicas
 from flask_migrate import Migrate
 from flask_cors import CORS
 
-# Importar Blueprints
-from main.routes import main
-from mapa.routes import mapa
+# Importar este módulo no conecta a la base de datos ni importa las rutas:
+# create_app() sólo configura (la primera conexión es la de la primera
+# consulta) y el esquema se crea con 'flask --app app crear-esquema' o
+# con las migraciones ('flask --app app db upgrade').
 
-def create_app():
+def create_app(config=None):
+    """
+    Factory de la app. 'config' (dict) sobrescribe valores de Config,
+    p. ej. {'SQLALCHEMY_DATABASE_URI': ...} en pruebas y benchmarks.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     #instalas cors pip install flask-cors
     # Habilitar CORS
     CORS(app, resources={r"/*": {"origins": "*"}})
 
-    # Inicializar base de datos
+    # Inicializar base de datos (escritor + réplicas de lectura, si hay)
+    configurar_replicas(app)
     db.init_app(app)
 
+    # Caché de respuestas (se invalida con VersionDatos al recargar los scrapers)
+    cache.init_app(app)
+
+    # Métricas por endpoint en /metrics (antes que la compresión: mide los bytes enviados)
+    metricas.init_app(app)
+
+    # Compresión br/zstd/gzip negociada por Accept-Encoding
+    compresion.init_app(app)
+
     migrate = Migrate(app, db)
-    # Ejecutar esto: pip install Flask-Migrate
-    # Habilitar el venv38 y luego:
-    # flask db init
-    # flask db migrate -m "Agregada tabla CandidatoRegional y corregido timestamp"
-    #flask db upgrade
+    # Migraciones en migrations/ (pip install Flask-Migrate):
+    # flask --app app db upgrade
+    # Una base creada antes con create_all() se marca primero con
+    # flask --app app db stamp 407d8ed2e197 (esquema inicial)
+    # Tras cambiar models.py: flask --app app db migrate -m "..."
 
-    # Registrar Blueprints
+    # Registrar Blueprints (se importan aquí: importar app.py no carga las rutas)
+    from main.routes import main
+    from mapa.routes import mapa
     app.register_blueprint(main)
     app.register_blueprint(mapa, url_prefix="/mapa")
 
-    # Crear tablas si no existen
-    with app.app_context():db.create_all()
+    app.cli.add_command(crear_esquema)
+    app.cli.add_command(completar_hashes)
+    from bundle_util import generar_bundle
+    app.cli.add_command(generar_bundle)
+    from carga_csv_util import cargar_padron
+    app.cli.add_command(cargar_padron)
+
+    # Opcional (desarrollo): crear las tablas que falten al arrancar
+    if app.config.get('CREAR_ESQUEMA_AL_INICIAR'):
+        with app.app_context():db.create_all(bind_key=None)
 
     return app
 
 
-app = create_app()
+@click.command('crear-esquema')
+@with_appcontext
+def crear_esquema():
+    """Crea las tablas que no existan (db.create_all) en el escritor; las réplicas se copian de él."""
+    import models  # Registra los modelos en db.metadata
+    db.create_all(bind_key=None)
+    click.echo(f"Esquema listo: {len(db.metadata.tables)} tablas.")
+
+
+@click.command('completar-hashes')
+@with_appcontext
+def completar_hashes():
+    """Calcula los hashes de logos y fotos cargados antes de logo_hash / imagen_hash."""
+    from models import completar_hashes as completar
+    from bundle_util import regenerar_bundle
+    resultado = completar()
+    for conjunto, filas in resultado.items():
+        click.echo(f"{conjunto}: {filas} hashes calculados.")
+    if any(resultado.values()):
+        regenerar_bundle()  # El bundle publica los hashes de las imágenes
+
+
+_app = None
+
+
+def obtener_app():
+    """La app del proceso, creada en la primera llamada."""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(nombre):
+    # 'app' se crea al primer acceso (gunicorn app:app, asgi.py), no al importar
+    if nombre == 'app':
+        return obtener_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 
 #acepta conección de cualquier parte
-if __name__ == "__main__":app.run(host='0.0.0.0', port=5000, debug=True)
+if __name__ == "__main__":obtener_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,12 @@
+"""
+Modo ASGI de la app (mismas rutas y respuestas que app.py):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+Los listados de lectura se atienden con vistas asíncronas (ver
+asgi_util.py); el resto de rutas con la app de Flask.
+"""
+from app import app as app_wsgi
+from asgi_util import ServidorAsgi
+
+app = ServidorAsgi(app_wsgi)
@@ -0,0 +1,193 @@
+import itertools
+import sys
+from io import BytesIO
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # Sólo hace falta para servir en modo ASGI
+    WSGIMiddleware = None
+
+# --- Configuración (valores por defecto; se sobrescriben en config.py) ---
+HILOS_WSGI = 10   # Hilos para las rutas que siguen siendo síncronas
+# Driver asíncrono que reemplaza al de SQLALCHEMY_DATABASE_URI, por dialecto
+DRIVERS_ASYNC = {
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+# ---------------------
+
+# endpoint de Flask -> (vista asíncrona, parámetros que la delegan en la síncrona)
+vistas_async = {}
+
+
+def vista_async(endpoint, delegar_si=()):
+    """
+    Registra la versión asíncrona de la vista 'endpoint' (p. ej.
+    'main.get_partidos'). Corre dentro del contexto de petición de Flask
+    (request, url_for, jsonify...), recibe una AsyncSession y los
+    argumentos de la URL, y devuelve lo mismo que la vista síncrona.
+
+    Si la URL trae alguno de los parámetros 'delegar_si' (p. ej. 'stream',
+    o filtros que usan índices en memoria), responde la vista síncrona.
+    """
+    def decorador(vista):
+        vistas_async[endpoint] = (vista, tuple(delegar_si))
+        return vista
+    return decorador
+
+
+def url_async(uri):
+    """La misma URI con el driver asíncrono de su dialecto (pymysql -> aiomysql)."""
+    url = make_url(uri)
+    driver = DRIVERS_ASYNC.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() in ('aiomysql', 'asyncmy', 'aiosqlite', 'asyncpg'):
+        return url
+    return url.set(drivername=driver)
+
+
+def _environ(scope):
+    """Entorno WSGI de una petición ASGI sin cuerpo (GET/HEAD)."""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    raiz = scope.get('root_path', '')
+    ruta = scope['path']
+    if raiz and ruta.startswith(raiz):
+        ruta = ruta[len(raiz):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': raiz.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': ruta.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for nombre, valor in scope.get('headers', ()):
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        clave = nombre if nombre in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{nombre}'
+        valor = valor.decode('latin-1')
+        environ[clave] = f'{environ[clave]},{valor}' if clave in environ else valor
+    return environ
+
+
+class ServidorAsgi:
+    """
+    Aplicación ASGI sobre la app de Flask.
+
+    Las vistas registradas con @vista_async (los listados de lectura de
+    'main' y 'mapa') se atienden en el event loop con el engine asíncrono
+    de SQLAlchemy (aiomysql): mientras esperan a MySQL no ocupan un hilo.
+    El resto de rutas pasa a la app WSGI en un pool de ASGI_HILOS_WSGI
+    hilos (a2wsgi).
+
+    Las vistas asíncronas comparten con la app los before/after_request
+    (CORS, métricas, compresión), la caché de respuestas y los
+    serializadores, así que responden lo mismo que las síncronas. Las
+    lecturas van a SQLALCHEMY_REPLICAS (por turnos) si hay réplicas.
+    """
+
+    def __init__(self, app):
+        if WSGIMiddleware is None:
+            raise RuntimeError("El modo ASGI requiere a2wsgi (pip install a2wsgi)")
+        app.config.setdefault('ASGI_DATABASE_URI', None)
+        app.config.setdefault('ASGI_HILOS_WSGI', HILOS_WSGI)
+
+        self.app = app
+        opciones = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        uri = app.config['ASGI_DATABASE_URI'] or app.config['SQLALCHEMY_DATABASE_URI']
+        self.escritor = create_async_engine(url_async(uri), **opciones)
+        opciones_replicas = dict(opciones, **(app.config.get('SQLALCHEMY_REPLICAS_OPCIONES') or {}))
+        self.replicas = [
+            create_async_engine(url_async(replica), **opciones_replicas)
+            for replica in app.config.get('SQLALCHEMY_REPLICAS') or []
+        ]
+        self._turno = itertools.count()
+        self.wsgi = WSGIMiddleware(app, workers=app.config['ASGI_HILOS_WSGI'])
+        app.extensions['asgi'] = self
+
+    def _engine_lectura(self):
+        if not self.replicas:
+            return self.escritor
+        return self.replicas[next(self._turno) % len(self.replicas)]
+
+    def _vista(self, environ):
+        """(vista, argumentos) si la petición la atiende una vista asíncrona; si no, None."""
+        adaptador = self.app.url_map.bind_to_environ(environ, server_name=self.app.config['SERVER_NAME'])
+        try:
+            endpoint, argumentos = adaptador.match()
+        except HTTPException:
+            return None  # 404, 405 y redirecciones las resuelve Flask
+        registrada = vistas_async.get(endpoint)
+        if registrada is None:
+            return None
+        vista, delegar_si = registrada
+        consulta = environ['QUERY_STRING']
+        if delegar_si and consulta:
+            parametros = {par.split('=', 1)[0] for par in consulta.split('&')}
+            if parametros.intersection(delegar_si):
+                return None
+        return vista, argumentos
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            environ = _environ(scope)
+            encontrada = self._vista(environ)
+            if encontrada is not None:
+                with self.app.request_context(environ):
+                    response = await self._despachar(*encontrada)
+                return await self._enviar(response, scope, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def _despachar(self, vista, argumentos):
+        """Como Flask.full_dispatch_request(), con la vista en el event loop."""
+        app = self.app
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    async with AsyncSession(self._engine_lectura(), expire_on_commit=False) as sesion:
+                        rv = await vista(sesion, **argumentos)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.process_response(app.make_response(rv))
+        except Exception as e:
+            return app.make_response(app.handle_exception(e))
+
+    async def _enviar(self, response, scope, send):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()],
+        })
+        cuerpo = b'' if scope['method'] == 'HEAD' else response.get_data()
+        await send({'type': 'http.response.body', 'body': cuerpo})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                await self.cerrar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def cerrar(self):
+        """Cierra los pools de conexiones asíncronos."""
+        for engine in (self.escritor, *self.replicas):
+            await engine.dispose()
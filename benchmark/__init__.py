@@ -0,0 +1,48 @@
+"""
+Benchmark de carga de las APIs con datos sintéticos a escala nacional.
+
+    python -m benchmark generar --uri sqlite:///instance/bench.db
+    python -m benchmark medir --uri sqlite:///instance/bench.db --salida resultados.json
+    python -m benchmark medir --uri ... --hilos 8 --comparar resultados.json
+    python -m benchmark concurrencia --uri ... --niveles 1 8 32 128
+    python -m benchmark arranque --uri ...
+
+'generar' llena el esquema de models.py (generador.py) y 'medir' recorre
+los endpoints con el cliente de pruebas de Flask y, con --hilos, con
+varios hilos HTTP contra un servidor local (carga.py). 'concurrencia'
+compara el servidor WSGI con el ASGI (asgi.py) con cada vez más clientes
+y 'arranque' mide el arranque en frío y desde fork (arranque.py).
+"""
+import os
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
+from sqlalchemy.ext.compiler import compiles
+from app import create_app
+from extensions import db
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@compiles(MEDIUMBLOB, 'sqlite')
+def _mediumblob_sqlite(tipo, compilador, **kw):
+    # Permite crear el esquema en un archivo SQLite para pruebas locales
+    return 'BLOB'
+
+
+def configuracion(uri=None, cache_activa=True, **config):
+    """Valores que sobrescriben Config para apuntar a 'uri'."""
+    if uri:
+        config.setdefault('SQLALCHEMY_DATABASE_URI', uri)
+        if uri.startswith('sqlite'):
+            # Las opciones de pool de MySQL no aplican a SQLite
+            config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if not cache_activa:
+        config.setdefault('CACHE_BACKEND', None)
+    return config
+
+
+def crear_app(uri=None, cache_activa=True, **config):
+    """create_app() apuntando a 'uri', con el esquema creado."""
+    app = create_app(configuracion(uri, cache_activa, **config))
+    with app.app_context():
+        db.create_all(bind_key=None)  # Sólo el escritor: las réplicas se copian de él
+    return app
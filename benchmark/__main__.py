@@ -0,0 +1,105 @@
+import argparse
+import json
+import sys
+from benchmark import crear_app, configuracion
+from benchmark import generador, carga, arranque
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Datos sintéticos y benchmark de las APIs.')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_gen = sub.add_parser('generar', help='Llena la base de datos con datos sintéticos (borra los existentes).')
+    p_gen.add_argument('--uri', help='URI de SQLAlchemy (por defecto la de config.py)')
+    p_gen.add_argument('--semilla', type=int, default=0)
+    p_gen.add_argument('--partidos', type=int, default=generador.PARTIDOS)
+    p_gen.add_argument('--candidatos', type=int, default=generador.CANDIDATOS)
+    p_gen.add_argument('--centros', type=int, default=generador.CENTROS)
+    p_gen.add_argument('--mesas-por-centro', type=int, nargs=2, default=generador.MESAS_POR_CENTRO, metavar=('MIN', 'MAX'))
+    p_gen.add_argument('--usuarios', type=int, default=generador.USUARIOS)
+    p_gen.add_argument('--bytes-logo', type=int, default=generador.BYTES_LOGO)
+    p_gen.add_argument('--bytes-foto', type=int, default=generador.BYTES_FOTO)
+
+    p_med = sub.add_parser('medir', help='Mide los endpoints y guarda el informe en JSON.')
+    p_med.add_argument('--uri', help='URI de SQLAlchemy (por defecto la de config.py)')
+    p_med.add_argument('--repeticiones', type=int, default=50, help='Peticiones por escenario con el cliente de Flask')
+    p_med.add_argument('--hilos', type=int, default=0, help='Hilos de la carga HTTP concurrente (0 = sólo cliente de Flask)')
+    p_med.add_argument('--peticiones', type=int, default=200, help='Peticiones por escenario en la carga HTTP')
+    p_med.add_argument('--sin-cache', action='store_true', help='Desactiva la caché de respuestas')
+    p_med.add_argument('--accept-encoding', help="Cabecera Accept-Encoding (p. ej. 'gzip, br')")
+    p_med.add_argument('--escenarios', nargs='*', help='Nombres de escenarios (por defecto todos)')
+    p_med.add_argument('--salida', help='Archivo JSON del informe')
+    p_med.add_argument('--comparar', help='Informe JSON anterior: sale con código 1 si hay regresiones')
+
+    p_con = sub.add_parser('concurrencia', help='Compara el servidor WSGI (app.py) con el ASGI (asgi.py) según los clientes concurrentes.')
+    p_con.add_argument('--uri', help='URI de SQLAlchemy (por defecto la de config.py)')
+    p_con.add_argument('--niveles', type=int, nargs='+', default=carga.NIVELES_CONCURRENCIA, help='Clientes concurrentes a probar')
+    p_con.add_argument('--peticiones', type=int, default=200, help='Peticiones por escenario y nivel')
+    p_con.add_argument('--hilos-wsgi', type=int, default=carga.HILOS_WSGI, help='Hilos del servidor WSGI (0 = uno por petición)')
+    p_con.add_argument('--latencia-bd-ms', type=float, default=0, help='Espera simulada por sentencia SQL (sólo SQLite)')
+    p_con.add_argument('--sin-cache', action='store_true', help='Desactiva la caché de respuestas')
+    p_con.add_argument('--accept-encoding', help="Cabecera Accept-Encoding (p. ej. 'gzip, br')")
+    p_con.add_argument('--escenarios', nargs='*', default=carga.ESCENARIOS_CONCURRENCIA, help='Nombres de escenarios')
+    p_con.add_argument('--salida', help='Archivo JSON del informe')
+
+    p_arr = sub.add_parser('arranque', help='Mide el arranque en frío y desde fork hasta la primera petición.')
+    p_arr.add_argument('--uri', help='URI de SQLAlchemy (por defecto la de config.py)')
+    p_arr.add_argument('--url', default=arranque.URL, help='Ruta de la primera petición')
+    p_arr.add_argument('--repeticiones', type=int, default=5, help='Procesos nuevos a medir (el doble de forks)')
+    p_arr.add_argument('--salida', help='Archivo JSON del informe')
+
+    args = parser.parse_args(argv)
+
+    if args.comando == 'generar':
+        app = crear_app(args.uri)
+        with app.app_context():
+            filas = generador.generar(
+                semilla=args.semilla, partidos=args.partidos, candidatos=args.candidatos, centros=args.centros,
+                mesas_por_centro=tuple(args.mesas_por_centro), usuarios=args.usuarios, bytes_logo=args.bytes_logo, bytes_foto=args.bytes_foto,
+            )
+        print(f"Datos generados: {filas}")
+        return 0
+
+    if args.comando == 'arranque':
+        app = crear_app(args.uri)  # Crea el esquema antes de medir
+        informe = arranque.medir(app, configuracion(args.uri), args.url, args.repeticiones)
+        if args.salida:
+            carga.guardar(informe, args.salida)
+            print(f"Informe guardado en {args.salida}")
+        return 0
+
+    app = crear_app(args.uri, cache_activa=not args.sin_cache)
+    escenarios = carga.ESCENARIOS
+    if args.escenarios:
+        escenarios = [e for e in escenarios if e[0] in args.escenarios]
+    cabeceras = {'Accept-Encoding': args.accept_encoding} if args.accept_encoding else None
+
+    if args.comando == 'concurrencia':
+        informe = carga.escalar(app, escenarios, args.niveles, args.peticiones, cabeceras,
+                                args.hilos_wsgi or None, args.latencia_bd_ms)
+        informe['parametros']['cache'] = not args.sin_cache
+        if args.salida:
+            carga.guardar(informe, args.salida)
+            print(f"Informe guardado en {args.salida}")
+        return 0
+
+    informe = carga.ejecutar(app, escenarios, args.repeticiones, args.hilos, args.peticiones, cabeceras)
+    informe['parametros']['cache'] = not args.sin_cache
+    if args.salida:
+        carga.guardar(informe, args.salida)
+        print(f"Informe guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        regresiones = carga.comparar(anterior, informe)
+        for regresion in regresiones:
+            print(f"REGRESIÓN: {regresion}")
+        if regresiones:
+            return 1
+        print(f"Sin regresiones respecto a {args.comparar}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
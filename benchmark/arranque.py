@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmark import RAIZ
+
+URL = '/api/partidos'
+
+# Se ejecuta en un intérprete nuevo: tiempos de import, factory y primera petición
+_SCRIPT_FRIO = '''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+aplicacion = app.create_app(json.loads(sys.argv[1]))
+t2 = time.perf_counter()
+response = aplicacion.test_client().get(sys.argv[2])
+response.get_data()
+t3 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "factory_ms": (t2 - t1) * 1000,
+                  "primera_peticion_ms": (t3 - t2) * 1000, "estado": response.status_code}))
+'''
+
+
+def _mediana(valores):
+    return round(float(np.median(valores)), 1) if valores else None
+
+
+def arranque_en_frio(config, url=URL, repeticiones=5):
+    """
+    Arranca 'repeticiones' intérpretes nuevos y mide: import de app.py,
+    create_app() y la primera petición a 'url' (conexión, consultas y
+    carga de las rutas), además del tiempo total del proceso.
+    """
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = subprocess.run(
+            [sys.executable, '-c', _SCRIPT_FRIO, json.dumps(config), url],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout
+        total = (time.perf_counter() - inicio) * 1000
+        muestra = json.loads(salida.strip().splitlines()[-1])
+        muestra['proceso_ms'] = total
+        muestras.append(muestra)
+    claves = ('import_ms', 'factory_ms', 'primera_peticion_ms', 'proceso_ms')
+    resumen = {clave: _mediana([m[clave] for m in muestras]) for clave in claves}
+    resumen['estado'] = muestras[-1]['estado']
+    return resumen
+
+
+def fork_a_primera_peticion(app, url=URL, repeticiones=10):
+    """
+    Como un servidor con la app precargada (gunicorn --preload): cada hijo
+    recién creado con fork() atiende una petición. Mide desde el fork
+    hasta tener la respuesta, y lo mismo para una segunda petición.
+    """
+    from extensions import db
+
+    with app.app_context():
+        # Los hijos no deben heredar conexiones abiertas del pool
+        for engine in db.engines.values():
+            engine.dispose()
+
+    primeras, segundas = [], []
+    for _ in range(repeticiones):
+        lectura, escritura = os.pipe()
+        inicio = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(lectura)
+            cliente = app.test_client()
+            cliente.get(url).get_data()
+            t1 = time.perf_counter()
+            cliente.get(url).get_data()
+            t2 = time.perf_counter()
+            os.write(escritura, json.dumps([t1, t2]).encode())
+            os._exit(0)
+        os.close(escritura)
+        with os.fdopen(lectura) as f:
+            t1, t2 = json.loads(f.read())
+        os.waitpid(pid, 0)
+        # perf_counter usa el mismo reloj monotónico en padre e hijo
+        primeras.append((t1 - inicio) * 1000)
+        segundas.append((t2 - t1) * 1000)
+    return {
+        'fork_a_primera_ms': _mediana(primeras),
+        'segunda_peticion_ms': _mediana(segundas),
+    }
+
+
+def medir(app, config, url=URL, repeticiones=5):
+    """Informe de arranque: en frío (procesos nuevos) y desde fork."""
+    frio = arranque_en_frio(config, url, repeticiones)
+    print(f"En frío ({url}): import {frio['import_ms']} ms, create_app {frio['factory_ms']} ms, "
+          f"primera petición {frio['primera_peticion_ms']} ms, proceso completo {frio['proceso_ms']} ms")
+    fork = fork_a_primera_peticion(app, url, repeticiones * 2)
+    print(f"Desde fork: primera petición {fork['fork_a_primera_ms']} ms, "
+          f"segunda {fork['segunda_peticion_ms']} ms")
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'url': url,
+        'frio': frio,
+        'fork': fork,
+    }
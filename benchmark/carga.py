@@ -0,0 +1,349 @@
+import json
+import logging
+import multiprocessing
+import platform
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import requests
+import uvicorn
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from werkzeug.serving import BaseWSGIServer, make_server
+from asgi_util import ServidorAsgi
+from extensions import db
+from models import PartidosPoliticos, Candidatos, CentrosVotacion, Mesas, Usuarios
+
+# Endpoints medidos: (nombre, URL). Cubren el listado completo, la
+# paginación, los filtros y las rutas del mapa.
+ESCENARIOS = (
+    ('index', '/'),
+    ('partidos', '/api/partidos'),
+    ('candidatos', '/api/candidatos'),
+    ('candidatos_pagina', '/api/candidatos?limit=100'),
+    ('candidatos_region', '/api/candidatos?region=Lima'),
+    ('candidatos_busqueda', '/api/candidatos?q=quispe'),
+    ('centros', '/mapa/api/centros'),
+    ('centros_distrito', '/mapa/api/centros?distrito=Surquillo'),
+    ('clusters', '/mapa/api/clusters?z=6&bbox=-82,-19,-68,0'),
+    ('cercanos', '/mapa/api/centros/cercanos?lat=-12.1&lng=-77.03&k=10'),
+    ('mesas_pagina', '/api/mesas?limit=100'),
+    ('mesa', '/api/mesas/000001'),
+    ('donde_voto', '/mapa/api/donde-voto?dni=10000001'),
+    ('facetas', '/api/facetas'),
+    ('facetas_region', '/api/facetas?region=Lima'),
+)
+# Escenarios de la prueba de concurrencia WSGI vs ASGI (los que tienen vista asíncrona)
+ESCENARIOS_CONCURRENCIA = ('partidos', 'candidatos_pagina', 'candidatos_region', 'centros_distrito')
+NIVELES_CONCURRENCIA = (1, 4, 16, 64)
+HILOS_WSGI = 10             # Hilos del servidor WSGI (como gunicorn --threads)
+PERCENTILES = (50, 95, 99)
+UMBRAL_REGRESION = 0.20   # +20 % de p50 o p95 respecto a la corrida anterior
+
+
+@contextmanager
+def contar_sql(app):
+    """
+    Cuenta las sentencias SQL ejecutadas en el proceso (todos los engines,
+    también los asíncronos del modo ASGI).
+    """
+    contador = {'sentencias': 0}
+    lock = threading.Lock()
+
+    def al_ejecutar(*args):
+        with lock:
+            contador['sentencias'] += 1
+
+    event.listen(Engine, 'before_cursor_execute', al_ejecutar)
+    try:
+        yield contador
+    finally:
+        event.remove(Engine, 'before_cursor_execute', al_ejecutar)
+
+
+def resumir(tiempos, total_bytes, segundos, sentencias, errores):
+    """Latencias en ms (percentiles), peticiones/s, bytes y consultas por petición."""
+    tiempos = np.asarray(tiempos) * 1000
+    n = len(tiempos)
+    resumen = {f'p{p}_ms': round(float(np.percentile(tiempos, p)), 3) for p in PERCENTILES} if n else {}
+    resumen.update({
+        'peticiones': n,
+        'errores': errores,
+        'media_ms': round(float(tiempos.mean()), 3) if n else None,
+        'peticiones_por_segundo': round(n / segundos, 1) if segundos else None,
+        'bytes_por_respuesta': round(total_bytes / n) if n else None,
+        'sql_por_peticion': round(sentencias / n, 2) if n and sentencias is not None else None,
+    })
+    return resumen
+
+
+def medir_cliente(app, url, repeticiones=50, calentamiento=3, cabeceras=None):
+    """
+    Mide 'url' con el cliente de pruebas de Flask, una petición tras otra
+    (sin red: aísla el costo de la ruta, la BD y la serialización).
+    """
+    cliente = app.test_client()
+    for _ in range(calentamiento):
+        cliente.get(url, headers=cabeceras)
+
+    tiempos = []
+    total_bytes = errores = 0
+    with contar_sql(app) as contador:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            response = cliente.get(url, headers=cabeceras)
+            datos = response.get_data()
+            tiempos.append(time.perf_counter() - t0)
+            total_bytes += len(datos)
+            errores += response.status_code >= 400
+        segundos = time.perf_counter() - inicio
+    return resumir(tiempos, total_bytes, segundos, contador['sentencias'], errores)
+
+
+@contextmanager
+def servidor_local(app):
+    """Servidor WSGI con hilos en un puerto libre de 127.0.0.1."""
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # Sin una línea por petición
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f'http://127.0.0.1:{servidor.server_port}'
+    finally:
+        servidor.shutdown()
+
+
+def simular_latencia_bd(ms):
+    """
+    Espera 'ms' en cada sentencia de SQLite, en el hilo del driver (el de
+    la petición en WSGI, el de aiosqlite en ASGI): simula la ida y vuelta
+    a un MySQL remoto. Afecta a las conexiones que se abran después.
+    """
+    segundos = ms / 1000
+
+    def al_conectar(dbapi_conn, registro):
+        conexion = getattr(dbapi_conn, 'driver_connection', dbapi_conn)
+        conexion = getattr(conexion, '_conn', conexion)  # aiosqlite -> sqlite3
+        if hasattr(conexion, 'set_trace_callback'):
+            conexion.set_trace_callback(lambda sentencia: time.sleep(segundos))
+
+    event.listen(Engine, 'connect', al_conectar)
+
+
+class ServidorWsgiPool(BaseWSGIServer):
+    """
+    werkzeug con un número fijo de hilos, como un servidor WSGI de
+    producción: con todos ocupados, las peticiones esperan en cola.
+    HTTP/1.0 (una conexión por petición) para no retener un hilo por cliente.
+    """
+
+    def __init__(self, app, fd, hilos):
+        super().__init__('127.0.0.1', 0, app, fd=fd)
+        self._pool = ThreadPoolExecutor(max_workers=hilos)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def _servir(app, modo, sock, hilos_wsgi):
+    if modo == 'asgi':
+        uvicorn.Server(uvicorn.Config(ServidorAsgi(app), log_level='warning')).run(sockets=[sock])
+        return
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if hilos_wsgi:
+        ServidorWsgiPool(app, sock.fileno(), hilos_wsgi).serve_forever()
+    else:
+        make_server('127.0.0.1', 0, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+@contextmanager
+def servidor_proceso(app, modo, hilos_wsgi=HILOS_WSGI):
+    """
+    Sirve la app en un proceso aparte (fork), para que los hilos del
+    cliente no compitan por el GIL con el servidor. 'wsgi': werkzeug con
+    'hilos_wsgi' hilos (None = un hilo por petición, como app.run);
+    'asgi': uvicorn con ServidorAsgi (como asgi.py).
+    """
+    # IPPROTO_TCP explícito: asyncio sólo activa TCP_NODELAY en sockets TCP
+    # declarados como tales (con proto 0 cada respuesta espera ~40 ms de Nagle)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(1024)
+    with app.app_context():
+        # El proceso hijo no debe heredar conexiones abiertas del pool
+        for engine in db.engines.values():
+            engine.dispose()
+    proceso = multiprocessing.get_context('fork').Process(target=_servir, args=(app, modo, sock, hilos_wsgi), daemon=True)
+    proceso.start()
+    try:
+        yield f'http://127.0.0.1:{sock.getsockname()[1]}'
+    finally:
+        proceso.terminate()
+        proceso.join()
+        sock.close()
+
+
+def medir_http(base_url, url, hilos=8, peticiones=200, cabeceras=None, app=None):
+    """
+    Carga concurrente: 'hilos' clientes HTTP (una sesión keep-alive por
+    hilo) reparten 'peticiones'. Con 'app' cuenta además las consultas SQL.
+    """
+    local = threading.local()
+
+    def una(_):
+        sesion = getattr(local, 'sesion', None)
+        if sesion is None:
+            sesion = local.sesion = requests.Session()
+        t0 = time.perf_counter()
+        response = sesion.get(base_url + url, headers=cabeceras)
+        contenido = response.content
+        return time.perf_counter() - t0, len(contenido), response.status_code >= 400
+
+    def correr():
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(una, range(hilos)))  # Calentamiento: abre las conexiones
+            inicio = time.perf_counter()
+            resultados = list(pool.map(una, range(peticiones)))
+            return resultados, time.perf_counter() - inicio
+
+    if app is not None:
+        with contar_sql(app) as contador:
+            resultados, segundos = correr()
+        sentencias = contador['sentencias']
+    else:
+        resultados, segundos = correr()
+        sentencias = None
+
+    tiempos = [r[0] for r in resultados]
+    return resumir(tiempos, sum(r[1] for r in resultados), segundos, sentencias, sum(r[2] for r in resultados))
+
+
+def contar_filas(app):
+    """Tamaño del conjunto de datos medido (para comparar corridas equivalentes)."""
+    with app.app_context():
+        return {
+            modelo.__tablename__: db.session.query(func.count()).select_from(modelo).scalar()
+            for modelo in (PartidosPoliticos, Candidatos, CentrosVotacion, Mesas, Usuarios)
+        }
+
+
+def _commit_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(app, escenarios=ESCENARIOS, repeticiones=50, hilos=0, peticiones=200, cabeceras=None):
+    """
+    Corre todos los escenarios y devuelve el informe (dict serializable a
+    JSON). 'hilos' > 0 añade la medición HTTP concurrente.
+    """
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit_git(),
+        'python': platform.python_version(),
+        'parametros': {'repeticiones': repeticiones, 'hilos': hilos, 'peticiones': peticiones, 'cabeceras': cabeceras},
+        'filas': contar_filas(app),
+        'resultados': {},
+    }
+    for nombre, url in escenarios:
+        resultado = {'url': url, 'cliente': medir_cliente(app, url, repeticiones, cabeceras=cabeceras)}
+        informe['resultados'][nombre] = resultado
+        _imprimir(nombre, 'cliente', resultado['cliente'])
+
+    if hilos:
+        with servidor_local(app) as base_url:
+            for nombre, url in escenarios:
+                resultado = medir_http(base_url, url, hilos, peticiones, cabeceras=cabeceras, app=app)
+                informe['resultados'][nombre]['http'] = resultado
+                _imprimir(nombre, f'http x{hilos}', resultado)
+    return informe
+
+
+def escalar(app, escenarios, niveles=NIVELES_CONCURRENCIA, peticiones=200, cabeceras=None,
+            hilos_wsgi=HILOS_WSGI, latencia_bd_ms=0):
+    """
+    La misma carga HTTP contra el servidor WSGI y contra el ASGI, subiendo
+    el número de clientes concurrentes. Devuelve el informe con
+    {escenario: {'wsgi'|'asgi': {clientes: resumen}}} en 'resultados'.
+
+    Con SQLite local las consultas no esperan red y ambos modos quedan
+    limitados por la CPU; 'latencia_bd_ms' simula la espera a MySQL, que
+    es lo que el modo ASGI deja de pagar con un hilo por petición.
+    """
+    if latencia_bd_ms:
+        simular_latencia_bd(latencia_bd_ms)
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit_git(),
+        'python': platform.python_version(),
+        'parametros': {'niveles': list(niveles), 'peticiones': peticiones, 'cabeceras': cabeceras,
+                       'hilos_wsgi': hilos_wsgi, 'latencia_bd_ms': latencia_bd_ms},
+        'filas': contar_filas(app),
+        'resultados': {nombre: {'wsgi': {}, 'asgi': {}} for nombre, _ in escenarios},
+    }
+    for modo in ('wsgi', 'asgi'):
+        with servidor_proceso(app, modo, hilos_wsgi) as base_url:
+            for nombre, url in escenarios:
+                for clientes in niveles:
+                    resultado = medir_http(base_url, url, clientes, max(peticiones, clientes * 4), cabeceras)
+                    informe['resultados'][nombre][modo][str(clientes)] = resultado
+                    _imprimir(nombre, f'{modo} x{clientes}', resultado)
+
+    print(f"\n{'escenario':20} {'clientes':>8}  {'wsgi req/s':>10} {'asgi req/s':>10}  {'wsgi p95':>9} {'asgi p95':>9}")
+    for nombre, modos in informe['resultados'].items():
+        for clientes in map(str, niveles):
+            w, a = modos['wsgi'][clientes], modos['asgi'][clientes]
+            print(f"{nombre:20} {clientes:>8}  {w['peticiones_por_segundo'] or 0:10.1f} {a['peticiones_por_segundo'] or 0:10.1f}  "
+                  f"{w.get('p95_ms', 0):9.2f} {a.get('p95_ms', 0):9.2f}")
+    return informe
+
+
+def _imprimir(nombre, modo, r):
+    print(f"{nombre:20} {modo:8} p50 {r.get('p50_ms', 0):8.2f} ms  p95 {r.get('p95_ms', 0):8.2f} ms  "
+          f"p99 {r.get('p99_ms', 0):8.2f} ms  {r['peticiones_por_segundo'] or 0:8.1f} req/s  "
+          f"{(r['bytes_por_respuesta'] or 0) / 1024:9.1f} KB  SQL {r['sql_por_peticion']}"
+          + (f"  errores {r['errores']}" if r['errores'] else ''))
+
+
+def guardar(informe, ruta):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+
+
+def comparar(anterior, actual, umbral=UMBRAL_REGRESION):
+    """
+    Compara dos informes escenario por escenario. Devuelve la lista de
+    regresiones: p50/p95 más lentos que 'umbral', o más consultas SQL.
+    """
+    regresiones = []
+    for nombre, resultado in actual['resultados'].items():
+        previo = anterior.get('resultados', {}).get(nombre)
+        if previo is None:
+            continue
+        for modo in ('cliente', 'http'):
+            a, b = previo.get(modo), resultado.get(modo)
+            if not a or not b:
+                continue
+            for metrica in ('p50_ms', 'p95_ms'):
+                if a.get(metrica) and b.get(metrica) and b[metrica] > a[metrica] * (1 + umbral):
+                    regresiones.append(f"{nombre} [{modo}] {metrica}: {a[metrica]} -> {b[metrica]} "
+                                       f"(+{(b[metrica] / a[metrica] - 1):.0%})")
+            if a.get('sql_por_peticion') is not None and (b.get('sql_por_peticion') or 0) > a['sql_por_peticion']:
+                regresiones.append(f"{nombre} [{modo}] sql_por_peticion: {a['sql_por_peticion']} -> {b['sql_por_peticion']}")
+    return regresiones
@@ -0,0 +1,165 @@
+import random
+import uuid
+from datetime import date
+from extensions import db
+from models import (
+    PartidosPoliticos, Candidatos, CentrosVotacion, Mesas, Usuarios,
+    VariantesImagen, Eliminaciones, incrementar_version
+)
+from media_util import hash_blob
+from carga_masiva_util import insertar_en_lotes
+
+# --- Volúmenes por defecto (orden de magnitud de una elección nacional) ---
+PARTIDOS = 40
+CANDIDATOS = 20000
+CENTROS = 12000
+MESAS_POR_CENTRO = (1, 14)      # Mínimo y máximo; ~90 000 mesas en total
+USUARIOS = 100000               # Electores con mesa (DNI 10000000, 10000001, ...)
+DNI_INICIAL = 10000000
+BYTES_LOGO = 16 * 1024
+BYTES_FOTO = 4 * 1024
+# ---------------------
+
+REGIONES = (
+    'Amazonas', 'Áncash', 'Apurímac', 'Arequipa', 'Ayacucho', 'Cajamarca', 'Callao',
+    'Cusco', 'Huancavelica', 'Huánuco', 'Ica', 'Junín', 'La Libertad', 'Lambayeque',
+    'Lima', 'Loreto', 'Madre de Dios', 'Moquegua', 'Pasco', 'Piura', 'Puno',
+    'San Martín', 'Tacna', 'Tumbes', 'Ucayali',
+)
+DISTRITOS = (
+    'Surquillo', 'Miraflores', 'San Isidro', 'Lince', 'Barranco', 'Chorrillos', 'Surco',
+    'San Borja', 'La Molina', 'Ate', 'Comas', 'Los Olivos', 'San Juan de Lurigancho',
+    'Villa El Salvador', 'Breña', 'Jesús María', 'Pueblo Libre', 'Magdalena', 'Rímac',
+    'Independencia', 'Carabayllo', 'Puente Piedra', 'Villa María del Triunfo', 'Callao',
+)
+NOMBRES = ('Juan', 'María', 'José', 'Rosa', 'Luis', 'Carmen', 'Carlos', 'Ana', 'Jorge', 'Elena',
+           'Miguel', 'Lucía', 'Pedro', 'Julia', 'César', 'Teresa', 'Víctor', 'Gloria')
+APELLIDOS = ('Quispe', 'Flores', 'Sánchez', 'Rodríguez', 'García', 'Mamani', 'Huamán', 'Chávez',
+             'Ramírez', 'Torres', 'Vargas', 'Mendoza', 'Castillo', 'Rojas', 'Gutiérrez', 'Díaz')
+IDEOLOGIAS = ('Izquierda', 'CentroIzquierda', 'Centro', 'CentroDerecha', 'Derecha', 'Otro', 'Desconocido')
+CARGOS = ('Gobernador', 'Alcalde')
+
+# Cabeceras reales para que sniff_content_type reconozca las imágenes
+_CABECERA_PNG = b'\x89PNG\r\n\x1a\n'
+_CABECERA_JPEG = b'\xff\xd8\xff\xe0'
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _blob(rng, cabecera, tamano):
+    if not tamano:
+        return None
+    return cabecera + rng.randbytes(max(tamano - len(cabecera), 0))
+
+
+def _nombre(rng):
+    return f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+
+
+def limpiar():
+    """Vacía las tablas que llena el generador (hijas primero)."""
+    for modelo in (VariantesImagen, Eliminaciones, Usuarios, Candidatos, Mesas, CentrosVotacion, PartidosPoliticos):
+        db.session.query(modelo).delete(synchronize_session=False)
+
+
+def generar(semilla=0, partidos=PARTIDOS, candidatos=CANDIDATOS, centros=CENTROS,
+            mesas_por_centro=MESAS_POR_CENTRO, usuarios=USUARIOS, bytes_logo=BYTES_LOGO, bytes_foto=BYTES_FOTO):
+    """
+    Llena el esquema con datos sintéticos reproducibles (misma semilla,
+    mismos datos) e incrementa VersionDatos para invalidar cachés e
+    índices. Borra antes los datos existentes. Confirma la transacción y
+    devuelve el número de filas por tabla.
+
+    Los BLOBs son bytes aleatorios con cabecera PNG / JPEG: sirven para
+    medir transferencia y almacenamiento, no se pueden decodificar.
+    """
+    rng = random.Random(semilla)
+    limpiar()
+
+    filas_partidos = []
+    for i in range(partidos):
+        logo = _blob(rng, _CABECERA_PNG, bytes_logo)
+        nombre = f'Partido {rng.choice(APELLIDOS)} {i + 1}'
+        filas_partidos.append({
+            'id_partido': _uuid(rng),
+            'jne_id_simbolo': i + 1,
+            'nombre_partido': nombre,
+            'siglas': ''.join(p[0] for p in nombre.split()).upper() + str(i + 1),
+            'fecha_inscripcion': date(rng.randint(1990, 2024), rng.randint(1, 12), rng.randint(1, 28)),
+            'ideologia': rng.choice(IDEOLOGIAS),
+            'logo_blob': logo,
+            'logo_hash': hash_blob(logo),
+            'direccion_legal': f'Av. {rng.choice(APELLIDOS)} {rng.randint(100, 3999)}, Lima',
+            'telefonos': f'01-{rng.randint(2000000, 7999999)}',
+            'sitio_web': f'https://partido{i + 1}.pe',
+            'email_contacto': f'contacto@partido{i + 1}.pe',
+            'personero_titular': _nombre(rng),
+            'personero_alterno': _nombre(rng),
+        })
+    insertar_en_lotes(PartidosPoliticos, filas_partidos, tam_lote=100)
+    ids_partidos = [p['id_partido'] for p in filas_partidos]
+
+    filas_candidatos = []
+    for i in range(candidatos):
+        foto = _blob(rng, _CABECERA_JPEG, bytes_foto)
+        region = rng.choice(REGIONES)
+        filas_candidatos.append({
+            'id': i + 1,
+            'nombre_completo': _nombre(rng),
+            'tipo_candidatura': rng.choice(CARGOS),
+            'perfil_url': f'https://eleccionesperu.pe/candidato/{i + 1}',
+            'imagen_blob': foto,
+            'imagen_hash': hash_blob(foto),
+            'partido_politico_id': rng.choice(ids_partidos) if ids_partidos else None,
+            'region': region,
+            'biografia': f'Candidato por {region}. ' + ' '.join(rng.choice(APELLIDOS) for _ in range(rng.randint(10, 60))),
+        })
+    insertar_en_lotes(Candidatos, filas_candidatos, tam_lote=500)
+    del filas_candidatos
+
+    filas_centros = []
+    filas_mesas = []
+    for i in range(centros):
+        id_centro = _uuid(rng)
+        filas_centros.append({
+            'id_centro': id_centro,
+            'nombre': f'I.E. N° {rng.randint(1, 9999)} {rng.choice(APELLIDOS)}',
+            'direccion': f'Jr. {rng.choice(APELLIDOS)} {rng.randint(100, 2999)}',
+            'distrito': rng.choice(DISTRITOS),
+            # Caja aproximada del territorio peruano
+            'latitud': round(rng.uniform(-18.3, -0.1), 8),
+            'longitud': round(rng.uniform(-81.3, -68.7), 8),
+        })
+        for j in range(rng.randint(*mesas_por_centro)):
+            filas_mesas.append({
+                'numero_mesa': f'{len(filas_mesas) + 1:06d}',
+                'id_centro': id_centro,
+                'ubicacion_detalle': f'Pabellón {chr(65 + j // 6)}, aula {j % 6 + 1}',
+            })
+    insertar_en_lotes(CentrosVotacion, filas_centros)
+    insertar_en_lotes(Mesas, filas_mesas)
+
+    # Electores repartidos al azar entre las mesas (id_mesa autoincremental)
+    ids_mesas = [id_mesa for (id_mesa,) in db.session.query(Mesas.id_mesa)]
+    filas_usuarios = [{
+        'id_usuario': _uuid(rng),
+        'dni': str(DNI_INICIAL + i),
+        'rol': 'MiembroMesa' if rng.random() < 0.02 else 'Elector',
+        'id_mesa': rng.choice(ids_mesas),
+    } for i in range(usuarios if ids_mesas else 0)]
+    insertar_en_lotes(Usuarios, filas_usuarios)
+
+    incrementar_version('partidos', 'candidatos', 'centros')
+    db.session.commit()
+    return {
+        'partidos': partidos,
+        'candidatos': candidatos,
+        'centros': centros,
+        'mesas': len(filas_mesas),
+        'usuarios': len(filas_usuarios),
+        'bytes_logo': bytes_logo,
+        'bytes_foto': bytes_foto,
+        'semilla': semilla,
+    }
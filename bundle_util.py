@@ -0,0 +1,287 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import click
+from flask import current_app, jsonify, request, send_file
+from flask.cli import with_appcontext
+from extensions import db
+from models import PartidosPoliticos, Candidatos, CentrosVotacion, Mesas, leer_versiones, ahora_utc
+from serializacion_util import Serializador, dumps
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin 'pip install brotli' sólo se sirve gzip
+    brotli = None
+
+# --- Configuración ---
+FORMATO_BUNDLE = 1        # Se incrementa si cambia la estructura del JSON
+CONJUNTOS = ('partidos', 'candidatos', 'centros')
+NIVEL_GZIP = 9
+CALIDAD_BROTLI = 11
+BUNDLES_CONSERVADOS = 2   # El vigente y el anterior (descargas en curso)
+# ---------------------
+
+EXTENSIONES = {'identity': '.json', 'gzip': '.json.gz', 'br': '.json.br'}
+
+# Columnas de cada tabla del bundle. Las imágenes se referencian por hash:
+# la app arma /api/media/<tipo>/<id>?v=<hash> y sólo baja las que no tiene.
+TABLAS = {
+    'partidos': (
+        PartidosPoliticos.id_partido,
+        PartidosPoliticos.jne_id_simbolo,
+        PartidosPoliticos.nombre_partido,
+        PartidosPoliticos.siglas,
+        PartidosPoliticos.fecha_inscripcion,
+        PartidosPoliticos.ideologia,
+        PartidosPoliticos.direccion_legal,
+        PartidosPoliticos.telefonos,
+        PartidosPoliticos.sitio_web,
+        PartidosPoliticos.email_contacto,
+        PartidosPoliticos.personero_titular,
+        PartidosPoliticos.personero_alterno,
+        PartidosPoliticos.logo_hash,
+    ),
+    'candidatos': (
+        Candidatos.id,
+        Candidatos.nombre_completo,
+        Candidatos.tipo_candidatura,
+        Candidatos.region,
+        Candidatos.partido_politico_id,
+        Candidatos.perfil_url,
+        Candidatos.biografia,
+        Candidatos.imagen_hash,
+    ),
+    'centros': (
+        CentrosVotacion.id_centro,
+        CentrosVotacion.nombre,
+        CentrosVotacion.direccion,
+        CentrosVotacion.distrito,
+        CentrosVotacion.latitud,
+        CentrosVotacion.longitud,
+    ),
+    'mesas': (
+        Mesas.id_mesa,
+        Mesas.numero_mesa,
+        Mesas.id_centro,
+        Mesas.ubicacion_detalle,
+    ),
+}
+
+_lock = threading.Lock()
+
+
+def _carpeta():
+    carpeta = current_app.config.get('BUNDLE_DIR') or os.path.join(current_app.instance_path, 'bundle')
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def firma_actual(versiones=None):
+    """Identificador del bundle según las versiones de los datos."""
+    versiones = versiones if versiones is not None else leer_versiones()
+    return f'f{FORMATO_BUNDLE}-' + '-'.join(f'{c}{versiones.get(c, 0)}' for c in CONJUNTOS)
+
+
+def token_sync(fecha):
+    """Token de /api/sync: instante UTC con microsegundos."""
+    return fecha.isoformat(timespec='microseconds')
+
+
+_serializadores = {}
+
+
+def tabla_columnar(columnas, *filtros):
+    """Tabla en formato columnar: nombres una vez y filas como listas."""
+    firma = tuple(str(c) for c in columnas)
+    serializador = _serializadores.get(firma)
+    if serializador is None:
+        serializador = _serializadores[firma] = Serializador.de_columnas(columnas)
+    pk = columnas[0]
+    filas = db.session.query(*columnas).filter(*filtros).order_by(pk).yield_per(1000)
+    return serializador.columnar(filas)
+
+
+def _escribir_atomico(ruta, datos):
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _mtime(ruta):
+    try:
+        return os.path.getmtime(ruta)
+    except FileNotFoundError:  # Borrado por _limpiar (otro proceso) tras el glob
+        return -1
+
+
+def _metas(carpeta):
+    """Rutas .meta de los bundles completos, del más reciente al más antiguo."""
+    return sorted(glob.glob(os.path.join(carpeta, 'bundle-*.meta')), key=_mtime, reverse=True)
+
+
+def _limpiar(carpeta):
+    for meta in _metas(carpeta)[BUNDLES_CONSERVADOS:]:
+        base = meta[:-len('.meta')]
+        for ruta in [meta] + [base + ext for ext in EXTENSIONES.values()]:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+
+def construir_bundle(versiones=None):
+    """
+    Genera el snapshot de partidos, candidatos, centros y mesas para la
+    versión actual de los datos: JSON compacto y sus copias gzip (y brotli
+    si está instalado), escritos de forma atómica. Devuelve sus metadatos.
+    Lo llaman los scrapers y las cargas tras confirmar (regenerar_bundle),
+    nunca una petición: es caro (gzip 9 y brotli 11 sobre todas las tablas).
+    """
+    versiones = versiones if versiones is not None else leer_versiones()
+    firma = firma_actual(versiones)
+    carpeta = _carpeta()
+    base = os.path.join(carpeta, f'bundle-{firma}')
+
+    with _lock:
+        if os.path.exists(base + '.meta'):
+            return _leer_meta(base)
+
+        inicio = ahora_utc()
+        contenido = {
+            'formato': FORMATO_BUNDLE,
+            'version': firma,
+            'versiones': {c: versiones.get(c, 0) for c in CONJUNTOS},
+            'generado': inicio.isoformat() + 'Z',
+            # Punto de partida para /api/sync?since=... tras instalar el bundle
+            'token_sync': token_sync(inicio),
+            'media': {
+                'partido': '/api/media/partido/{id}?v={hash}',
+                'candidato': '/api/media/candidato/{id}?v={hash}',
+            },
+        }
+        contenido.update({nombre: tabla_columnar(columnas) for nombre, columnas in TABLAS.items()})
+        crudo = dumps(contenido)
+
+        codificados = {'identity': crudo, 'gzip': gzip.compress(crudo, NIVEL_GZIP, mtime=0)}
+        if brotli is not None:
+            codificados['br'] = brotli.compress(crudo, quality=CALIDAD_BROTLI)
+        for codificacion, datos in codificados.items():
+            _escribir_atomico(base + EXTENSIONES[codificacion], datos)
+
+        meta = {
+            'version': firma,
+            'hash': hashlib.sha256(crudo).hexdigest(),
+            'generado': contenido['generado'],
+            'bytes': {c: len(d) for c, d in codificados.items()},
+            'filas': {nombre: len(contenido[nombre]['filas']) for nombre in TABLAS},
+        }
+        # El .meta se escribe al final: su existencia indica un bundle completo
+        _escribir_atomico(base + '.meta', json.dumps(meta).encode('utf-8'))
+        _limpiar(carpeta)
+
+    current_app.logger.info(
+        "Bundle %s: %s -> %s", firma, meta['filas'],
+        ', '.join(f"{c} {b // 1024} KB" for c, b in meta['bytes'].items())
+    )
+    return meta
+
+
+def regenerar_bundle():
+    """Genera el bundle tras una carga; un fallo no revierte los datos ya confirmados."""
+    try:
+        return construir_bundle()
+    except Exception:
+        current_app.logger.exception("No se pudo generar el bundle offline")
+
+
+@click.command('generar-bundle')
+@with_appcontext
+def generar_bundle():
+    """Genera el bundle offline de la versión actual (p. ej. en el primer despliegue)."""
+    meta = construir_bundle()
+    click.echo(f"Bundle {meta['version']} listo.")
+
+
+def _leer_meta(base):
+    with open(base + '.meta', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def obtener_bundle():
+    """
+    Metadatos del bundle completo más reciente, o None si no hay ninguno.
+    Mientras se genera el de una carga nueva se sigue sirviendo el anterior:
+    la app se pone al día con /api/sync desde su 'token_sync'.
+    """
+    for meta in _metas(_carpeta()):
+        try:
+            return _leer_meta(meta[:-len('.meta')])
+        except FileNotFoundError:  # Lo borró _limpiar: hay uno más reciente
+            continue
+    return None
+
+
+def _codificacion(meta):
+    """Codificación pedida con ?codificacion= o negociada por Accept-Encoding."""
+    disponibles = [c for c in ('br', 'gzip', 'identity') if c in meta['bytes']]
+    pedida = request.args.get('codificacion')
+    if pedida:
+        if pedida not in disponibles:
+            raise ValueError(f"'codificacion' debe ser uno de: {', '.join(disponibles)}")
+        return pedida
+    for codificacion in disponibles[:-1]:
+        if request.accept_encodings[codificacion]:
+            return codificacion
+    return 'identity'
+
+
+def _no_disponible(mensaje, reintentar=60):
+    response = jsonify({"error": mensaje})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(reintentar)
+    return response
+
+
+def servir_bundle():
+    """
+    Responde con el bundle vigente ya comprimido. send_file(conditional=True)
+    atiende If-None-Match (304), Range / If-Range (206) para reanudar una
+    descarga interrumpida, y HEAD. El ETag depende del contenido y de la
+    codificación, porque los rangos se cuentan sobre los bytes comprimidos.
+
+    send_file abre el archivo antes de responder: si _limpiar lo borró
+    desde que se leyó el .meta, se vuelve a resolver el bundle vigente una
+    vez y, si tampoco está, se responde 503.
+    """
+    for _ in range(2):
+        meta = obtener_bundle()
+        if meta is None:
+            return _no_disponible("El bundle aún no se generó ('flask generar-bundle' o una carga de datos)")
+        codificacion = _codificacion(meta)
+        ruta = os.path.join(_carpeta(), f"bundle-{meta['version']}{EXTENSIONES[codificacion]}")
+        try:
+            response = send_file(
+                ruta,
+                mimetype='application/json',
+                conditional=True,
+                etag=f"{meta['hash'][:32]}-{codificacion}",
+                max_age=0,
+            )
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return _no_disponible("El bundle se está reemplazando, reintente en unos segundos", reintentar=5)
+
+    if codificacion != 'identity':
+        response.headers['Content-Encoding'] = codificacion
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.no_cache = True  # Siempre se revalida (ETag barato)
+    response.headers['X-Bundle-Version'] = meta['version']
+    return response
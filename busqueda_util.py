@@ -0,0 +1,281 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from flask import current_app
+from extensions import db
+from models import Candidatos, PartidosPoliticos, CentrosVotacion
+from indices_util import IndiceVersionado
+
+# --- Configuración ---
+CONJUNTOS = ('partidos', 'candidatos', 'centros')
+SIMILITUD_MINIMA = 0.35   # Umbral de trigramas para la coincidencia difusa
+LIMITE_RESULTADOS = 20
+MAX_COINCIDENCIAS = 500   # Tope de resultados que un filtro 'q' / 'nombre' pasa a IN (...)
+
+# Peso de cada campo en el ranking
+PESO_NOMBRE = 3.0
+PESO_SIGLAS = 3.0
+PESO_PARTIDO = 1.5
+PESO_REGION = 1.0
+
+# Puntaje de cada tipo de coincidencia por término
+PUNTAJE_EXACTO = 1.0
+PUNTAJE_PREFIJO = 0.7
+PUNTAJE_DIFUSO = 0.5
+# ---------------------
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes/diéresis/eñes: 'Cañete Pérez' -> 'canete perez'."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def tokenizar(texto):
+    return normalizar(texto).split()
+
+
+def trigramas(token):
+    relleno = f'  {token} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido en memoria con coincidencia exacta, por prefijo y difusa
+    (trigramas). Cada documento se identifica por (tipo, id) y se reindexa
+    sólo si su texto cambió, así las sincronizaciones son incrementales.
+
+    Una vez publicado no se modifica: cada sincronización trabaja sobre una
+    copia (copia()) y los lectores siguen con el índice anterior hasta que
+    se reemplaza la referencia, así las consultas no necesitan lock.
+    """
+
+    def __init__(self):
+        self._documentos = {}                       # clave -> (firma, datos)
+        self._terminos_doc = {}                     # clave -> {token: peso}
+        self._invertido = defaultdict(dict)         # token -> {clave: peso}
+        self._trigramas = defaultdict(set)          # trigrama -> {token}
+        self._vocabulario = []                      # tokens ordenados (prefijos)
+        self._vocabulario_sucio = False
+
+    def __len__(self):
+        return len(self._documentos)
+
+    # --- Mantenimiento ---
+
+    def copia(self):
+        """Índice independiente con el mismo contenido, para sincronizarlo aparte."""
+        nuevo = IndiceBusqueda()
+        nuevo._documentos = dict(self._documentos)
+        nuevo._terminos_doc = dict(self._terminos_doc)
+        nuevo._invertido = defaultdict(dict, {token: dict(p) for token, p in self._invertido.items()})
+        nuevo._trigramas = defaultdict(set, {tri: set(t) for tri, t in self._trigramas.items()})
+        nuevo._vocabulario = self._vocabulario
+        return nuevo
+
+    def _agregar(self, clave, firma, datos, campos):
+        pesos = {}
+        for texto, peso in campos:
+            for token in tokenizar(texto):
+                pesos[token] = max(pesos.get(token, 0.0), peso)
+        for token, peso in pesos.items():
+            if token not in self._invertido:
+                self._vocabulario_sucio = True
+                for tri in trigramas(token):
+                    self._trigramas[tri].add(token)
+            self._invertido[token][clave] = peso
+        self._terminos_doc[clave] = pesos
+        self._documentos[clave] = (firma, datos)
+
+    def _eliminar(self, clave):
+        for token in self._terminos_doc.pop(clave, {}):
+            postings = self._invertido.get(token)
+            if postings is None:
+                continue
+            postings.pop(clave, None)
+            if not postings:
+                del self._invertido[token]
+                self._vocabulario_sucio = True
+                for tri in trigramas(token):
+                    self._trigramas[tri].discard(token)
+        self._documentos.pop(clave, None)
+
+    def sincronizar(self, documentos):
+        """
+        Aplica un conjunto completo de documentos (clave, datos, campos):
+        agrega los nuevos, reindexa los modificados y elimina los ausentes.
+        Devuelve (agregados, actualizados, eliminados).
+        """
+        agregados = actualizados = 0
+        vistos = set()
+        for clave, datos, campos in documentos:
+            vistos.add(clave)
+            firma = hash(tuple(campos))
+            actual = self._documentos.get(clave)
+            if actual is not None and actual[0] == firma:
+                continue
+            if actual is None:
+                agregados += 1
+            else:
+                actualizados += 1
+                self._eliminar(clave)
+            self._agregar(clave, firma, datos, campos)
+
+        ausentes = [clave for clave in self._documentos if clave not in vistos]
+        for clave in ausentes:
+            self._eliminar(clave)
+        if self._vocabulario_sucio:
+            # Se ordena aquí y no en la primera consulta: el índice publicado es de sólo lectura
+            self._vocabulario = sorted(self._invertido)
+            self._vocabulario_sucio = False
+        return agregados, actualizados, len(ausentes)
+
+    # --- Consulta ---
+
+    def _por_prefijo(self, prefijo):
+        i = bisect_left(self._vocabulario, prefijo)
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(prefijo):
+            yield self._vocabulario[i]
+            i += 1
+
+    def _difusos(self, termino):
+        tri_termino = trigramas(termino)
+        comunes = defaultdict(int)
+        for tri in tri_termino:
+            for token in self._trigramas.get(tri, ()):
+                comunes[token] += 1
+        for token, n in comunes.items():
+            similitud = n / (len(tri_termino) + len(trigramas(token)) - n)
+            if similitud >= SIMILITUD_MINIMA:
+                yield token, similitud
+
+    def _puntajes_termino(self, termino):
+        """Mejor puntaje por documento para un término de la consulta."""
+        puntajes = {}
+
+        def acumular(token, factor):
+            for clave, peso in self._invertido[token].items():
+                valor = peso * factor
+                if valor > puntajes.get(clave, 0.0):
+                    puntajes[clave] = valor
+
+        for token in self._por_prefijo(termino):
+            if token == termino:
+                acumular(token, PUNTAJE_EXACTO)
+            else:
+                acumular(token, PUNTAJE_PREFIJO * len(termino) / len(token))
+        if len(termino) >= 3:
+            for token, similitud in self._difusos(termino):
+                acumular(token, PUNTAJE_DIFUSO * similitud)
+        return puntajes
+
+    def buscar(self, consulta, tipo=None, limite=LIMITE_RESULTADOS):
+        """
+        Devuelve los documentos que coinciden con TODOS los términos,
+        ordenados por puntaje descendente.
+        """
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+
+        total = None
+        for termino in terminos:
+            puntajes = self._puntajes_termino(termino)
+            if total is None:
+                total = puntajes
+            else:
+                total = {clave: total[clave] + valor
+                         for clave, valor in puntajes.items() if clave in total}
+            if not total:
+                return []
+
+        resultados = [
+            (puntaje, clave) for clave, puntaje in total.items()
+            if tipo is None or clave[0] == tipo
+        ]
+        resultados.sort(key=lambda r: (-r[0], r[1]))
+
+        return [
+            dict(self._documentos[clave][1], tipo=clave[0], id=clave[1], puntaje=round(puntaje, 4))
+            for puntaje, clave in resultados[:limite]
+        ]
+
+
+# --- Documentos desde la BD (sólo columnas de texto, sin BLOB) ---
+
+def _documentos_bd():
+    partidos = db.session.query(
+        PartidosPoliticos.id_partido,
+        PartidosPoliticos.nombre_partido,
+        PartidosPoliticos.siglas
+    ).all()
+    for p in partidos:
+        yield (
+            ('partido', p.id_partido),
+            {'titulo': p.nombre_partido, 'subtitulo': p.siglas},
+            ((p.nombre_partido, PESO_NOMBRE), (p.siglas, PESO_SIGLAS))
+        )
+
+    candidatos = db.session.query(
+        Candidatos.id,
+        Candidatos.nombre_completo,
+        Candidatos.region,
+        Candidatos.tipo_candidatura,
+        PartidosPoliticos.nombre_partido,
+        PartidosPoliticos.siglas
+    ).outerjoin(
+        PartidosPoliticos,
+        Candidatos.partido_politico_id == PartidosPoliticos.id_partido
+    ).all()
+    for c in candidatos:
+        yield (
+            ('candidato', c.id),
+            {'titulo': c.nombre_completo, 'subtitulo': c.tipo_candidatura, 'region': c.region},
+            (
+                (c.nombre_completo, PESO_NOMBRE),
+                (c.region, PESO_REGION),
+                (c.nombre_partido, PESO_PARTIDO),
+                (c.siglas, PESO_PARTIDO)
+            )
+        )
+
+    centros = db.session.query(
+        CentrosVotacion.id_centro,
+        CentrosVotacion.nombre,
+        CentrosVotacion.distrito
+    ).all()
+    for c in centros:
+        yield (
+            ('centro', c.id_centro),
+            {'titulo': c.nombre, 'subtitulo': c.distrito},
+            ((c.nombre, PESO_NOMBRE),)
+        )
+
+
+def refrescar_indice(anterior=None):
+    """
+    Índice nuevo sincronizado con la BD: copia el anterior y sólo reindexa
+    lo que cambió. El anterior no se toca (sigue respondiendo mientras tanto).
+    """
+    indice = anterior.copia() if anterior is not None else IndiceBusqueda()
+    agregados, actualizados, eliminados = indice.sincronizar(_documentos_bd())
+    if agregados or actualizados or eliminados:
+        current_app.logger.info(
+            "Índice de búsqueda: +%d ~%d -%d (%d documentos)", agregados, actualizados, eliminados, len(indice)
+        )
+    return indice
+
+
+_versionado = IndiceVersionado(CONJUNTOS, refrescar_indice)
+
+
+def obtener_indice():
+    """Devuelve el índice, sincronizándolo si un scraper cargó datos nuevos (VersionDatos)."""
+    return _versionado.obtener()
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, g, request
+from models import leer_versiones, leer_versiones_async
+
+
+class CacheMemoria:
+    """Caché LRU en memoria del proceso, con expiración por TTL."""
+
+    nombre = 'memoria'
+
+    def __init__(self, max_entradas=512):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheRedis:
+    """
+    Caché compartida entre workers sobre Redis (requiere 'pip install redis').
+    El LRU lo aplica Redis con su política maxmemory-policy.
+    """
+
+    nombre = 'redis'
+
+    def __init__(self, url, prefijo='comitia:cache:'):
+        import redis
+        self._cliente = redis.Redis.from_url(url)
+        self._prefijo = prefijo
+
+    def get(self, clave):
+        return self._cliente.get(self._prefijo + clave)
+
+    def set(self, clave, valor, ttl):
+        self._cliente.set(self._prefijo + clave, valor, ex=max(int(ttl), 1))
+
+    def limpiar(self):
+        for clave in self._cliente.scan_iter(self._prefijo + '*'):
+            self._cliente.delete(clave)
+
+    def __len__(self):
+        return sum(1 for _ in self._cliente.scan_iter(self._prefijo + '*'))
+
+
+def _empaquetar(response):
+    cabeceras = {'Content-Type': response.headers.get('Content-Type')}
+    for nombre in ('ETag', 'Link', 'X-Next-Cursor'):
+        if nombre in response.headers:
+            cabeceras[nombre] = response.headers[nombre]
+    meta = json.dumps({'status': response.status_code, 'headers': cabeceras}).encode('utf-8')
+    return meta + b'\n' + response.get_data()
+
+
+def _desempaquetar(valor):
+    meta, cuerpo = valor.split(b'\n', 1)
+    meta = json.loads(meta)
+    return Response(cuerpo, status=meta['status'], headers=meta['headers'])
+
+
+class CacheRespuestas:
+    """
+    Caché de respuestas de las APIs de lectura.
+
+    La clave combina endpoint, argumentos normalizados y la versión de los
+    conjuntos de datos de los que depende la ruta (tabla VersionDatos).
+    Cuando un scraper confirma una carga, la versión cambia y todas las
+    entradas anteriores dejan de ser alcanzables a la vez.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memoria')
+        app.config.setdefault('CACHE_MAX_ENTRADAS', 512)
+        app.config.setdefault('CACHE_TTL', 300)
+        app.config.setdefault('CACHE_REDIS_URL', None)
+
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'redis':
+            self.backend = CacheRedis(app.config['CACHE_REDIS_URL'])
+        elif backend == 'memoria':
+            self.backend = CacheMemoria(app.config['CACHE_MAX_ENTRADAS'])
+        elif backend is None:
+            self.backend = None
+        else:
+            # Backend personalizado: cualquier objeto con get/set/limpiar
+            self.backend = backend
+        self.ttl = app.config['CACHE_TTL']
+        app.extensions['cache_respuestas'] = self
+
+    def _contar(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            'backend': getattr(self.backend, 'nombre', type(self.backend).__name__),
+            'entradas': len(self.backend) if self.backend is not None else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'tasa_aciertos': round(self.hits / total, 4) if total else None,
+        }
+
+    def clave(self, conjuntos, versiones=None):
+        if versiones is None:
+            versiones = leer_versiones()
+        # Los índices en memoria de la vista se verifican con estas mismas versiones (indices_util)
+        g.versiones_datos = versiones
+        args = sorted((k, v) for k, v in request.args.items(multi=True) if v != '')
+        firma_versiones = ','.join(f'{c}:{versiones.get(c, 0)}' for c in conjuntos)
+        return f'{request.endpoint}|{firma_versiones}|{json.dumps(args, ensure_ascii=False)}'
+
+    def _cacheable(self):
+        return self.backend is not None and request.method == 'GET' and not request.args.get('stream')
+
+    def _leer(self, clave):
+        valor = self.backend.get(clave)
+        self._contar(valor is not None)
+        if valor is None:
+            return None
+        response = _desempaquetar(valor)
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def _guardar(self, clave, rv):
+        response = current_app.make_response(rv)
+        if response.status_code == 200 and not response.is_streamed:
+            # ETag del contenido: CompresionRespuestas comprime cada versión una sola vez
+            if 'ETag' not in response.headers:
+                response.add_etag()
+            self.backend.set(clave, _empaquetar(response), self.ttl)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def cachear(self, *conjuntos):
+        """
+        Decorador para rutas GET de lectura. 'conjuntos' son los nombres en
+        VersionDatos de los que depende la respuesta.
+        """
+        def decorador(vista):
+            @wraps(vista)
+            def envoltura(*args, **kwargs):
+                if not self._cacheable():
+                    return vista(*args, **kwargs)
+                clave = self.clave(conjuntos)
+                response = self._leer(clave)
+                if response is None:
+                    response = self._guardar(clave, vista(*args, **kwargs))
+                return response
+            return envoltura
+        return decorador
+
+    def cachear_async(self, *conjuntos):
+        """
+        cachear() para las vistas asíncronas del modo ASGI (reciben la
+        AsyncSession como primer argumento). Usa las mismas claves: las
+        entradas se comparten con las vistas síncronas.
+        """
+        def decorador(vista):
+            @wraps(vista)
+            async def envoltura(sesion, *args, **kwargs):
+                if not self._cacheable():
+                    return await vista(sesion, *args, **kwargs)
+                clave = self.clave(conjuntos, await leer_versiones_async(sesion))
+                response = self._leer(clave)
+                if response is None:
+                    response = self._guardar(clave, await vista(sesion, *args, **kwargs))
+                return response
+            return envoltura
+        return decorador
+
+
+cache = CacheRespuestas()
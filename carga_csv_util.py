@@ -0,0 +1,410 @@
+import csv
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import NullPool
+from extensions import db
+from models import CentrosVotacion, Mesas, Usuarios, CargasArchivo, incrementar_version, ahora_utc
+from carga_masiva_util import sentencia_upsert
+from padron_util import dni_valido
+from bundle_util import regenerar_bundle
+
+# --- Configuración ---
+TAM_LOTE = 5000     # Filas por lote; cada lote es una transacción con su punto de control
+LOAD_DATA = True    # MySQL: LOAD DATA LOCAL INFILE (si el servidor lo rechaza, executemany)
+# ---------------------
+
+# Formato de los archivos (CSV UTF-8 con cabecera; el orden de columnas no importa):
+#   centros:   nombre, direccion, distrito, latitud, longitud [, id_centro]
+#   mesas:     numero_mesa, ubicacion_detalle, centro_nombre, centro_direccion, centro_distrito
+#              (o id_centro en lugar de las tres columnas del centro)
+#   electores: dni, numero_mesa [, rol]
+
+# UUIDs deterministas: recargar el mismo archivo no duplica centros ni electores
+ESPACIO_CENTROS = uuid.uuid5(uuid.NAMESPACE_URL, 'comitia:CentrosVotacion')
+ESPACIO_USUARIOS = uuid.uuid5(uuid.NAMESPACE_URL, 'comitia:Usuarios')
+ROLES = ('Elector', 'MiembroMesa')
+
+
+class FilaInvalida(ValueError):
+    """La fila no se carga; se escribe en <archivo>.rechazos.csv con el motivo."""
+
+
+def _texto(fila, campo, largo, obligatorio=True):
+    valor = (fila.get(campo) or '').strip()
+    if not valor:
+        if obligatorio:
+            raise FilaInvalida(f"falta '{campo}'")
+        return None
+    if len(valor) > largo:
+        raise FilaInvalida(f"'{campo}' supera {largo} caracteres")
+    return valor
+
+
+def _coordenada(fila, campo, limite):
+    valor = (fila.get(campo) or '').strip()
+    if not valor:
+        return None
+    try:
+        numero = round(float(valor), 8)
+    except ValueError:
+        raise FilaInvalida(f"'{campo}' no es un número")
+    if not -limite <= numero <= limite:
+        raise FilaInvalida(f"'{campo}' fuera de rango")
+    return numero
+
+
+def clave_centro(nombre, direccion, distrito):
+    """Clave natural de un centro (no tiene código propio en el esquema)."""
+    return (nombre, direccion, distrito or '')
+
+
+def _mapa_centros(conn):
+    """Clave natural -> (id_centro, latitud, longitud) de los centros existentes."""
+    filas = conn.execute(select(
+        CentrosVotacion.id_centro, CentrosVotacion.nombre, CentrosVotacion.direccion,
+        CentrosVotacion.distrito, CentrosVotacion.latitud, CentrosVotacion.longitud
+    ))
+    return {
+        clave_centro(f.nombre, f.direccion, f.distrito): (
+            f.id_centro,
+            round(float(f.latitud), 8) if f.latitud is not None else None,
+            round(float(f.longitud), 8) if f.longitud is not None else None,
+        )
+        for f in filas
+    }
+
+
+def _mapa_mesas(conn):
+    """numero_mesa -> (id_mesa, ubicacion_detalle, id_centro) de las mesas existentes."""
+    filas = conn.execute(select(Mesas.numero_mesa, Mesas.id_mesa, Mesas.ubicacion_detalle, Mesas.id_centro))
+    return {f.numero_mesa: (f.id_mesa, f.ubicacion_detalle, f.id_centro) for f in filas}
+
+
+class CargaCentros:
+    tipo = 'centros'
+    modelo = CentrosVotacion
+    clave = 'id_centro'
+    columnas = ('id_centro', 'nombre', 'direccion', 'distrito', 'latitud', 'longitud', 'fecha_actualizacion')
+    requeridas = {'nombre', 'direccion'}
+    version = 'centros'
+
+    def preparar(self, conn):
+        self.centros = _mapa_centros(conn)
+
+    def convertir(self, fila):
+        """Dict a insertar, None si el centro no cambió; FilaInvalida si no es válida."""
+        nombre = _texto(fila, 'nombre', 255)
+        direccion = _texto(fila, 'direccion', 255)
+        distrito = _texto(fila, 'distrito', 100, obligatorio=False)
+        latitud = _coordenada(fila, 'latitud', 90)
+        longitud = _coordenada(fila, 'longitud', 180)
+
+        clave = clave_centro(nombre, direccion, distrito)
+        existente = self.centros.get(clave)
+        if existente is not None and existente[1:] == (latitud, longitud):
+            return None
+        id_centro = (fila.get('id_centro') or '').strip() or (existente[0] if existente else None)
+        if id_centro is None:
+            id_centro = str(uuid.uuid5(ESPACIO_CENTROS, '|'.join(clave)))
+        elif len(id_centro) != 36:
+            raise FilaInvalida("'id_centro' no es un UUID")
+        self.centros[clave] = (id_centro, latitud, longitud)
+        return {
+            'id_centro': id_centro, 'nombre': nombre, 'direccion': direccion, 'distrito': distrito,
+            'latitud': latitud, 'longitud': longitud, 'fecha_actualizacion': ahora_utc(),
+        }
+
+
+class CargaMesas:
+    tipo = 'mesas'
+    modelo = Mesas
+    clave = 'numero_mesa'
+    columnas = ('numero_mesa', 'ubicacion_detalle', 'id_centro', 'fecha_actualizacion')
+    requeridas = {'numero_mesa'}
+    version = 'centros'  # Centros y mesas comparten versión (índices del mapa y del padrón)
+
+    def preparar(self, conn):
+        self.centros = _mapa_centros(conn)
+        self.ids_centros = {centro[0] for centro in self.centros.values()}
+        self.mesas = _mapa_mesas(conn)
+
+    def _id_centro(self, fila):
+        id_centro = (fila.get('id_centro') or '').strip()
+        if id_centro:
+            if id_centro not in self.ids_centros:
+                raise FilaInvalida(f"centro '{id_centro}' no existe")
+            return id_centro
+        clave = clave_centro(
+            _texto(fila, 'centro_nombre', 255),
+            _texto(fila, 'centro_direccion', 255),
+            _texto(fila, 'centro_distrito', 100, obligatorio=False),
+        )
+        centro = self.centros.get(clave)
+        if centro is None:
+            raise FilaInvalida(f"centro {' / '.join(c for c in clave if c)} no existe (cárguelo antes que sus mesas)")
+        return centro[0]
+
+    def convertir(self, fila):
+        numero = _texto(fila, 'numero_mesa', 10)
+        ubicacion = _texto(fila, 'ubicacion_detalle', 255, obligatorio=False)
+        id_centro = self._id_centro(fila)
+
+        existente = self.mesas.get(numero)
+        if existente is not None and existente[1:] == (ubicacion, id_centro):
+            return None
+        self.mesas[numero] = (existente[0] if existente else None, ubicacion, id_centro)
+        return {
+            'numero_mesa': numero, 'ubicacion_detalle': ubicacion, 'id_centro': id_centro,
+            'fecha_actualizacion': ahora_utc(),
+        }
+
+
+class CargaElectores:
+    tipo = 'electores'
+    modelo = Usuarios
+    clave = 'dni'
+    columnas = ('id_usuario', 'dni', 'rol', 'id_mesa')
+    requeridas = {'dni', 'numero_mesa'}
+    version = 'padron'  # LRU de DNIs y /mapa/api/centros?dni=
+
+    def preparar(self, conn):
+        # Millones de electores: no se precargan; sólo numero_mesa -> id_mesa
+        self.mesas = {numero: mesa[0] for numero, mesa in _mapa_mesas(conn).items()}
+
+    def convertir(self, fila):
+        dni = (fila.get('dni') or '').strip()
+        if not dni_valido(dni):
+            raise FilaInvalida("'dni' debe tener 8 dígitos")
+        numero = _texto(fila, 'numero_mesa', 10, obligatorio=False)
+        id_mesa = None
+        if numero is not None:
+            id_mesa = self.mesas.get(numero)
+            if id_mesa is None:
+                raise FilaInvalida(f"mesa '{numero}' no existe")
+        rol = (fila.get('rol') or '').strip() or 'Elector'
+        if rol not in ROLES:
+            raise FilaInvalida(f"'rol' debe ser uno de {', '.join(ROLES)}")
+        return {
+            'id_usuario': str(uuid.uuid5(ESPACIO_USUARIOS, dni)), 'dni': dni, 'rol': rol, 'id_mesa': id_mesa,
+        }
+
+
+CARGAS = {carga.tipo: carga for carga in (CargaCentros, CargaMesas, CargaElectores)}
+
+
+class _Rechazos:
+    """Escribe las filas rechazadas en <archivo>.rechazos.csv (se abre con el primer rechazo)."""
+
+    def __init__(self, ruta, columnas, continuar):
+        self.ruta = f'{ruta}.rechazos.csv'
+        self.columnas = list(columnas or ())
+        self.modo = 'a' if continuar else 'w'
+        self._archivo = None
+        self._escritor = None
+
+    def escribir(self, linea, motivo, fila):
+        if self._escritor is None:
+            nuevo = self.modo == 'w' or not os.path.exists(self.ruta)
+            self._archivo = open(self.ruta, self.modo, newline='', encoding='utf-8')
+            self._escritor = csv.writer(self._archivo)
+            if nuevo:
+                self._escritor.writerow(['linea', 'motivo'] + self.columnas)
+        self._escritor.writerow([linea, motivo] + [fila.get(c) for c in self.columnas])
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+def _huella(ruta):
+    """Tamaño y hash de la cabecera: si cambian, el punto de control no sirve."""
+    with open(ruta, 'rb') as f:
+        cabecera = f.readline()
+    return f'{os.path.getsize(ruta)}:{hashlib.sha1(cabecera).hexdigest()}'
+
+
+def _tsv(valor):
+    """Valor en el formato por defecto de LOAD DATA (\\N = NULL, escapes con barra)."""
+    if valor is None:
+        return '\\N'
+    texto = valor.isoformat(' ') if hasattr(valor, 'isoformat') else str(valor)
+    return texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _insertar_load_data(conn, carga, registros):
+    """
+    MySQL: el lote se escribe en un TSV temporal, se carga con LOAD DATA
+    LOCAL INFILE en una tabla temporal y de ahí pasa a la tabla con
+    INSERT ... SELECT ... ON DUPLICATE KEY UPDATE (upsert por la clave).
+    """
+    tabla = carga.modelo.__tablename__
+    temporal = f'_carga_{tabla}'
+    columnas = ', '.join(f'`{c}`' for c in carga.columnas)
+    no_actualizar = {carga.clave, *carga.modelo.__table__.primary_key.columns.keys()}
+    actualizar = ', '.join(f'`{c}` = VALUES(`{c}`)' for c in carga.columnas if c not in no_actualizar)
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.tsv', delete=False) as tmp:
+        for registro in registros:
+            tmp.write('\t'.join(_tsv(registro[c]) for c in carga.columnas) + '\n')
+    try:
+        # Las tablas temporales no confirman la transacción en curso
+        conn.execute(text(f'CREATE TEMPORARY TABLE IF NOT EXISTS `{temporal}` LIKE `{tabla}`'))
+        conn.execute(text(f'DELETE FROM `{temporal}`'))
+        conn.execute(text(
+            f"LOAD DATA LOCAL INFILE :ruta INTO TABLE `{temporal}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({columnas})"
+        ), {'ruta': tmp.name})
+        conn.execute(text(
+            f'INSERT INTO `{tabla}` ({columnas}) SELECT {columnas} FROM `{temporal}` '
+            f'ON DUPLICATE KEY UPDATE {actualizar}'
+        ))
+    finally:
+        os.unlink(tmp.name)
+
+
+def _insertar_executemany(conn, carga, registros):
+    stmt = sentencia_upsert(carga.modelo, conn.dialect.name, carga.clave, carga.columnas)
+    conn.execute(stmt, registros)
+
+
+def _engine_carga(load_data):
+    """En MySQL, con LOAD DATA, un engine propio con local_infile (PyMySQL lo exige por conexión)."""
+    if load_data and db.engine.dialect.name == 'mysql':
+        return create_engine(db.engine.url, connect_args={'local_infile': True}, poolclass=NullPool)
+    return db.engine
+
+
+def cargar_csv(carga, ruta, tam_lote=TAM_LOTE, load_data=LOAD_DATA, reiniciar=False):
+    """
+    Carga un CSV fila a fila con memoria acotada: valida cada fila, resuelve
+    las claves foráneas con mapas en memoria y confirma cada 'tam_lote'
+    filas en una transacción que incluye el punto de control (CargasArchivo).
+    Si se interrumpe, la siguiente ejecución continúa tras el último lote
+    confirmado. Las filas sin cambios no se escriben. Devuelve el resumen.
+    """
+    nombre = f'{carga.tipo}:{os.path.basename(ruta)}'[:255]
+    huella = _huella(ruta)
+    engine = _engine_carga(load_data)
+    usar_load_data = load_data and engine.dialect.name == 'mysql'
+    control_stmt = sentencia_upsert(CargasArchivo, engine.dialect.name, 'archivo',
+                                    ('archivo', 'huella', 'filas', 'completada', 'fecha_actualizacion'))
+    resumen = {'archivo': ruta, 'leidas': 0, 'escritas': 0, 'sin_cambios': 0, 'rechazadas': 0, 'reanudada_en': 0}
+
+    with engine.connect() as conn:
+        control = conn.execute(select(CargasArchivo).where(CargasArchivo.archivo == nombre)).first()
+        if control is not None and control.huella == huella and not reiniciar:
+            if control.completada:
+                print(f"{ruta}: ya cargado ({control.filas} filas); use --reiniciar para cargarlo de nuevo.")
+                return dict(resumen, completada=True)
+            resumen['reanudada_en'] = control.filas
+        carga.preparar(conn)
+        conn.commit()
+
+        def confirmar(registros, filas, completada):
+            nonlocal usar_load_data
+            # Fecha del lote al confirmarlo, no al leer el CSV (/api/sync)
+            ahora = ahora_utc()
+            for registro in registros:
+                if 'fecha_actualizacion' in registro:
+                    registro['fecha_actualizacion'] = ahora
+            while True:
+                try:
+                    with conn.begin():
+                        if registros:
+                            if usar_load_data:
+                                _insertar_load_data(conn, carga, registros)
+                            else:
+                                _insertar_executemany(conn, carga, registros)
+                        conn.execute(control_stmt, [{
+                            'archivo': nombre, 'huella': huella, 'filas': filas,
+                            'completada': completada, 'fecha_actualizacion': ahora,
+                        }])
+                    return
+                except DBAPIError as e:
+                    if not usar_load_data:
+                        raise
+                    print(f"LOAD DATA LOCAL INFILE no disponible ({e.orig}); se usa executemany.")
+                    usar_load_data = False
+
+        inicio = time.perf_counter()
+        with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+            lector = csv.DictReader(archivo)
+            faltan = carga.requeridas - set(lector.fieldnames or ())
+            if faltan:
+                raise ValueError(f"{ruta}: faltan las columnas {', '.join(sorted(faltan))}")
+            rechazos = _Rechazos(ruta, lector.fieldnames, continuar=resumen['reanudada_en'] > 0)
+            lote = {}
+            numero = 0
+            try:
+                for numero, fila in enumerate(lector, 1):
+                    if numero <= resumen['reanudada_en']:
+                        continue
+                    try:
+                        registro = carga.convertir(fila)
+                    except FilaInvalida as e:
+                        rechazos.escribir(lector.line_num, str(e), fila)
+                        resumen['rechazadas'] += 1
+                    else:
+                        if registro is None:
+                            resumen['sin_cambios'] += 1
+                        else:
+                            # Dentro del lote gana la última aparición de la clave
+                            lote[registro[carga.clave]] = registro
+
+                    if numero % tam_lote == 0:
+                        confirmar(list(lote.values()), numero, False)
+                        resumen['escritas'] += len(lote)
+                        lote = {}
+                        leidas = numero - resumen['reanudada_en']
+                        print(f"{carga.tipo}: {numero} filas, {leidas / (time.perf_counter() - inicio):.0f} filas/s")
+
+                confirmar(list(lote.values()), numero, True)
+                resumen['escritas'] += len(lote)
+            finally:
+                rechazos.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    leidas = max(numero - resumen['reanudada_en'], 0)
+    resumen.update({
+        'leidas': leidas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(leidas / segundos) if segundos else None,
+        'metodo': 'load_data' if usar_load_data else 'executemany',
+        'completada': True,
+    })
+    if resumen['escritas'] and carga.version:
+        # Invalida cachés e índices en memoria (mapa, padrón, /api/sync)
+        incrementar_version(carga.version)
+        db.session.commit()
+        regenerar_bundle()
+    print(f"{ruta}: {leidas} filas en {segundos:.2f}s ({resumen['filas_por_segundo']} filas/s); "
+          f"{resumen['escritas']} escritas, {resumen['sin_cambios']} sin cambios, "
+          f"{resumen['rechazadas']} rechazadas ({resumen['metodo']}).")
+    if resumen['rechazadas']:
+        print(f"Filas rechazadas en {rechazos.ruta}")
+    return resumen
+
+
+@click.command('cargar-padron')
+@click.option('--centros', type=click.Path(exists=True, dir_okay=False), help='CSV de centros de votación')
+@click.option('--mesas', type=click.Path(exists=True, dir_okay=False), help='CSV de mesas')
+@click.option('--electores', type=click.Path(exists=True, dir_okay=False), help='CSV del padrón (dni, numero_mesa)')
+@click.option('--tam-lote', type=int, default=TAM_LOTE, show_default=True, help='Filas por transacción')
+@click.option('--sin-load-data', is_flag=True, help='En MySQL usar executemany en lugar de LOAD DATA LOCAL INFILE')
+@click.option('--reiniciar', is_flag=True, help='Ignorar los puntos de control y cargar desde el principio')
+@with_appcontext
+def cargar_padron(centros, mesas, electores, tam_lote, sin_load_data, reiniciar):
+    """Carga centros, mesas y electores desde CSV (en ese orden), reanudable."""
+    archivos = (('centros', centros), ('mesas', mesas), ('electores', electores))
+    if not any(ruta for _, ruta in archivos):
+        raise click.UsageError("Indique al menos uno de --centros, --mesas o --electores")
+    for tipo, ruta in archivos:
+        if ruta:
+            cargar_csv(CARGAS[tipo](), ruta, tam_lote, not sin_load_data, reiniciar)
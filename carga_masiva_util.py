@@ -0,0 +1,90 @@
+import time
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from extensions import db
+
+# --- Configuración ---
+TAM_LOTE = 1000   # Filas por executemany
+# ---------------------
+
+
+def sentencia_upsert(modelo, dialecto, clave, columnas, actualizar=True):
+    """
+    INSERT específico del motor:
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+    - SQLite / PostgreSQL: INSERT ... ON CONFLICT (clave) DO UPDATE / NOTHING
+    - Otros: INSERT simple (los duplicados se filtran antes, por lote)
+    """
+    tabla = modelo.__table__
+    if clave is None:
+        return insert(tabla)
+
+    set_columnas = [c for c in columnas if c != clave and c not in tabla.primary_key.columns.keys()]
+    if not actualizar:
+        set_columnas = []
+
+    if dialecto == 'mysql':
+        stmt = mysql.insert(tabla)
+        if not set_columnas:
+            # MySQL no tiene DO NOTHING: se "actualiza" la clave consigo misma
+            return stmt.on_duplicate_key_update({clave: stmt.inserted[clave]})
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in set_columnas})
+
+    if dialecto in ('sqlite', 'postgresql'):
+        stmt = (sqlite if dialecto == 'sqlite' else postgresql).insert(tabla)
+        if not set_columnas:
+            return stmt.on_conflict_do_nothing(index_elements=[clave])
+        return stmt.on_conflict_do_update(
+            index_elements=[clave],
+            set_={c: stmt.excluded[c] for c in set_columnas}
+        )
+
+    return insert(tabla)
+
+
+def insertar_en_lotes(modelo, filas, clave=None, actualizar=True, tam_lote=TAM_LOTE):
+    """
+    Inserta 'filas' (dicts columna -> valor) en lotes de 'tam_lote' con un
+    solo executemany por lote.
+
+    Si se indica 'clave' (columna única natural), los duplicados se resuelven
+    por lote en la propia sentencia (upsert); dentro de un mismo lote gana la
+    última aparición. No confirma la transacción.
+
+    Los eventos del ORM no se ejecutan: quien llama debe incluir los campos
+    derivados (p. ej. el hash de la imagen).
+    """
+    dialecto = db.session.get_bind(mapper=modelo.__mapper__).dialect.name
+    inicio = time.perf_counter()
+    total = 0
+    lotes = 0
+    sentencias = {}
+
+    for i in range(0, len(filas), tam_lote):
+        lote = filas[i:i + tam_lote]
+        if clave is not None:
+            lote = list({fila[clave]: fila for fila in lote}.values())
+
+        # executemany exige el mismo conjunto de columnas en todo el lote
+        por_columnas = {}
+        for fila in lote:
+            por_columnas.setdefault(tuple(sorted(fila)), []).append(fila)
+        for columnas, grupo in por_columnas.items():
+            if columnas not in sentencias:
+                sentencias[columnas] = sentencia_upsert(modelo, dialecto, clave, columnas, actualizar)
+            db.session.execute(sentencias[columnas], grupo)
+
+        total += len(lote)
+        lotes += 1
+
+    segundos = time.perf_counter() - inicio
+    resumen = {
+        'filas': total,
+        'lotes': lotes,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(total / segundos) if segundos else None,
+    }
+    if total:
+        print(f"{modelo.__tablename__}: {total} filas en {lotes} lotes, "
+              f"{segundos:.2f}s ({resumen['filas_por_segundo']} filas/s).")
+    return resumen
@@ -0,0 +1,281 @@
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Opcional: 'pip install brotli'
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Opcional: 'pip install zstandard'
+    zstandard = None
+
+# --- Configuración (valores por defecto; se sobrescriben en config.py) ---
+MINIMO_BYTES = 1024              # Por debajo de esto la compresión no compensa
+NIVELES = {'br': 5, 'zstd': 3, 'gzip': 6}
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+# ---------------------
+
+# Orden de preferencia del servidor cuando el cliente acepta varias
+CODIFICACIONES = ('br', 'zstd', 'gzip')
+COMPRIMIBLES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'text/csv',
+}
+
+
+def codificaciones_disponibles():
+    return tuple(c for c in CODIFICACIONES if c == 'gzip'
+                 or (c == 'br' and brotli is not None)
+                 or (c == 'zstd' and zstandard is not None))
+
+
+class Compresor:
+    """Compresor incremental con la misma interfaz para gzip, brotli y zstd."""
+
+    def __init__(self, codificacion, nivel):
+        self.codificacion = codificacion
+        if codificacion == 'br':
+            self._obj = brotli.Compressor(quality=nivel)
+        elif codificacion == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=nivel).compressobj()
+        else:
+            self._obj = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+
+    def comprimir(self, datos, vaciar=False):
+        """Comprime un fragmento; con 'vaciar' entrega todo lo pendiente sin cerrar el flujo."""
+        if self.codificacion == 'br':
+            salida = self._obj.process(datos)
+            return salida + self._obj.flush() if vaciar else salida
+        salida = self._obj.compress(datos)
+        if not vaciar:
+            return salida
+        if self.codificacion == 'zstd':
+            return salida + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return salida + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self):
+        if self.codificacion == 'br':
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def comprimir(datos, codificacion, nivel):
+    compresor = Compresor(codificacion, nivel)
+    return compresor.comprimir(datos) + compresor.terminar()
+
+
+def _comprimir_stream(fragmentos, compresor):
+    """
+    Comprime una respuesta por fragmentos. Cada fragmento se vacía al
+    salir, así el cliente recibe los datos a medida que se generan.
+    """
+    try:
+        for fragmento in fragmentos:
+            if isinstance(fragmento, str):
+                fragmento = fragmento.encode('utf-8')
+            if fragmento:
+                salida = compresor.comprimir(fragmento, vaciar=True)
+                if salida:
+                    yield salida
+        yield compresor.terminar()
+    finally:
+        if hasattr(fragmentos, 'close'):
+            fragmentos.close()
+
+
+class CacheComprimidos:
+    """LRU de cuerpos ya comprimidos, limitada por bytes y no por entradas."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        if len(valor) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior)
+            self._datos[clave] = valor
+            self.bytes += len(valor)
+            while self.bytes > self.max_bytes:
+                _, descartado = self._datos.popitem(last=False)
+                self.bytes -= len(descartado)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CompresionRespuestas:
+    """
+    Comprime las respuestas con la codificación negociada por
+    Accept-Encoding (br, zstd o gzip, según lo instalado).
+
+    Los cuerpos comprimidos de respuestas cacheables (con ETag, p. ej. las
+    que guarda CacheRespuestas) se guardan por (ETag, codificación): cada
+    versión de una respuesta se comprime una sola vez. Las respuestas en
+    stream se comprimen fragmento a fragmento. Un If-None-Match con el
+    ETag de la representación enviada se responde con 304.
+    """
+
+    def __init__(self, app=None):
+        self.codificaciones = codificaciones_disponibles()
+        self.niveles = dict(NIVELES)
+        self.minimo = MINIMO_BYTES
+        self.cache = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESION_ACTIVA', True)
+        app.config.setdefault('COMPRESION_MINIMO_BYTES', MINIMO_BYTES)
+        app.config.setdefault('COMPRESION_NIVELES', NIVELES)
+        app.config.setdefault('COMPRESION_CACHE_MAX_BYTES', CACHE_MAX_BYTES)
+
+        self.minimo = app.config['COMPRESION_MINIMO_BYTES']
+        self.niveles = dict(NIVELES, **app.config['COMPRESION_NIVELES'])
+        max_bytes = app.config['COMPRESION_CACHE_MAX_BYTES']
+        self.cache = CacheComprimidos(max_bytes) if max_bytes else None
+        app.extensions['compresion'] = self
+        if app.config['COMPRESION_ACTIVA']:
+            app.after_request(self.procesar)
+
+    def _contar(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            'codificaciones': list(self.codificaciones),
+            'entradas': len(self.cache) if self.cache is not None else 0,
+            'bytes': self.cache.bytes if self.cache is not None else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'tasa_aciertos': round(self.hits / total, 4) if total else None,
+        }
+
+    def negociar(self):
+        """Codificación preferida entre las que acepta el cliente (q > 0), o None."""
+        aceptadas = request.accept_encodings
+        for codificacion in self.codificaciones:
+            if aceptadas[codificacion]:
+                return codificacion
+        return None
+
+    def _comprimible(self, response):
+        return (
+            response.mimetype in COMPRIMIBLES
+            and response.status_code == 200
+            and 'Content-Encoding' not in response.headers
+            # send_file (bundle, media): ya viene comprimido o se sirve por rangos
+            and not response.direct_passthrough
+        )
+
+    def procesar(self, response):
+        if request.method == 'HEAD' or not self._comprimible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        codificacion = self.negociar()
+        if codificacion is not None:
+            self._codificar(response, codificacion)
+        # El cliente revalida con el ETag final (con la codificación): 304 si coincide
+        if request.if_none_match and not response.is_streamed:
+            response.make_conditional(request)
+        return response
+
+    def _codificar(self, response, codificacion):
+        nivel = self.niveles[codificacion]
+        if response.is_streamed:
+            response.response = _comprimir_stream(response.response, Compresor(codificacion, nivel))
+            response.headers.pop('Content-Length', None)
+        else:
+            datos = response.get_data()
+            if len(datos) < self.minimo:
+                return
+            response.set_data(self._comprimir_cuerpo(response, datos, codificacion, nivel))
+
+        response.headers['Content-Encoding'] = codificacion
+        # Cada codificación es una representación distinta: su ETag también
+        etag, debil = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{codificacion}', weak=debil)
+
+    def _comprimir_cuerpo(self, response, datos, codificacion, nivel):
+        etag, _ = response.get_etag()
+        cacheable = (
+            self.cache is not None and etag
+            and not response.cache_control.no_store
+            and not response.cache_control.private
+        )
+        if not cacheable:
+            return comprimir(datos, codificacion, nivel)
+
+        clave = (etag, codificacion)
+        comprimido = self.cache.get(clave)
+        self._contar(comprimido is not None)
+        if comprimido is None:
+            comprimido = comprimir(datos, codificacion, nivel)
+            self.cache.set(clave, comprimido)
+        return comprimido
+
+
+compresion = CompresionRespuestas()
+
+
+# --- Benchmark: python compresion_util.py ---
+
+if __name__ == "__main__":
+    import json
+    import random
+    import time
+
+    random.seed(0)
+    distritos = ['Surquillo', 'Miraflores', 'San Isidro', 'Lince', 'Barranco']
+    filas = [
+        {'id_centro': i, 'nombre': f'I.E. {random.randint(1, 9999)}', 'direccion': f'Av. {random.randint(1, 900)}',
+         'distrito': random.choice(distritos), 'latitud': -12 + random.random(), 'longitud': -77 + random.random()}
+        for i in range(5000)
+    ]
+    cuerpo = json.dumps(filas).encode('utf-8')
+    print(f"JSON de {len(filas)} centros: {len(cuerpo) // 1024} KB")
+    for codificacion in codificaciones_disponibles():
+        nivel = NIVELES[codificacion]
+        inicio = time.perf_counter()
+        for _ in range(10):
+            salida = comprimir(cuerpo, codificacion, nivel)
+        ms = (time.perf_counter() - inicio) / 10 * 1000
+        print(f"  {codificacion:5} nivel {nivel:2}: {len(salida) // 1024:5} KB ({len(salida) / len(cuerpo):.1%}) en {ms:.1f} ms")
+
+    cache = CacheComprimidos(CACHE_MAX_BYTES)
+    cache.set(('etag', 'gzip'), comprimir(cuerpo, 'gzip', NIVELES['gzip']))
+    inicio = time.perf_counter()
+    for _ in range(10000):
+        cache.get(('etag', 'gzip'))
+    print(f"  Acierto en la caché de comprimidos: {(time.perf_counter() - inicio) / 10000 * 1e6:.2f} µs")
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+from extensions import db
+from models import Eliminaciones, MODELOS_SINCRONIZABLES, RETENCION_ELIMINACIONES_DIAS, ahora_utc
+from bundle_util import TABLAS, tabla_columnar, token_sync
+
+# --- Configuración ---
+# Se piden los cambios desde 'since' menos este margen. Las filas se fechan
+# justo antes del COMMIT (models._fechar_cambios); el margen cubre lo que
+# tarda ese COMMIT y la diferencia de reloj entre procesos.
+# El cliente puede recibir filas repetidas; aplicarlas de nuevo no cambia nada.
+MARGEN_SEGUNDOS = 5
+# ---------------------
+
+
+class TokenExpirado(Exception):
+    pass
+
+
+def leer_token(texto):
+    """
+    Convierte el token de '?since=' en datetime UTC sin zona (como las
+    columnas); acepta también fechas con zona ('Z', '+00:00', '-05:00'),
+    p. ej. el 'generado' del bundle. ValueError si no es válido.
+    """
+    try:
+        fecha = datetime.fromisoformat(texto)
+    except (TypeError, ValueError):
+        raise ValueError("'since' no es un token válido (use el campo 'siguiente' de la respuesta anterior)")
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def cambios_desde(since=None):
+    """
+    Filas creadas o modificadas y registros eliminados desde 'since'
+    (datetime UTC). Sin 'since' devuelve todas las filas (carga inicial).
+    Las filas van en el mismo formato columnar que /api/bundle.
+
+    Lanza TokenExpirado si 'since' es más antiguo que la retención de
+    Eliminaciones: el cliente debe volver a descargar el bundle.
+    """
+    inicio = ahora_utc()
+    if since is not None and since < inicio - timedelta(days=RETENCION_ELIMINACIONES_DIAS):
+        raise TokenExpirado()
+    desde = since - timedelta(seconds=MARGEN_SEGUNDOS) if since is not None else None
+
+    cambios = {}
+    eliminados = {}
+    for nombre, columnas in TABLAS.items():
+        modelo = MODELOS_SINCRONIZABLES[nombre]
+        filtros = [modelo.fecha_actualizacion >= desde] if desde is not None else []
+        cambios[nombre] = tabla_columnar(columnas, *filtros)
+
+        if desde is None:
+            eliminados[nombre] = []
+            continue
+        ids = {
+            fila[0] for fila in db.session.query(Eliminaciones.id_entidad).filter(
+                Eliminaciones.tabla == modelo.__tablename__,
+                Eliminaciones.fecha >= desde
+            )
+        }
+        # Un id borrado y vuelto a insertar en el intervalo viaja como cambio
+        ids -= {str(fila[0]) for fila in cambios[nombre]['filas']}
+        eliminados[nombre] = sorted(ids)
+
+    return {
+        'desde': token_sync(since) if since is not None else None,
+        'siguiente': token_sync(inicio),
+        'completo': since is None,
+        'cambios': cambios,
+        'eliminados': eliminados,
+    }
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Configuración ---
+MAX_CONCURRENCIA = 8          # Descargas simultáneas
+# Peticiones por segundo a un mismo servidor; None = sin límite. Todas las
+# imágenes de un scraper vienen del mismo host: un límite por debajo de
+# MAX_CONCURRENCIA / latencia vuelve la descarga secuencial.
+MAX_POR_SEGUNDO_HOST = None
+REINTENTOS = 3                # Reintentos ante errores de red / 429 / 5xx
+BACKOFF_BASE = 0.5            # Segundos; se duplica en cada reintento
+MAX_RETRY_AFTER = 30          # Tope (segundos) a la espera que pide Retry-After
+TIMEOUT = 10
+MAX_BYTES = 5 * 1024 * 1024   # Tope por imagen (MEDIUMBLOB admite 16 MB)
+TAM_BLOQUE = 64 * 1024
+# ---------------------
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Resultado de una descarga (validadores HTTP para el próximo GET condicional)
+Descarga = namedtuple('Descarga', 'contenido etag modificado no_modificado')
+
+
+class ImagenDemasiadoGrande(Exception):
+    pass
+
+
+class _LimitadorPorHost:
+    """Espacia las peticiones a cada host según MAX_POR_SEGUNDO_HOST."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._siguiente = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, host):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente.get(host, ahora))
+            self._siguiente[host] = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class Descargador:
+    """
+    Descargador de imágenes compartido por ambos scrapers.
+
+    Reutiliza conexiones con un requests.Session (pool por host), limita la
+    concurrencia (y el ritmo por host, si se configura), reintenta con backoff exponencial y
+    corta las descargas que superan 'max_bytes'.
+    """
+
+    def __init__(self, headers=None, max_concurrencia=MAX_CONCURRENCIA,
+                 max_por_segundo_host=MAX_POR_SEGUNDO_HOST, reintentos=REINTENTOS,
+                 backoff_base=BACKOFF_BASE, timeout=TIMEOUT, max_bytes=MAX_BYTES,
+                 max_retry_after=MAX_RETRY_AFTER):
+        self.max_concurrencia = max_concurrencia
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._limitador = _LimitadorPorHost(max_por_segundo_host)
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=max_concurrencia, pool_maxsize=max_concurrencia)
+        self.session.mount('http://', adaptador)
+        self.session.mount('https://', adaptador)
+        if headers:
+            self.session.headers.update(headers)
+
+    def _leer_limitado(self, response):
+        largo = response.headers.get('Content-Length')
+        if largo and largo.isdigit() and int(largo) > self.max_bytes:
+            raise ImagenDemasiadoGrande(f"{largo} bytes")
+        partes = []
+        total = 0
+        for bloque in response.iter_content(TAM_BLOQUE):
+            total += len(bloque)
+            if total > self.max_bytes:
+                raise ImagenDemasiadoGrande(f"más de {self.max_bytes} bytes")
+            partes.append(bloque)
+        return b''.join(partes)
+
+    def _espera_reintento(self, intento, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_retry_after)
+        return self.backoff_base * (2 ** intento)
+
+    def descargar_condicional(self, url, etag=None, modificado=None):
+        """
+        GET condicional: envía If-None-Match / If-Modified-Since si se conocen.
+        Devuelve una Descarga; 'no_modificado' es True ante un 304 y
+        'contenido' es None si la descarga falló.
+        """
+        if not url:
+            return Descarga(None, None, None, False)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modificado:
+            headers['If-Modified-Since'] = modificado
+
+        host = urlsplit(url).netloc
+        for intento in range(self.reintentos + 1):
+            self._limitador.esperar(host)
+            try:
+                with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    if response.status_code in ESTADOS_REINTENTABLES and intento < self.reintentos:
+                        time.sleep(self._espera_reintento(intento, response))
+                        continue
+                    if response.status_code == 304:
+                        return Descarga(None, etag, modificado, True)
+                    response.raise_for_status()
+                    return Descarga(
+                        self._leer_limitado(response),
+                        response.headers.get('ETag'),
+                        response.headers.get('Last-Modified'),
+                        False
+                    )
+            except ImagenDemasiadoGrande as e:
+                print(f"Imagen omitida por tamaño {url}: {e}")
+                break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if intento < self.reintentos:
+                    time.sleep(self._espera_reintento(intento))
+                    continue
+                print(f"Error al descargar {url}: {e}")
+                break
+            except requests.RequestException as e:
+                print(f"Error al descargar {url}: {e}")
+                break
+        return Descarga(None, None, None, False)
+
+    def descargar(self, url):
+        """Descarga una URL y devuelve los bytes, o None si falla."""
+        return self.descargar_condicional(url).contenido
+
+    def descargar_todos_condicional(self, peticiones):
+        """
+        Descarga varias URLs en paralelo (hasta max_concurrencia a la vez).
+        'peticiones' es {url: (etag, modificado)}; devuelve {url: Descarga}.
+        """
+        peticiones = {url: v for url, v in peticiones.items() if url}
+        if not peticiones:
+            return {}
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrencia) as pool:
+            futuros = {
+                url: pool.submit(self.descargar_condicional, url, *validadores)
+                for url, validadores in peticiones.items()
+            }
+            resultados = {url: f.result() for url, f in futuros.items()}
+        bajadas = sum(1 for d in resultados.values() if d.contenido)
+        sin_cambio = sum(1 for d in resultados.values() if d.no_modificado)
+        print(f"Imágenes: {bajadas} descargadas, {sin_cambio} sin cambios (304), "
+              f"{len(resultados) - bajadas - sin_cambio} con error, en {time.perf_counter() - inicio:.1f}s.")
+        return resultados
+
+    def descargar_todos(self, urls):
+        """
+        Descarga varias URLs en paralelo. Devuelve {url: bytes | None};
+        las URLs repetidas se bajan una vez.
+        """
+        resultados = self.descargar_todos_condicional({u: (None, None) for u in urls if u})
+        return {url: d.contenido for url, d in resultados.items()}
+
+    def cerrar(self):
+        self.session.close()
@@ -0,0 +1,310 @@
+import math
+import numpy as np
+from sqlalchemy import func
+from extensions import db
+from models import consulta_centros, CentrosVotacion, Mesas
+from indices_util import IndiceVersionado
+
+# --- Configuración ---
+TAM_CELDA = 0.05          # Grados por celda de la grilla (~5.5 km)
+ANILLOS_MAXIMOS = 10      # Más anillos: haversine vectorizado sobre todos los centros
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+MAX_CENTROS_BBOX = 500    # Tope de /mapa/api/centros/bbox (más: usar /mapa/api/clusters)
+
+# Clusters para el mapa (zoom de Leaflet / OpenStreetMap)
+ZOOM_MINIMO = 0
+ZOOM_MAXIMO = 16          # A partir de ZOOM_MAXIMO + 1 se muestran centros sueltos
+RADIO_CLUSTER_PX = 60     # Tamaño de la celda de agrupación en píxeles de pantalla
+# ---------------------
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distancia haversine (km) desde un punto a arreglos de puntos."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(a))
+
+
+def _coordenadas_validas(lat, lng):
+    # Las comparaciones con NaN son falsas: NaN e infinito quedan fuera
+    return -90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0
+
+
+def leer_punto(lat, lng):
+    """
+    Convierte 'lat' y 'lng' (texto) en floats. Lanza ValueError si no son
+    números finitos dentro de -90..90 y -180..180.
+    """
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        raise ValueError("'lat' y 'lng' deben ser números")
+    if not _coordenadas_validas(lat, lng):
+        raise ValueError("'lat' debe estar entre -90 y 90 y 'lng' entre -180 y 180")
+    return lat, lng
+
+
+def leer_bbox(texto):
+    """
+    Convierte 'oeste,sur,este,norte' (formato de Leaflet toBBoxString)
+    en una tupla de floats. Lanza ValueError si el formato no es válido.
+    """
+    partes = [float(x) for x in texto.split(',')]
+    if len(partes) != 4:
+        raise ValueError("'bbox' debe tener el formato oeste,sur,este,norte")
+    oeste, sur, este, norte = partes
+    if not (_coordenadas_validas(sur, oeste) and _coordenadas_validas(norte, este)):
+        raise ValueError("'bbox' fuera de rango (latitudes -90..90, longitudes -180..180)")
+    if sur > norte or oeste > este:
+        raise ValueError("'bbox' tiene los límites invertidos")
+    return oeste, sur, este, norte
+
+
+class IndiceEspacial:
+    """
+    Grilla regular sobre arreglos NumPy de latitud/longitud.
+
+    - cercanos(): búsqueda por anillos de celdas alrededor del punto, con
+      distancia haversine exacta sobre los candidatos. Si hacen falta más
+      de ANILLOS_MAXIMOS anillos (punto lejos de los centros), haversine
+      vectorizado sobre todos.
+    - en_bbox(): rango por latitud con searchsorted y filtro vectorizado
+      por longitud.
+    """
+
+    def __init__(self, filas):
+        filas = [f for f in filas if f.latitud is not None and f.longitud is not None]
+        lats = np.array([float(f.latitud) for f in filas], dtype=np.float64)
+        lngs = np.array([float(f.longitud) for f in filas], dtype=np.float64)
+        celdas_i = np.floor(lats / TAM_CELDA).astype(np.int64)
+        celdas_j = np.floor(lngs / TAM_CELDA).astype(np.int64)
+
+        # Orden por celda: cada celda ocupa un rango contiguo de los arreglos
+        orden = np.lexsort((celdas_j, celdas_i))
+        self.lats = lats[orden]
+        self.lngs = lngs[orden]
+        self.datos = [
+            {
+                'id': f.id_centro,
+                'nombre': f.nombre,
+                'distrito': f.distrito,
+                'ubicacion_detalle': getattr(f, 'ubicacion_detalle', None)
+            }
+            for f in (filas[k] for k in orden)
+        ]
+        self._celdas = {}
+        ci, cj = celdas_i[orden], celdas_j[orden]
+        if len(orden):
+            cortes = np.flatnonzero((np.diff(ci) != 0) | (np.diff(cj) != 0)) + 1
+            inicios = np.concatenate(([0], cortes))
+            finales = np.concatenate((cortes, [len(orden)]))
+            for ini, fin in zip(inicios, finales):
+                self._celdas[(int(ci[ini]), int(cj[ini]))] = (int(ini), int(fin))
+            self._limites = (int(ci.min()), int(ci.max()), int(cj.min()), int(cj.max()))
+        else:
+            self._limites = (0, -1, 0, -1)
+
+        # Índice secundario ordenado por latitud para las consultas por área
+        self._orden_lat = np.argsort(self.lats, kind='stable')
+        self._lats_ordenadas = self.lats[self._orden_lat]
+
+    def __len__(self):
+        return len(self.datos)
+
+    def _resultado(self, k, distancia=None):
+        item = dict(self.datos[k], lat=float(self.lats[k]), lng=float(self.lngs[k]))
+        if distancia is not None:
+            item['distancia_km'] = round(float(distancia), 4)
+        return item
+
+    def _anillo(self, i0, j0, r):
+        """Índices de los puntos en las celdas a distancia Chebyshev r."""
+        if r == 0:
+            celdas = [(i0, j0)]
+        else:
+            celdas = [(i0 + di, j0 + dj) for di in (-r, r) for dj in range(-r, r + 1)]
+            celdas += [(i0 + di, j0 + dj) for dj in (-r, r) for di in range(-r + 1, r)]
+        rangos = [self._celdas[c] for c in celdas if c in self._celdas]
+        return [np.arange(ini, fin) for ini, fin in rangos]
+
+    def cercanos(self, lat, lng, k=5):
+        """Los k centros más cercanos a (lat, lng) ya validados, ordenados por distancia."""
+        if not len(self) or k < 1:
+            return []
+        i0 = math.floor(lat / TAM_CELDA)
+        j0 = math.floor(lng / TAM_CELDA)
+        imin, imax, jmin, jmax = self._limites
+        r_max = max(abs(i0 - imin), abs(i0 - imax), abs(j0 - jmin), abs(j0 - jmax))
+
+        candidatos = []
+        n = 0
+        r = 0
+        completo = False
+        while r <= min(r_max, ANILLOS_MAXIMOS):
+            bloques = self._anillo(i0, j0, r)
+            candidatos.extend(bloques)
+            n += sum(len(b) for b in bloques)
+            if n >= k:
+                # Todo punto fuera de los anillos revisados está a más de
+                # r celdas; si el k-ésimo ya está más cerca, se puede parar.
+                idx = np.concatenate(candidatos)
+                dist = haversine_km(lat, lng, self.lats[idx], self.lngs[idx])
+                kesima = np.partition(dist, k - 1)[k - 1]
+                lat_extrema = min(abs(lat) + (r + 1) * TAM_CELDA, 90.0)
+                km_celda = TAM_CELDA * KM_POR_GRADO * math.cos(math.radians(lat_extrema))
+                if kesima <= r * km_celda:
+                    completo = True
+                    break
+            r += 1
+
+        if completo or r > r_max:
+            idx = np.concatenate(candidatos) if candidatos else np.array([], dtype=np.int64)
+        else:
+            idx = np.arange(len(self))
+        dist = haversine_km(lat, lng, self.lats[idx], self.lngs[idx])
+        k = min(k, len(idx))
+        mejores = np.argpartition(dist, k - 1)[:k] if k < len(idx) else np.arange(len(idx))
+        mejores = mejores[np.argsort(dist[mejores], kind='stable')]
+        return [self._resultado(int(idx[m]), dist[m]) for m in mejores]
+
+    def en_bbox(self, oeste, sur, este, norte, limite=None):
+        """Centros dentro del rectángulo (límites incluidos)."""
+        ini = np.searchsorted(self._lats_ordenadas, sur, side='left')
+        fin = np.searchsorted(self._lats_ordenadas, norte, side='right')
+        idx = self._orden_lat[ini:fin]
+        lngs = self.lngs[idx]
+        idx = idx[(lngs >= oeste) & (lngs <= este)]
+        if limite is not None:
+            idx = idx[:limite]
+        return [self._resultado(int(k)) for k in idx]
+
+
+def _mercator(lats, lngs):
+    """Proyección Web Mercator normalizada a [0, 1] (x, y)."""
+    x = (np.asarray(lngs) + 180.0) / 360.0
+    seno = np.clip(np.sin(np.radians(lats)), -0.9999, 0.9999)
+    y = 0.5 - np.log((1 + seno) / (1 - seno)) / (4 * math.pi)
+    return x, y
+
+
+def _en_rango(lats, lngs, oeste, sur, este, norte):
+    return np.flatnonzero((lats >= sur) & (lats <= norte) & (lngs >= oeste) & (lngs <= este))
+
+
+class ClustersJerarquicos:
+    """
+    Agrupación jerárquica precalculada por nivel de zoom.
+
+    El nivel ZOOM_MAXIMO + 1 son los centros individuales. Cada nivel z
+    agrupa los elementos del nivel z + 1 cuyo centroide cae en la misma celda
+    de RADIO_CLUSTER_PX píxeles (a ese zoom), así cada cluster conoce a sus
+    hijos y se calcula una sola vez por conjunto de datos.
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        hoja = ZOOM_MAXIMO + 1
+        n = len(indice)
+        self.niveles = {
+            hoja: {
+                'lat': indice.lats,
+                'lng': indice.lngs,
+                'cantidad': np.ones(n, dtype=np.int64),
+                'zoom_expansion': np.full(n, hoja, dtype=np.int64),
+                'centro': np.arange(n),
+            }
+        }
+
+        for z in range(ZOOM_MAXIMO, ZOOM_MINIMO - 1, -1):
+            hijos = self.niveles[z + 1]
+            x, y = _mercator(hijos['lat'], hijos['lng'])
+            escala = 256 * 2 ** z / RADIO_CLUSTER_PX
+            celdas = np.floor(x * escala).astype(np.int64) * (1 << 32) + np.floor(y * escala).astype(np.int64)
+            _, padre = np.unique(celdas, return_inverse=True)
+            padre = padre.ravel()
+            m = int(padre.max()) + 1 if n else 0
+
+            peso = hijos['cantidad']
+            cantidad = np.bincount(padre, weights=peso, minlength=m).astype(np.int64)
+            lat = np.bincount(padre, weights=hijos['lat'] * peso, minlength=m) / np.maximum(cantidad, 1)
+            lng = np.bincount(padre, weights=hijos['lng'] * peso, minlength=m) / np.maximum(cantidad, 1)
+
+            # Un cluster con un solo hijo se expande en el mismo zoom que ese hijo
+            num_hijos = np.bincount(padre, minlength=m)
+            zoom_expansion = np.full(m, z + 1, dtype=np.int64)
+            unicos = num_hijos[padre] == 1
+            zoom_expansion[padre[unicos]] = hijos['zoom_expansion'][unicos]
+
+            # Algún centro de cada cluster (el único, si cantidad == 1)
+            centro = np.empty(m, dtype=np.int64)
+            centro[padre] = hijos['centro']
+
+            hijos['padre'] = padre
+            self.niveles[z] = {
+                'lat': lat,
+                'lng': lng,
+                'cantidad': cantidad,
+                'zoom_expansion': zoom_expansion,
+                'centro': centro,
+            }
+
+    def _elemento(self, z, k):
+        nivel = self.niveles[z]
+        if nivel['cantidad'][k] == 1:
+            # Un cluster de un único centro se entrega como el propio centro
+            return dict(self.indice._resultado(int(nivel['centro'][k])), tipo='centro')
+        return {
+            'tipo': 'cluster',
+            'id': f'{z}-{k}',
+            'cantidad': int(nivel['cantidad'][k]),
+            'lat': round(float(nivel['lat'][k]), 6),
+            'lng': round(float(nivel['lng'][k]), 6),
+            'zoom_expansion': int(nivel['zoom_expansion'][k]),
+        }
+
+    def nivel_para(self, zoom):
+        return min(max(int(zoom), ZOOM_MINIMO), ZOOM_MAXIMO + 1)
+
+    def en_bbox(self, zoom, bbox):
+        """Clusters (o centros) visibles en el zoom y rectángulo indicados."""
+        z = self.nivel_para(zoom)
+        nivel = self.niveles[z]
+        indices = _en_rango(nivel['lat'], nivel['lng'], *bbox)
+        return [self._elemento(z, int(k)) for k in indices]
+
+    def hijos(self, z, k):
+        """Elementos del siguiente nivel que componen el cluster z-k."""
+        if z not in self.niveles or z > ZOOM_MAXIMO or not 0 <= k < len(self.niveles[z]['cantidad']):
+            raise KeyError(f'{z}-{k}')
+        indices = np.flatnonzero(self.niveles[z + 1]['padre'] == k)
+        return [self._elemento(z + 1, int(i)) for i in indices]
+
+
+def construir_indice(anterior=None):
+    """Reconstruye el índice espacial y todos los niveles de clusters desde CentrosVotacion."""
+    # Ubicación de referencia dentro del centro (la de alguna de sus mesas)
+    ubicacion = db.session.query(func.min(Mesas.ubicacion_detalle)).filter(
+        Mesas.id_centro == CentrosVotacion.id_centro
+    ).correlate(CentrosVotacion).scalar_subquery().label('ubicacion_detalle')
+
+    filas = consulta_centros().add_columns(ubicacion).filter(
+        CentrosVotacion.latitud.isnot(None),
+        CentrosVotacion.longitud.isnot(None)
+    ).all()
+    indice = IndiceEspacial(filas)
+    return indice, ClustersJerarquicos(indice)
+
+
+_versionado = IndiceVersionado(('centros',), construir_indice)
+
+
+def obtener_indice_espacial():
+    """Devuelve el índice, reconstruyéndolo si cambió la versión de 'centros'."""
+    return _versionado.obtener()[0]
+
+
+def obtener_clusters():
+    """Clusters del índice vigente (se calculan una vez por reconstrucción)."""
+    return _versionado.obtener()[1]
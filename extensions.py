@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from replicas_util import SesionEnrutada
 
 
-db = SQLAlchemy()
\ No newline at end of file
+# La sesión enruta las lecturas de las rutas GET a las réplicas (replicas_util)
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
\ No newline at end of file
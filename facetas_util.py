@@ -0,0 +1,141 @@
+from collections import defaultdict
+from sqlalchemy import func
+from extensions import db
+from models import Candidatos, PartidosPoliticos, CentrosVotacion, Mesas
+from cache_util import CacheMemoria
+from indices_util import IndiceVersionado
+
+# --- Configuración ---
+CONJUNTOS = ('partidos', 'candidatos', 'centros')
+MAX_COMBINACIONES = 1024      # Respuestas filtradas que se recuerdan por versión
+# ---------------------
+
+# Parámetro de la URL -> (posición en la celda del cubo, nombre de la faceta)
+FILTROS = {
+    'region': (0, 'region'),
+    'cargo': (1, 'tipo_candidatura'),
+    'partido': (2, 'partido'),
+}
+
+
+def _ordenar(conteo):
+    """Valores de una faceta, de mayor a menor total (None = sin dato, al final si empata)."""
+    return sorted(conteo.items(), key=lambda par: (-par[1], par[0] is None, par[0] or ''))
+
+
+class IndiceFacetas:
+    """
+    Agregados para la navegación por facetas, calculados con GROUP BY al
+    reconstruir (una vez por carga de los scrapers, que incrementan
+    VersionDatos) y no en cada petición:
+
+    - candidatos: un cubo (region, tipo_candidatura, partido) -> total, con
+      una celda por combinación existente. Cada faceta se cuenta con los
+      filtros de las demás, así se ven las alternativas a lo elegido.
+    - centros y mesas por distrito.
+
+    La respuesta sin filtros se arma al cargar; las filtradas se recuerdan
+    en una LRU propia de cada índice (cada reconstrucción empieza vacía).
+    """
+
+    def __init__(self):
+        self.celdas = {}
+        self.partidos = {}
+        self.centros = {}
+        self.completo = None
+        self.respuestas = CacheMemoria(MAX_COMBINACIONES)
+
+    def cargar(self):
+        self.celdas = {
+            (region, tipo, partido): total
+            for region, tipo, partido, total in db.session.query(
+                Candidatos.region, Candidatos.tipo_candidatura, Candidatos.partido_politico_id,
+                func.count(Candidatos.id)
+            ).group_by(Candidatos.region, Candidatos.tipo_candidatura, Candidatos.partido_politico_id)
+        }
+        self.partidos = {
+            fila.id_partido: {'nombre': fila.nombre_partido, 'siglas': fila.siglas}
+            for fila in db.session.query(
+                PartidosPoliticos.id_partido, PartidosPoliticos.nombre_partido, PartidosPoliticos.siglas
+            )
+        }
+        mesas = dict(db.session.query(CentrosVotacion.distrito, func.count(Mesas.id_mesa)).join(
+            Mesas, Mesas.id_centro == CentrosVotacion.id_centro
+        ).group_by(CentrosVotacion.distrito).all())
+        self.centros = {
+            distrito: {'centros': total, 'mesas': mesas.get(distrito, 0)}
+            for distrito, total in db.session.query(
+                CentrosVotacion.distrito, func.count(CentrosVotacion.id_centro)
+            ).group_by(CentrosVotacion.distrito)
+        }
+        self.completo = self._armar({})
+        return self
+
+    def _armar(self, filtros):
+        """Respuesta para 'filtros' ({posición en la celda: valor})."""
+        conteos = [defaultdict(int) for _ in FILTROS]
+        total = 0
+        for celda, n in self.celdas.items():
+            fallan = [i for i, valor in filtros.items() if celda[i] != valor]
+            if not fallan:
+                total += n
+                for i, valor in enumerate(celda):
+                    conteos[i][valor] += n
+            elif len(fallan) == 1:
+                # Sólo falla el filtro de su propia faceta: cuenta para ella
+                conteos[fallan[0]][celda[fallan[0]]] += n
+
+        facetas = {}
+        for i, nombre in FILTROS.values():
+            facetas[nombre] = [{'valor': valor, 'total': n} for valor, n in _ordenar(conteos[i])]
+        for entrada in facetas['partido']:
+            partido = self.partidos.get(entrada['valor'])
+            entrada['nombre'] = partido['nombre'] if partido else None
+            entrada['siglas'] = partido['siglas'] if partido else None
+
+        return {
+            'candidatos': dict(total=total, **facetas),
+            'centros': {
+                'total': sum(d['centros'] for d in self.centros.values()),
+                'mesas': sum(d['mesas'] for d in self.centros.values()),
+                'distrito': [
+                    {'valor': distrito, 'total': datos['centros'], 'mesas': datos['mesas']}
+                    for distrito, datos in sorted(
+                        self.centros.items(),
+                        key=lambda par: (-par[1]['centros'], par[0] is None, par[0] or '')
+                    )
+                ],
+            },
+            'filtros': {
+                parametro: filtros[i] for parametro, (i, _) in FILTROS.items() if i in filtros
+            },
+        }
+
+    def facetas(self, filtros):
+        if not filtros:
+            return self.completo
+        clave = tuple(sorted(filtros.items()))
+        respuesta = self.respuestas.get(clave)
+        if respuesta is None:
+            respuesta = self._armar(filtros)
+            # Vive lo que el índice: la reconstrucción crea una LRU nueva
+            self.respuestas.set(clave, respuesta, float('inf'))
+        return respuesta
+
+
+_versionado = IndiceVersionado(CONJUNTOS, lambda anterior: IndiceFacetas().cargar())
+
+
+def obtener_indice_facetas():
+    """Devuelve el índice, reconstruyéndolo si cambió alguno de CONJUNTOS."""
+    return _versionado.obtener()
+
+
+def obtener_facetas(args):
+    """
+    Facetas para los parámetros de la URL 'region', 'cargo' y 'partido'
+    (id_partido). Los valores se comparan exactos: son los de las propias
+    facetas, no subcadenas como en /api/candidatos.
+    """
+    filtros = {i: args[parametro] for parametro, (i, _) in FILTROS.items() if args.get(parametro)}
+    return obtener_indice_facetas().facetas(filtros)
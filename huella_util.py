@@ -0,0 +1,240 @@
+import io
+import time
+import numpy as np
+from extensions import db
+from models import PartidosPoliticos
+from indices_util import IndiceVersionado
+
+try:
+    from PIL import Image
+    PIL_DISPONIBLE = True
+except ImportError:  # Sin Pillow no se calculan huellas ni se identifica
+    Image = None
+    PIL_DISPONIBLE = False
+
+# --- Configuración ---
+TAM_DCT = 32              # Lado de la imagen reducida para el pHash
+TAM_HASH = 8              # 8x8 = 64 bits por hash
+K_MAXIMO = 20
+MAX_BYTES_CONSULTA = 5 * 1024 * 1024
+MAX_PIXELES = 25_000_000  # Una imagen pequeña muy comprimida puede ocupar GB al decodificarse
+TAM_LOTE_HUELLAS = 100
+# ---------------------
+
+# Huella = pHash (64 bits) + dHash (64 bits), en hexadecimal (32 caracteres)
+BITS_HUELLA = 2 * TAM_HASH * TAM_HASH
+# Valor guardado para un logo que no se pudo decodificar (p. ej. SVG): no
+# es NULL, así completar_huellas no lo vuelve a leer hasta que cambie el logo
+HUELLA_NO_SOPORTADA = ''
+FONDO = (255, 255, 255)   # Los símbolos de la cédula se imprimen sobre blanco
+
+
+def _matriz_dct(n):
+    """Matriz de la DCT-II ortonormal de tamaño n (DCT 2D = D @ X @ D.T)."""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d
+
+
+_DCT = _matriz_dct(TAM_DCT)
+_PESOS_BITS = (1 << np.arange(TAM_HASH * TAM_HASH - 1, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+def _a_entero(bits):
+    return int(np.sum(bits.ravel().astype(np.uint64) * _PESOS_BITS, dtype=np.uint64))
+
+
+def dimensiones(data):
+    """(ancho, alto) leídos de la cabecera, sin decodificar la imagen. ValueError si no es una imagen."""
+    try:
+        with Image.open(io.BytesIO(data)) as imagen:
+            return imagen.size
+    except Exception as e:
+        raise ValueError(str(e))
+
+
+def _gris(data):
+    with Image.open(io.BytesIO(data)) as imagen:
+        imagen.seek(0)
+        ancho, alto = imagen.size
+        if ancho * alto > MAX_PIXELES:
+            raise ValueError(f"{ancho}x{alto} píxeles supera el máximo de {MAX_PIXELES}")
+        imagen.load()
+        if imagen.mode in ('RGBA', 'LA', 'PA') or (imagen.mode == 'P' and 'transparency' in imagen.info):
+            rgba = imagen.convert('RGBA')
+            fondo = Image.new('RGB', rgba.size, FONDO)
+            fondo.paste(rgba, mask=rgba.getchannel('A'))
+            return fondo.convert('L')
+        return imagen.convert('L')
+
+
+def huella(data):
+    """
+    Huella perceptual de una imagen: pHash (DCT de 32x32, 8x8 coeficientes
+    de baja frecuencia contra su mediana) seguido de dHash (gradiente
+    horizontal en 9x8). Devuelve 32 caracteres hex, o None si no se puede
+    decodificar (quien llama decide si lo informa).
+    """
+    if not PIL_DISPONIBLE or not data:
+        return None
+    try:
+        gris = _gris(data)
+    except Exception:
+        return None
+
+    pixeles = np.asarray(gris.resize((TAM_DCT, TAM_DCT), Image.LANCZOS), dtype=np.float64)
+    bajas = (_DCT @ pixeles @ _DCT.T)[:TAM_HASH, :TAM_HASH]
+    # La mediana excluye el coeficiente DC (brillo medio)
+    phash = _a_entero(bajas > np.median(bajas.ravel()[1:]))
+
+    pequena = np.asarray(gris.resize((TAM_HASH + 1, TAM_HASH), Image.LANCZOS), dtype=np.int16)
+    dhash = _a_entero(pequena[:, 1:] > pequena[:, :-1])
+    return f'{phash:016x}{dhash:016x}'
+
+
+def huella_guardada(data):
+    """
+    Valor de logo_huella para un logo: su huella, o HUELLA_NO_SOPORTADA si
+    no se puede decodificar. None sólo si falta Pillow (queda pendiente).
+    """
+    if not PIL_DISPONIBLE:
+        return None
+    return huella(data) or HUELLA_NO_SOPORTADA
+
+
+def _empaquetar(huellas):
+    """Lista de huellas hex -> matriz (n, 2) de uint64."""
+    if not huellas:
+        return np.zeros((0, 2), dtype=np.uint64)
+    return np.array([(int(h[:16], 16), int(h[16:], 16)) for h in huellas], dtype=np.uint64)
+
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0: tabla de bits por byte
+    _BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x):
+        return _BITS_POR_BYTE[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1)
+
+
+def distancias_hamming(huellas, consulta):
+    """Distancia de Hamming (0..128) entre cada fila de 'huellas' y 'consulta'."""
+    return _popcount(huellas ^ consulta).sum(axis=1, dtype=np.int32)
+
+
+class IndiceLogos:
+    """
+    Huellas de todos los logos en una matriz NumPy (n, 2) de uint64. Una
+    búsqueda es un XOR + popcount vectorizado sobre toda la matriz y una
+    selección parcial de los k menores (argpartition).
+    """
+
+    def __init__(self, filas):
+        # filas: (id_partido, nombre_partido, siglas, logo_hash, logo_huella)
+        filas = [f for f in filas if f[4]]
+        self.datos = [
+            {'id_partido': f[0], 'nombre_partido': f[1], 'siglas': f[2], 'logo_hash': f[3]}
+            for f in filas
+        ]
+        self.huellas = _empaquetar([f[4] for f in filas])
+
+    def __len__(self):
+        return len(self.datos)
+
+    def buscar(self, huella_consulta, k=5):
+        """Los k logos más parecidos, con su distancia y similitud (0..1)."""
+        if not len(self) or not huella_consulta:
+            return []
+        d = distancias_hamming(self.huellas, _empaquetar([huella_consulta])[0])
+        k = min(k, len(d))
+        mejores = np.argpartition(d, k - 1)[:k]
+        mejores = mejores[np.argsort(d[mejores], kind='stable')]
+        return [
+            dict(self.datos[i], distancia=int(d[i]), similitud=round(1 - int(d[i]) / BITS_HUELLA, 4))
+            for i in mejores
+        ]
+
+
+def completar_huellas():
+    """
+    Calcula la huella de los logos que aún no la tienen (filas cargadas
+    antes de esta columna). Los que no se pueden decodificar quedan con
+    HUELLA_NO_SOPORTADA. No confirma la transacción; devuelve cuántas
+    huellas calculó.
+    """
+    if not PIL_DISPONIBLE:
+        return 0
+    pendientes = [fila[0] for fila in db.session.query(PartidosPoliticos.id_partido).filter(
+        PartidosPoliticos.logo_hash.isnot(None),
+        PartidosPoliticos.logo_huella.is_(None)
+    ).all()]
+    actualizadas = 0
+    for i in range(0, len(pendientes), TAM_LOTE_HUELLAS):
+        lote = db.session.query(PartidosPoliticos.id_partido, PartidosPoliticos.logo_blob).filter(
+            PartidosPoliticos.id_partido.in_(pendientes[i:i + TAM_LOTE_HUELLAS])
+        ).all()
+        for id_partido, data in lote:
+            valor = huella_guardada(data)
+            db.session.query(PartidosPoliticos).filter_by(id_partido=id_partido).update(
+                {PartidosPoliticos.logo_huella: valor}, synchronize_session=False
+            )
+            if valor != HUELLA_NO_SOPORTADA:
+                actualizadas += 1
+    if pendientes:
+        print(f"Huellas de logos: {actualizadas} calculadas, {len(pendientes) - actualizadas} sin formato soportado.")
+    return actualizadas
+
+
+def construir_indice_logos(anterior=None):
+    """Reconstruye el índice desde las huellas guardadas (no lee los BLOBs)."""
+    filas = db.session.query(
+        PartidosPoliticos.id_partido,
+        PartidosPoliticos.nombre_partido,
+        PartidosPoliticos.siglas,
+        PartidosPoliticos.logo_hash,
+        PartidosPoliticos.logo_huella
+    ).filter(
+        PartidosPoliticos.logo_huella.isnot(None),
+        PartidosPoliticos.logo_huella != HUELLA_NO_SOPORTADA
+    ).all()
+    return IndiceLogos(filas)
+
+
+_versionado = IndiceVersionado(('partidos',), construir_indice_logos)
+
+
+def obtener_indice_logos():
+    """Devuelve el índice, reconstruyéndolo si cambió la versión de 'partidos'."""
+    return _versionado.obtener()
+
+
+# --- Benchmark: python huella_util.py ---
+
+if __name__ == "__main__":
+    import sys
+
+    rng = np.random.default_rng(0)
+    repeticiones = 200
+    print(f"Búsqueda top-5 por distancia de Hamming ({BITS_HUELLA} bits), mediana de {repeticiones} consultas:")
+    for n in (1000, 5000, 20000, 100000):
+        huellas = [f'{a:016x}{b:016x}' for a, b in rng.integers(0, 2**64 - 1, size=(n, 2), dtype=np.uint64, endpoint=True)]
+        indice = IndiceLogos([(str(i), f'Partido {i}', None, None, h) for i, h in enumerate(huellas)])
+        consultas = [huellas[i] for i in rng.integers(0, n, size=repeticiones)]
+        tiempos = []
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            resultado = indice.buscar(consulta, 5)
+            tiempos.append(time.perf_counter() - inicio)
+            assert resultado[0]['distancia'] == 0
+        print(f"  {n:7} logos: {np.median(tiempos) * 1000:.3f} ms")
+
+    if PIL_DISPONIBLE and len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            data = f.read()
+        inicio = time.perf_counter()
+        for _ in range(20):
+            huella(data)
+        print(f"Huella de {sys.argv[1]}: {(time.perf_counter() - inicio) / 20 * 1000:.1f} ms")
@@ -0,0 +1,218 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, jsonify, request
+from sqlalchemy import String, cast, exists
+from extensions import db
+from models import VariantesImagen
+from media_util import hash_blob, servir_blob, aplicar_cache
+from carga_masiva_util import insertar_en_lotes
+
+try:
+    from PIL import Image, ImageOps
+    PIL_DISPONIBLE = True
+except ImportError:  # Sin Pillow se sirven sólo los originales
+    Image = ImageOps = None
+    PIL_DISPONIBLE = False
+
+# --- Configuración ---
+TAMANOS = (64, 256, 0)          # Lado mayor en píxeles; 0 = tamaño original
+FORMATOS = ('webp', 'jpeg')
+CALIDAD = {'webp': 80, 'jpeg': 85}
+FONDO_JPEG = (255, 255, 255)    # JPEG no tiene transparencia: se aplana sobre blanco
+TAM_LOTE_IMAGENES = 100         # Originales leídos de la BD por lote
+MAX_HILOS = min(8, os.cpu_count() or 1)
+# ---------------------
+
+MIMETYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+# Valores aceptados en ?size=
+TAMANOS_POR_NOMBRE = {str(t): t for t in TAMANOS if t}
+TAMANOS_POR_NOMBRE['original'] = 0
+
+# Marca de "imagen sin variantes" (no se pudo decodificar, p. ej. SVG): una
+# fila con este tamaño y sin datos, con el hash_origen de la imagen, para
+# que las cargas siguientes no la vuelvan a leer y decodificar. Nunca
+# coincide con un ?size= y la petición cae al original.
+TAMANO_SIN_VARIANTES = -1
+
+
+def _marca_sin_variantes():
+    return {'tamano': TAMANO_SIN_VARIANTES, 'formato': '', 'datos': b'', 'hash': '', 'ancho': 0, 'alto': 0}
+
+
+def _codificar(imagen, formato):
+    buffer = io.BytesIO()
+    if formato == 'jpeg':
+        if imagen.mode in ('RGBA', 'LA'):
+            fondo = Image.new('RGB', imagen.size, FONDO_JPEG)
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            imagen = fondo
+        elif imagen.mode != 'RGB':
+            imagen = imagen.convert('RGB')
+        # comment=b'': Pillow copiaría el comentario COM del original
+        imagen.save(buffer, 'JPEG', quality=CALIDAD['jpeg'], optimize=True, progressive=True, comment=b'')
+    else:
+        imagen.save(buffer, 'WEBP', quality=CALIDAD['webp'], method=4)
+    return buffer.getvalue()
+
+
+def generar_variantes(data):
+    """
+    Decodifica la imagen y devuelve sus variantes como dicts
+    {tamano, formato, datos, hash, ancho, alto}. Al recodificar se
+    descartan los metadatos (EXIF, ICC, comentarios) y se aplica la
+    orientación EXIF. Nunca se amplía una imagen pequeña.
+
+    Devuelve [] si Pillow no está instalado o el formato no es soportado
+    (p. ej. SVG).
+    """
+    if not PIL_DISPONIBLE or not data:
+        return []
+    try:
+        with Image.open(io.BytesIO(data)) as origen:
+            origen.seek(0)  # GIF animado: primer cuadro
+            imagen = ImageOps.exif_transpose(origen)
+            imagen.load()
+    except Exception as e:
+        print(f"Advertencia: no se pudo decodificar la imagen ({e}).")
+        return []
+
+    if imagen.mode not in ('RGB', 'RGBA'):
+        tiene_alfa = imagen.mode in ('LA', 'PA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+        imagen = imagen.convert('RGBA' if tiene_alfa else 'RGB')
+
+    variantes = []
+    for tamano in TAMANOS:
+        escalada = imagen
+        if tamano and max(imagen.size) > tamano:
+            escalada = imagen.copy()
+            escalada.thumbnail((tamano, tamano), Image.LANCZOS)
+        for formato in FORMATOS:
+            datos = _codificar(escalada, formato)
+            variantes.append({
+                'tamano': tamano,
+                'formato': formato,
+                'datos': datos,
+                'hash': hash_blob(datos),
+                'ancho': escalada.width,
+                'alto': escalada.height,
+            })
+    return variantes
+
+
+def _id_texto(pk):
+    return pk if pk.type.python_type is str else cast(pk, String(36))
+
+
+def _borrar_huerfanas(tipo, pk):
+    """Variantes cuya entidad ya no existe (borrada o tabla vaciada)."""
+    existe = exists().where(_id_texto(pk) == VariantesImagen.id_entidad)
+    return db.session.query(VariantesImagen).filter(
+        VariantesImagen.tipo == tipo, ~existe
+    ).delete(synchronize_session=False)
+
+
+def actualizar_variantes(tipo, modelo, blob_attr, hash_attr):
+    """
+    Pone al día las variantes de 'tipo' tras una carga: borra las huérfanas
+    y genera las de las filas cuya imagen no tiene variantes o las tiene de
+    una imagen anterior (hash_origen distinto). Los originales se leen por
+    lotes y se procesan en paralelo; los que no se pueden decodificar quedan
+    marcados (TAMANO_SIN_VARIANTES) hasta que cambie la imagen. No confirma
+    la transacción.
+    Devuelve el número de imágenes procesadas.
+    """
+    if not PIL_DISPONIBLE:
+        return 0
+
+    pk = modelo.__mapper__.primary_key[0]
+    col_blob = getattr(modelo, blob_attr)
+    col_hash = getattr(modelo, hash_attr)
+    _borrar_huerfanas(tipo, pk)
+
+    vigentes = exists().where(
+        VariantesImagen.tipo == tipo,
+        VariantesImagen.id_entidad == _id_texto(pk),
+        VariantesImagen.hash_origen == col_hash
+    )
+    pendientes = [fila[0] for fila in db.session.query(pk).filter(col_hash.isnot(None), ~vigentes).all()]
+    if not pendientes:
+        return 0
+
+    bytes_origen = bytes_variantes = omitidas = 0
+    with ThreadPoolExecutor(max_workers=MAX_HILOS) as pool:
+        for i in range(0, len(pendientes), TAM_LOTE_IMAGENES):
+            ids = pendientes[i:i + TAM_LOTE_IMAGENES]
+            # Variantes de la imagen anterior, si las había
+            db.session.query(VariantesImagen).filter(
+                VariantesImagen.tipo == tipo,
+                VariantesImagen.id_entidad.in_([str(x) for x in ids])
+            ).delete(synchronize_session=False)
+
+            lote = db.session.query(pk, col_blob, col_hash).filter(pk.in_(ids)).all()
+            filas = []
+            for (id_entidad, data, digest), variantes in zip(lote, pool.map(lambda f: generar_variantes(f[1]), lote)):
+                if not variantes:
+                    omitidas += 1  # Formato no soportado (p. ej. SVG): se sirve el original
+                    variantes = [_marca_sin_variantes()]
+                else:
+                    bytes_origen += len(data)
+                for variante in variantes:
+                    variante.update(tipo=tipo, id_entidad=str(id_entidad), hash_origen=digest)
+                    filas.append(variante)
+                    if variante['tamano'] == 0 and variante['formato'] == 'webp':
+                        bytes_variantes += len(variante['datos'])
+            insertar_en_lotes(VariantesImagen, filas)
+
+    print(f"Variantes de {tipo}: {len(pendientes) - omitidas} imágenes procesadas "
+          f"({bytes_origen // 1024} KB originales, {bytes_variantes // 1024} KB en WebP a tamaño original), "
+          f"{omitidas} sin formato soportado (marcadas, no se reintentan).")
+    return len(pendientes) - omitidas
+
+
+def _formato_preferido():
+    """WebP si el cliente lo acepta (o lo pide con ?formato=), si no JPEG."""
+    formato = request.args.get('formato')
+    if formato in FORMATOS:
+        return formato
+    return 'webp' if request.accept_mimetypes['image/webp'] else 'jpeg'
+
+
+def servir_imagen(tipo, id_entidad, blob_col, hash_col, criterio):
+    """
+    Sirve una imagen de /api/media. Sin '?size=' responde con el original
+    (servir_blob). Con '?size=64|256|original' responde con la variante
+    pre-generada en WebP o JPEG según el Accept, sin redimensionar en la
+    petición; si aún no existe, cae al original.
+    """
+    size = request.args.get('size')
+    if not size:
+        return servir_blob(blob_col, hash_col, criterio)
+    if size not in TAMANOS_POR_NOMBRE:
+        return jsonify({"error": f"'size' debe ser uno de: {', '.join(TAMANOS_POR_NOMBRE)}"}), 400
+
+    formato = _formato_preferido()
+    criterio_variante = (
+        (VariantesImagen.tipo == tipo)
+        & (VariantesImagen.id_entidad == str(id_entidad))
+        & (VariantesImagen.tamano == TAMANOS_POR_NOMBRE[size])
+        & (VariantesImagen.formato == formato)
+    )
+
+    if request.if_none_match:
+        fila = db.session.query(VariantesImagen.hash, VariantesImagen.hash_origen).filter(criterio_variante).first()
+        if fila and request.if_none_match.contains(fila[0]):
+            response = aplicar_cache(Response(status=304), fila[0], version=fila[1])
+            response.vary.add('Accept')
+            return response
+
+    fila = db.session.query(
+        VariantesImagen.datos, VariantesImagen.hash, VariantesImagen.hash_origen
+    ).filter(criterio_variante).first()
+    if fila is None:
+        return servir_blob(blob_col, hash_col, criterio)
+
+    datos, digest, origen = fila
+    response = aplicar_cache(Response(datos, mimetype=MIMETYPES[formato]), digest, version=origen)
+    response.vary.add('Accept')
+    return response
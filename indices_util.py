@@ -0,0 +1,77 @@
+import threading
+import time
+from flask import g, has_request_context
+from models import leer_versiones
+
+# --- Configuración ---
+INTERVALO_VERSION = 5   # Segundos entre lecturas de VersionDatos: las consultas repetidas no tocan la BD
+# ---------------------
+
+
+class IndiceVersionado:
+    """
+    Índice en memoria del proceso (búsqueda, mapa, logos, padrón, facetas)
+    que se reconstruye sólo cuando cambia la versión de sus 'conjuntos' en
+    VersionDatos: los scrapers y las cargas la incrementan al confirmar.
+
+    'construir(anterior)' arma el índice desde la BD (recibe el anterior o
+    None, para los que se actualizan de forma incremental). Se llama bajo
+    un lock: mientras un hilo reconstruye, los demás siguen respondiendo
+    con el índice anterior; sólo esperan si todavía no hay ninguno.
+
+    En una petición con caché de respuestas, obtener() usa las versiones
+    con las que cache_util armó la clave (g.versiones_datos): si difieren
+    del índice, lo verifica en el acto y espera la reconstrucción, para no
+    guardar una respuesta del índice viejo bajo la clave de la versión nueva.
+    """
+
+    def __init__(self, conjuntos, construir):
+        self.conjuntos = tuple(conjuntos)
+        self.construir = construir
+        self.valor = None
+        self.version = None
+        self.verificado = 0.0
+        self._lock = threading.Lock()
+
+    def _version_actual(self):
+        versiones = leer_versiones()
+        return tuple(versiones.get(c, 0) for c in self.conjuntos)
+
+    def obtener(self, versiones=None):
+        valor = self.valor
+        if versiones is None and has_request_context():
+            versiones = g.get('versiones_datos')
+        if versiones is not None:
+            version = tuple(versiones.get(c, 0) for c in self.conjuntos)
+            if valor is not None and version == self.version:
+                return valor
+            return self._actualizar(self._version_actual(), esperar=True)
+
+        ahora = time.monotonic()
+        if valor is not None and ahora - self.verificado < INTERVALO_VERSION:
+            return valor
+
+        # La versión se lee antes que los datos: si cambia durante la
+        # reconstrucción, la próxima verificación vuelve a reconstruir
+        version = self._version_actual()
+        if valor is not None and version == self.version:
+            self.verificado = ahora
+            return valor
+        return self._actualizar(version, esperar=valor is None)
+
+    def _actualizar(self, version, esperar):
+        if not self._lock.acquire(blocking=esperar):
+            return self.valor  # Otro hilo ya está reconstruyendo
+        try:
+            if self.valor is None or self.version != version:
+                self.valor = self.construir(self.valor)
+                self.version = version
+            self.verificado = time.monotonic()
+            return self.valor
+        finally:
+            self._lock.release()
+
+    def invalidar(self):
+        """Fuerza la reconstrucción en el próximo acceso (p. ej. tras editar la BD a mano)."""
+        self.verificado = 0.0
+        self.version = None
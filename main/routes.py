@@ -1,75 +1,166 @@
-import base64
-from flask import Blueprint, render_template, jsonify, request
-from models import PartidosPoliticos, CentrosVotacion, Candidatos
+from flask import Blueprint, current_app, render_template, jsonify, request
+from models import (
+    PartidosPoliticos, Candidatos,
+    Mesas,
+    consulta_partidos, consulta_candidatos, consulta_mesas,
+    seleccion_partidos, seleccion_candidatos
+)
 from extensions import db
+from media_util import url_media
+from serializacion_util import Serializador, respuesta_json, a_iso
+from imagen_util import servir_imagen
+from paginacion_util import leer_paginacion, aplicar_keyset, respuesta_pagina, respuesta_stream
+from busqueda_util import obtener_indice, LIMITE_RESULTADOS, MAX_COINCIDENCIAS
+from huella_util import (
+    huella, dimensiones, obtener_indice_logos, K_MAXIMO, MAX_BYTES_CONSULTA, MAX_PIXELES, PIL_DISPONIBLE
+)
+from cache_util import cache
+from compresion_util import compresion
+from bundle_util import servir_bundle
+from delta_util import cambios_desde, leer_token, TokenExpirado
+from replicas_util import lectura_en_replicas, en_escritor
+from padron_util import ubicacion_por_mesa
+from facetas_util import obtener_facetas
+from asgi_util import vista_async
 
 main = Blueprint('main', __name__)
+lectura_en_replicas(main)
 
 @main.route('/')
 def index():
-    """Ruta principal (web)."""
-    centros_query = CentrosVotacion.query.all()
-    centros = [
-        {
-            "id_centro": c.id_centro,
-            "nombre": c.nombre,
-            "distrito": c.distrito,
-            "latitud": float(c.latitud) if c.latitud is not None else None,
-            "longitud": float(c.longitud) if c.longitud is not None else None,
-            "ubicacion_detalle": c.mesas[0].ubicacion_detalle if c.mesas else None
-        }
-        for c in centros_query
-    ]
-    return render_template('index.html', centros=centros)
+    """
+    Ruta principal (web). El mapa pide por JS sólo los clusters/centros
+    visibles (/mapa/api/clusters), no se incrustan todos en la página.
+    """
+    return render_template('index.html')
 
 # --- INICIO: API PARA LA APP MÓVIL ---
 
+def _url_logo(partido):
+    return url_media('main.media_partido', partido.logo_hash, id_partido=partido.id_partido)
+
+
+_serializar_partido = Serializador({
+    'id_partido': 'id_partido',
+    'jne_id_simbolo': 'jne_id_simbolo',
+    'nombre_partido': 'nombre_partido',
+    'siglas': 'siglas',
+    'fecha_inscripcion': ('fecha_inscripcion', a_iso),
+
+    # El logo se descarga aparte desde /api/media (cacheable por hash)
+    'logo_url': _url_logo,
+    'logo_hash': 'logo_hash',
+
+    'direccion_legal': 'direccion_legal',
+    'telefonos': 'telefonos',
+    'sitio_web': 'sitio_web',
+    'email_contacto': 'email_contacto',
+    'personero_titular': 'personero_titular',
+    'personero_alterno': 'personero_alterno',
+    'ideologia': 'ideologia'
+})
+
+# Lo usan /api/candidatos y la vista web /candidatos
+_serializar_candidato = Serializador({
+    'id': 'id',
+    'nombre_completo': 'nombre_completo',
+    'tipo_candidatura': 'tipo_candidatura',
+    'perfil_url': 'perfil_url',
+    'region': 'region',
+    'biografia': 'biografia',
+    'imagen_url': lambda c: url_media('main.media_candidato', c.imagen_hash, id_candidato=c.id),
+    'imagen_hash': 'imagen_hash',
+    'partido': Serializador({
+        'nombre': 'partido_politico.nombre_partido',
+        'siglas': 'partido_politico.siglas',
+        'logo_url': lambda c: _url_logo(c.partido_politico),
+        'logo_hash': 'partido_politico.logo_hash'
+    })
+})
+
+
 @main.route('/api/partidos')
+@cache.cachear('partidos')
 def get_partidos():
     """
     Endpoint de API para obtener todos los partidos políticos
     y servirlos a la app de React Native.
+
+    Parámetros opcionales:
+    - limit / cursor: paginación por clave sobre 'id_partido'
+      (el cursor siguiente llega en la cabecera X-Next-Cursor).
+    - stream=1: arreglo JSON enviado por fragmentos.
     """
+    try:
+        limit, cursor, stream = leer_paginacion()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Consultar la base de datos usando el modelo PartidosPoliticos
-        partidos = PartidosPoliticos.query.all()
-        
-        lista_partidos_json = []
-        for partido in partidos:
-            
-            # Codificar el logo BLOB a base64 para enviarlo como string en el JSON
-            # La app móvil puede decodificar esto para mostrar la imagen.
-            logo_base64 = None
-            if partido.logo_blob:
-                # 'utf-8' es el encoding del string base64, no de la imagen
-                logo_base64 = base64.b64encode(partido.logo_blob).decode('utf-8')
-
-            lista_partidos_json.append({
-                'id_partido': partido.id_partido,
-                'jne_id_simbolo': partido.jne_id_simbolo,
-                'nombre_partido': partido.nombre_partido,
-                'siglas': partido.siglas,
-                'fecha_inscripcion': partido.fecha_inscripcion.isoformat() if partido.fecha_inscripcion else None,
-                
-                # Devuelve el logo como un string base64
-                'logo_base64': logo_base64, 
-                
-                'direccion_legal': partido.direccion_legal,
-                'telefonos': partido.telefonos,
-                'sitio_web': partido.sitio_web,
-                'email_contacto': partido.email_contacto,
-                'personero_titular': partido.personero_titular,
-                'personero_alterno': partido.personero_alterno,
-                'ideologia': partido.ideologia
-            })
-            
+        query = consulta_partidos()
+
+        if stream:
+            query = aplicar_keyset(query, PartidosPoliticos.id_partido, cursor, None)
+            return respuesta_stream(query, _serializar_partido, limit)
+
+        if limit is not None or cursor is not None:
+            query = aplicar_keyset(query, PartidosPoliticos.id_partido, cursor, limit)
+
         # Devolver la lista de partidos como una respuesta JSON
-        return jsonify(lista_partidos_json)
+        return respuesta_pagina(query.all(), _serializar_partido, 'id_partido', limit)
 
-    except Exception as e:
-        print(f"Error en /api/partidos: {e}")
+    except Exception:
+        current_app.logger.exception("Error en /api/partidos")
         # Devolver un error 500 en formato JSON si algo falla
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@vista_async('main.get_partidos', delegar_si=('stream',))
+@cache.cachear_async('partidos')
+async def get_partidos_async(sesion):
+    """get_partidos() en modo ASGI (AsyncSession); misma respuesta."""
+    try:
+        limit, cursor, _ = leer_paginacion()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query = seleccion_partidos()
+        if limit is not None or cursor is not None:
+            query = aplicar_keyset(query, PartidosPoliticos.id_partido, cursor, limit)
+
+        filas = (await sesion.scalars(query)).all()
+        return respuesta_pagina(filas, _serializar_partido, 'id_partido', limit)
+
+    except Exception:
+        current_app.logger.exception("Error en /api/partidos")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/media/partido/<id_partido>')
+def media_partido(id_partido):
+    """
+    Sirve el logo del partido (con ETag y caché larga). Con ?size=64|256|original
+    devuelve la variante pre-generada en WebP/JPEG en lugar del original.
+    """
+    return servir_imagen(
+        'partido', id_partido,
+        PartidosPoliticos.logo_blob,
+        PartidosPoliticos.logo_hash,
+        PartidosPoliticos.id_partido == id_partido
+    )
+
+
+@main.route('/api/media/candidato/<int:id_candidato>')
+def media_candidato(id_candidato):
+    """Sirve la foto del candidato (admite ?size= igual que el logo del partido)."""
+    return servir_imagen(
+        'candidato', id_candidato,
+        Candidatos.imagen_blob,
+        Candidatos.imagen_hash,
+        Candidatos.id == id_candidato
+    )
 
 # --- FIN: API PARA LA APP MÓVIL ---
 
@@ -95,98 +186,295 @@ def candidatos_view():
     """
     try:
         # Obtén todos los candidatos de la base de datos con su partido asociado
-        candidatos_db = db.session.query(Candidatos).join(
-            PartidosPoliticos, 
-            Candidatos.partido_politico_id == PartidosPoliticos.id_partido
-        ).all()
-
-        candidatos_serializados = []
-        for candidato in candidatos_db:
-            imagen_base64 = None
-            if candidato.imagen_blob:
-                imagen_base64 = base64.b64encode(candidato.imagen_blob).decode('utf-8')
-
-            # Codificar el logo del partido a base64
-            logo_partido_base64 = None
-            if candidato.partido_politico and candidato.partido_politico.logo_blob:
-                logo_partido_base64 = base64.b64encode(candidato.partido_politico.logo_blob).decode('utf-8')
-
-            candidatos_serializados.append({
-                'id': candidato.id,
-                'nombre_completo': candidato.nombre_completo,
-                'tipo_candidatura': candidato.tipo_candidatura,
-                'perfil_url': candidato.perfil_url,
-                'region': candidato.region,
-                'biografia': candidato.biografia,
-                'imagen_base64': imagen_base64,
-                'partido': {
-                    'nombre': candidato.partido_politico.nombre_partido,
-                    'siglas': candidato.partido_politico.siglas,
-                    'logo_base64': logo_partido_base64
-                }
-            })
+        candidatos_db = consulta_candidatos().all()
+
+        # Mismo serializador que /api/candidatos
+        candidatos_serializados = _serializar_candidato.lista(candidatos_db)
 
         # Pasa la lista serializada a la plantilla
         return render_template('candidatos.html', candidatos=candidatos_serializados)
 
-    except Exception as e:
-        print(f"Error en /candidatos: {e}")
+    except Exception:
+        current_app.logger.exception("Error en /candidatos")
         # Opcional: Renderizar una plantilla de error o pasar una lista vacía
-        return render_template('candidatos.html', candidatos=[], error=str(e))
+        return render_template('candidatos.html', candidatos=[], error="No se pudieron cargar los candidatos")
+
+
+def _filtrar_candidatos(query):
+    """Filtros 'region' y 'cargo' (sirve para la Query síncrona y el select() asíncrono)."""
+    region = request.args.get('region', None)
+    cargo = request.args.get('cargo', None)
+    if region:
+        query = query.filter(Candidatos.region.ilike(f'%{region}%'))
+    if cargo:
+        query = query.filter(Candidatos.tipo_candidatura.ilike(f'%{cargo}%'))
+    return query
 
 
 @main.route('/api/candidatos')
+@cache.cachear('candidatos', 'partidos')
 def api_candidatos():
     """
     Endpoint de API para obtener los candidatos con filtros.
+    Acepta además 'limit', 'cursor' (sobre Candidatos.id) y 'stream=1',
+    igual que /api/partidos, y 'q' para búsqueda libre (nombre, región,
+    partido) resuelta con el índice en memoria. Con 'q' los resultados
+    siguen el orden del ranking (como mucho MAX_COINCIDENCIAS), el cursor
+    es el último id recibido y 'stream' no aplica.
+    """
+    try:
+        limit, cursor, stream = leer_paginacion(int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        texto = request.args.get('q', None)
+
+        # Construir la consulta y aplicar los filtros que se proporcionen
+        query = _filtrar_candidatos(consulta_candidatos())
+        if texto:
+            ids = [r['id'] for r in obtener_indice().buscar(texto, tipo='candidato', limite=MAX_COINCIDENCIAS)]
+            if cursor is not None:
+                ids = ids[ids.index(cursor) + 1:] if cursor in ids else []
+            posicion = {id_candidato: i for i, id_candidato in enumerate(ids)}
+            filas = sorted(query.filter(Candidatos.id.in_(ids)).all(), key=lambda c: posicion[c.id])
+            if limit is not None:
+                filas = filas[:limit + 1]
+            return respuesta_pagina(filas, _serializar_candidato, 'id', limit)
+
+        if stream:
+            query = aplicar_keyset(query, Candidatos.id, cursor, None)
+            return respuesta_stream(query, _serializar_candidato, limit)
+
+        if limit is not None or cursor is not None:
+            query = aplicar_keyset(query, Candidatos.id, cursor, limit)
+
+        # Ejecutar la consulta y serializar los resultados
+        return respuesta_pagina(query.all(), _serializar_candidato, 'id', limit)
+
+    except Exception:
+        current_app.logger.exception("Error en /api/candidatos")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+# 'q' usa el índice de búsqueda en memoria: esa variante la atiende la vista síncrona
+@vista_async('main.api_candidatos', delegar_si=('q', 'stream'))
+@cache.cachear_async('candidatos', 'partidos')
+async def api_candidatos_async(sesion):
+    """api_candidatos() en modo ASGI (AsyncSession); misma respuesta."""
+    try:
+        limit, cursor, _ = leer_paginacion(int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query = _filtrar_candidatos(seleccion_candidatos())
+        if limit is not None or cursor is not None:
+            query = aplicar_keyset(query, Candidatos.id, cursor, limit)
+
+        filas = (await sesion.scalars(query)).all()
+        return respuesta_pagina(filas, _serializar_candidato, 'id', limit)
+
+    except Exception:
+        current_app.logger.exception("Error en /api/candidatos")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+_serializar_mesa = Serializador({
+    'id_mesa': 'id_mesa',
+    'numero_mesa': 'numero_mesa',
+    'ubicacion_detalle': 'ubicacion_detalle',
+    'id_centro': 'id_centro'
+})
+
+
+@main.route('/api/mesas')
+@cache.cachear('centros')
+def api_mesas():
+    """
+    Mesas de sufragio (las pide la app en services/api.ts).
+    Parámetros opcionales: 'centro' (id_centro), 'limit' / 'cursor' (sobre
+    id_mesa) y 'stream=1', igual que /api/partidos.
+    """
+    try:
+        limit, cursor, stream = leer_paginacion(int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query = consulta_mesas()
+        centro = request.args.get('centro')
+        if centro:
+            query = query.filter(Mesas.id_centro == centro)
+
+        if stream:
+            query = aplicar_keyset(query, Mesas.id_mesa, cursor, None)
+            return respuesta_stream(query, _serializar_mesa, limit)
+
+        if limit is not None or cursor is not None:
+            query = aplicar_keyset(query, Mesas.id_mesa, cursor, limit)
+
+        return respuesta_pagina(query.all(), _serializar_mesa, 'id_mesa', limit)
+
+    except Exception:
+        current_app.logger.exception("Error en /api/mesas")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/mesas/<numero_mesa>')
+def api_mesa(numero_mesa):
+    """Una mesa por su número, con su centro y coordenadas (índice en memoria)."""
+    try:
+        ubicacion = ubicacion_por_mesa(numero_mesa)
+    except Exception:
+        current_app.logger.exception("Error en /api/mesas/%s", numero_mesa)
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+    if ubicacion is None:
+        return jsonify({"error": "Mesa no encontrada"}), 404
+    return respuesta_json(ubicacion)
+
+
+@main.route('/api/facetas')
+def api_facetas():
+    """
+    Conteos para navegar por facetas sin descargar /api/candidatos:
+    candidatos por región, tipo de candidatura y partido, y centros y mesas
+    por distrito. Filtros opcionales (valores exactos de las facetas):
+    'region', 'cargo' y 'partido' (id_partido); cada faceta se cuenta con
+    los filtros de las demás. Se sirve del índice en memoria (facetas_util).
+    """
+    try:
+        return respuesta_json(obtener_facetas(request.args))
+    except Exception:
+        current_app.logger.exception("Error en /api/facetas")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/buscar')
+def api_buscar():
+    """
+    Búsqueda rápida (sin tildes ni mayúsculas, por prefijo y difusa) sobre
+    candidatos, partidos y centros de votación.
+    Parámetros: q (obligatorio), tipo (candidato|partido|centro), limit.
+    """
+    q = request.args.get('q', '').strip()
+    tipo = request.args.get('tipo') or None
+    try:
+        limite = max(1, min(int(request.args.get('limit', LIMITE_RESULTADOS)), 100))
+    except ValueError:
+        return jsonify({"error": "'limit' debe ser un número"}), 400
+
+    if not q:
+        return jsonify([])
+
+    try:
+        return jsonify(obtener_indice().buscar(q, tipo=tipo, limite=limite))
+    except Exception:
+        current_app.logger.exception("Error en /api/buscar")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/partidos/identificar', methods=['POST'])
+def identificar_partido():
     """
+    Identifica el partido a partir de una foto de su símbolo (p. ej. desde
+    la cámara de la app). La imagen llega como multipart ('imagen') o como
+    cuerpo crudo; devuelve los k logos más parecidos por distancia de
+    Hamming entre huellas perceptuales. Parámetro opcional: k (máx. 20).
+    """
+    if not PIL_DISPONIBLE:
+        return jsonify({"error": "El reconocimiento de logos requiere Pillow en el servidor"}), 503
+    # Sin Content-Length no se sabe el tamaño sin leer todo el cuerpo
+    if request.content_length is None:
+        return jsonify({"error": "Se requiere la cabecera Content-Length"}), 413
+    if request.content_length > MAX_BYTES_CONSULTA:
+        return jsonify({"error": f"La imagen supera {MAX_BYTES_CONSULTA // (1024 * 1024)} MB"}), 413
+    try:
+        k = min(max(int(request.args.get('k', 5)), 1), K_MAXIMO)
+    except ValueError:
+        return jsonify({"error": "'k' debe ser un número"}), 400
+
+    archivo = request.files.get('imagen')
+    data = archivo.read(MAX_BYTES_CONSULTA + 1) if archivo else request.get_data()
+    if not data:
+        return jsonify({"error": "Falta la imagen ('imagen' en multipart o en el cuerpo)"}), 400
+    if len(data) > MAX_BYTES_CONSULTA:
+        return jsonify({"error": f"La imagen supera {MAX_BYTES_CONSULTA // (1024 * 1024)} MB"}), 413
     try:
-        # Obtener parámetros de consulta
-        region = request.args.get('region', None)
-        cargo = request.args.get('cargo', None)
-
-        # Construir la consulta inicial
-        query = db.session.query(Candidatos).join(PartidosPoliticos, Candidatos.partido_politico_id == PartidosPoliticos.id_partido)
-
-        # Aplicar filtros si se proporcionan
-        if region:
-            query = query.filter(Candidatos.region.ilike(f'%{region}%'))
-        if cargo:
-            query = query.filter(Candidatos.tipo_candidatura.ilike(f'%{cargo}%'))
-
-        # Ejecutar la consulta
-        candidatos = query.all()
-
-        # Serializar los resultados
-        lista_candidatos = []
-        for candidato in candidatos:
-            # Codificar la imagen del candidato a base64
-            imagen_base64 = None
-            if candidato.imagen_blob:
-                imagen_base64 = base64.b64encode(candidato.imagen_blob).decode('utf-8')
-
-            # Codificar el logo del partido a base64
-            logo_base64 = None
-            if candidato.partido_politico and candidato.partido_politico.logo_blob:
-                logo_base64 = base64.b64encode(candidato.partido_politico.logo_blob).decode('utf-8')
-
-            lista_candidatos.append({
-                'id': candidato.id,
-                'nombre_completo': candidato.nombre_completo,
-                'tipo_candidatura': candidato.tipo_candidatura,
-                'perfil_url': candidato.perfil_url,
-                'region': candidato.region,
-                'biografia': candidato.biografia,
-                'imagen_base64': imagen_base64,
-                'partido': {
-                    'nombre': candidato.partido_politico.nombre_partido,
-                    'siglas': candidato.partido_politico.siglas,
-                    'logo_base64': logo_base64
-                }
-            })
-        
-        return jsonify(lista_candidatos)
-
-    except Exception as e:
-        print(f"Error en /api/candidatos: {e}")
-        return jsonify({"error": str(e)}), 500
+        ancho, alto = dimensiones(data)
+    except ValueError:
+        return jsonify({"error": "No se pudo leer la imagen"}), 400
+    if ancho * alto > MAX_PIXELES:
+        return jsonify({"error": f"La imagen supera {MAX_PIXELES // 1_000_000} megapíxeles"}), 413
+
+    huella_consulta = huella(data)
+    if huella_consulta is None:
+        return jsonify({"error": "No se pudo leer la imagen"}), 400
+
+    try:
+        resultados = obtener_indice_logos().buscar(huella_consulta, k)
+        for resultado in resultados:
+            resultado['logo_url'] = url_media(
+                'main.media_partido', resultado.pop('logo_hash'), id_partido=resultado['id_partido']
+            )
+        return jsonify(resultados)
+    except Exception:
+        current_app.logger.exception("Error en /api/partidos/identificar")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/bundle')
+def api_bundle():
+    """
+    Snapshot completo (partidos, candidatos, centros y mesas) para uso
+    offline en la app, precomprimido con gzip/brotli según Accept-Encoding
+    (o ?codificacion=gzip|br|identity). Admite ETag y Range para reanudar
+    descargas. Lo generan los scrapers y las cargas; mientras se genera uno
+    nuevo se sirve el anterior (la app se pone al día con /api/sync).
+    """
+    try:
+        return servir_bundle()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        current_app.logger.exception("Error en /api/bundle")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/sync')
+def api_sync():
+    """
+    Sincronización incremental para la app: filas cambiadas y ids eliminados
+    de partidos, candidatos, centros y mesas desde '?since=<token>'. El token
+    de la siguiente llamada viene en 'siguiente' (y en 'token_sync' del
+    bundle). Sin 'since' devuelve todo. 410 si el token es demasiado antiguo.
+
+    Lee del escritor: una réplica atrasada más que MARGEN_SEGUNDOS daría un
+    'siguiente' posterior a cambios que todavía no recibió, y el cliente
+    no los vería nunca.
+    """
+    since = request.args.get('since')
+    try:
+        desde = leer_token(since) if since else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with en_escritor():
+            cambios = cambios_desde(desde)
+        return respuesta_json(cambios)
+    except TokenExpirado:
+        return jsonify({
+            "error": "El token es anterior al historial de eliminaciones; descargue /api/bundle de nuevo",
+            "reiniciar": True
+        }), 410
+    except Exception:
+        current_app.logger.exception("Error en /api/sync")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+
+@main.route('/api/cache/estadisticas')
+def api_cache_estadisticas():
+    """Contadores de la caché de respuestas y de la de cuerpos comprimidos."""
+    return jsonify(dict(cache.estadisticas(), compresion=compresion.estadisticas()))
@@ -1,8 +1,24 @@
 from flask import Blueprint, render_template, request, jsonify
-from models import CentrosVotacion, Mesas
+from models import CentrosVotacion, Mesas, consulta_centros, seleccion_centros
 from extensions import db
+from busqueda_util import obtener_indice, MAX_COINCIDENCIAS
+from cache_util import cache
+from serializacion_util import Serializador, respuesta_json, a_float
+from replicas_util import lectura_en_replicas, en_replicas
+from asgi_util import vista_async
+from espacial_util import obtener_indice_espacial, obtener_clusters, leer_bbox, leer_punto, MAX_CENTROS_BBOX
+from padron_util import dni_valido, ubicaciones_por_dni, MAX_DNI_POR_LOTE
 
 mapa = Blueprint("mapa", __name__)
+lectura_en_replicas(mapa)
+
+_serializar_centro = Serializador({
+    "id": "id_centro",
+    "nombre": "nombre",
+    "distrito": "distrito",
+    "lat": ("latitud", a_float),
+    "lng": ("longitud", a_float)
+})
 
 @mapa.route("/")
 def mapa_index():
@@ -11,35 +27,138 @@ def mapa_index():
 
 # API para filtrar centros
 @mapa.route("/api/centros")
+@cache.cachear("centros", "padron")  # '?dni=' depende del padrón
 def api_centros():
     distrito = request.args.get("distrito")
     dni = request.args.get("dni")
     nombre = request.args.get("nombre")
 
-    query = CentrosVotacion.query
+    # Sólo las columnas del listado (sin mesas ni objetos ORM)
+    query = consulta_centros()
 
     if distrito:
-        query = query.filter_by(distrito=distrito)
+        query = query.filter(CentrosVotacion.distrito == distrito)
+
+    if dni:
+        # Sólo el centro donde vota el DNI (Usuarios -> Mesas -> CentrosVotacion)
+        ubicacion = ubicaciones_por_dni([dni]).get(dni) if dni_valido(dni) else None
+        if ubicacion is None:
+            return respuesta_json([])
+        query = query.filter(CentrosVotacion.id_centro == ubicacion["centro"]["id"])
 
     if nombre:
-        query = query.filter(CentrosVotacion.nombre.like(f"%{nombre}%"))
+        # Índice en memoria en lugar de LIKE '%...%' (que recorre toda la
+        # tabla): los mejores MAX_COINCIDENCIAS, en el orden del ranking
+        ids = [r["id"] for r in obtener_indice().buscar(nombre, tipo="centro", limite=MAX_COINCIDENCIAS)]
+        posicion = {id_centro: i for i, id_centro in enumerate(ids)}
+        filas = sorted(query.filter(CentrosVotacion.id_centro.in_(ids)).all(), key=lambda c: posicion[c.id_centro])
+        return respuesta_json(_serializar_centro.lista(filas))
 
-    if dni:
-        # Filtrado por dni no implementado: la estructura actual de modelos
-        # no incluye 'dni_responsable' en 'Mesas'. Omite este filtro.
-        pass
-
-    centros = query.all()
-
-    result = [
-        {
-            "id": c.id_centro,
-            "nombre": c.nombre,
-            "distrito": c.distrito,
-            "lat": float(c.latitud) if c.latitud is not None else None,
-            "lng": float(c.longitud) if c.longitud is not None else None
-        }
-        for c in centros
-    ]
-
-    return jsonify(result)
+    return respuesta_json(_serializar_centro.lista(query))
+
+
+# Modo ASGI; 'nombre' y 'dni' usan índices en memoria y los atiende api_centros()
+@vista_async("mapa.api_centros", delegar_si=("nombre", "dni"))
+@cache.cachear_async("centros", "padron")  # Misma clave que api_centros()
+async def api_centros_async(sesion):
+    distrito = request.args.get("distrito")
+
+    query = seleccion_centros()
+    if distrito:
+        query = query.filter(CentrosVotacion.distrito == distrito)
+
+    filas = (await sesion.execute(query)).all()
+    return respuesta_json(_serializar_centro.lista(filas))
+
+
+# Dónde votar: mesa, centro y coordenadas de un DNI
+@mapa.route("/api/donde-voto")
+def api_donde_voto():
+    dni = request.args.get("dni", "").strip()
+    if not dni_valido(dni):
+        return jsonify({"error": "Se requiere 'dni' de 8 dígitos"}), 400
+
+    ubicacion = ubicaciones_por_dni([dni]).get(dni)
+    if ubicacion is None:
+        return jsonify({"error": "DNI sin mesa asignada"}), 404
+    return respuesta_json(dict(ubicacion, dni=dni))
+
+
+# Lo mismo por lote (coordinadores de mesa): {"dnis": [...]} por POST
+@mapa.route("/api/donde-voto", methods=["POST"])
+def api_donde_voto_lote():
+    datos = request.get_json(silent=True)
+    dnis = datos.get("dnis") if isinstance(datos, dict) else None
+    if not isinstance(dnis, list):
+        return jsonify({"error": "Se requiere un cuerpo JSON {\"dnis\": [...]}"}), 400
+    if len(dnis) > MAX_DNI_POR_LOTE:
+        return jsonify({"error": f"Máximo {MAX_DNI_POR_LOTE} DNIs por petición"}), 413
+
+    dnis = list(dict.fromkeys(str(dni).strip() for dni in dnis))
+    validos = [dni for dni in dnis if dni_valido(dni)]
+    # Es una lectura aunque llegue por POST: va a las réplicas
+    with en_replicas():
+        encontrados = ubicaciones_por_dni(validos)
+
+    return respuesta_json({
+        "resultados": [dict(encontrados[dni], dni=dni) for dni in validos if dni in encontrados],
+        "no_encontrados": [dni for dni in validos if dni not in encontrados],
+        "invalidos": [dni for dni in dnis if not dni_valido(dni)],
+    })
+
+
+# Centros más cercanos a un punto (índice espacial en memoria)
+@mapa.route("/api/centros/cercanos")
+def api_centros_cercanos():
+    try:
+        k = max(1, min(int(request.args.get("k", 5)), 100))
+    except ValueError:
+        return jsonify({"error": "'k' debe ser un entero"}), 400
+    if "lat" not in request.args or "lng" not in request.args:
+        return jsonify({"error": "Se requieren 'lat' y 'lng'"}), 400
+    try:
+        lat, lng = leer_punto(request.args["lat"], request.args["lng"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(obtener_indice_espacial().cercanos(lat, lng, k))
+
+
+# Centros dentro de un rectángulo: bbox=oeste,sur,este,norte. Como mucho
+# MAX_CENTROS_BBOX; si hay más se avisa con la cabecera X-Truncado (a ese
+# nivel de zoom el mapa debe usar /api/clusters)
+@mapa.route("/api/centros/bbox")
+def api_centros_bbox():
+    try:
+        oeste, sur, este, norte = leer_bbox(request.args.get("bbox", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    centros = obtener_indice_espacial().en_bbox(oeste, sur, este, norte, limite=MAX_CENTROS_BBOX + 1)
+    response = jsonify(centros[:MAX_CENTROS_BBOX])
+    if len(centros) > MAX_CENTROS_BBOX:
+        response.headers['X-Truncado'] = 'true'
+    return response
+
+
+# Clusters precalculados por zoom: z=<zoom de Leaflet>&bbox=oeste,sur,este,norte
+@mapa.route("/api/clusters")
+def api_clusters():
+    if not request.args.get("bbox"):
+        return jsonify({"error": "Se requiere 'bbox' (oeste,sur,este,norte)"}), 400
+    try:
+        zoom = int(request.args.get("z", 0))
+        bbox = leer_bbox(request.args["bbox"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(obtener_clusters().en_bbox(zoom, bbox))
+
+
+# Expansión de un cluster: sus hijos en el siguiente nivel de zoom
+@mapa.route("/api/clusters/<int:z>/<int:indice>")
+def api_cluster_hijos(z, indice):
+    try:
+        return jsonify(obtener_clusters().hijos(z, indice))
+    except KeyError:
+        return jsonify({"error": "Cluster no encontrado"}), 404
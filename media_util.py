@@ -0,0 +1,97 @@
+import hashlib
+from flask import Response, abort, request, url_for
+from extensions import db
+
+# --- Configuración ---
+# Las URLs de media llevan el hash del contenido (?v=...), así que pueden
+# cachearse "para siempre": si la imagen cambia, cambia la URL.
+CACHE_INMUTABLE = 31536000  # 1 año
+CACHE_SIN_VERSION = 3600    # 1 hora, revalidando con ETag
+# ---------------------
+
+# Firmas binarias (magic bytes) de los formatos que sirven JNE y eleccionesperu.pe
+_FIRMAS = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+
+def hash_blob(data):
+    """Devuelve el hash SHA-256 (hex) del contenido binario, o None si no hay datos."""
+    if not data:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+def sniff_content_type(data):
+    """Detecta el Content-Type de una imagen a partir de sus primeros bytes."""
+    if not data:
+        return 'application/octet-stream'
+    for firma, mimetype in _FIRMAS:
+        if data.startswith(firma):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    inicio = data[:256].lstrip().lower()
+    if inicio.startswith(b'<svg') or (inicio.startswith(b'<?xml') and b'<svg' in data[:1024].lower()):
+        return 'image/svg+xml'
+    return 'application/octet-stream'
+
+
+def url_media(endpoint, digest, **values):
+    """
+    Construye la URL versionada de una imagen. Devuelve None si no hay imagen
+    (hash nulo), para que los clientes muestren su placeholder.
+    """
+    if not digest:
+        return None
+    return url_for(endpoint, v=digest, **values)
+
+
+def aplicar_cache(response, digest, version=None):
+    """
+    ETag y Cache-Control de una imagen. 'version' es el hash que lleva la
+    URL (?v=); por defecto el propio 'digest'. Las variantes de imagen
+    usan el hash del original, porque se sirven desde la misma URL.
+    """
+    response.set_etag(digest)
+    response.cache_control.public = True
+    if request.args.get('v') == (version or digest):
+        response.cache_control.max_age = CACHE_INMUTABLE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = CACHE_SIN_VERSION
+    return response
+
+
+def servir_blob(blob_col, hash_col, criterio):
+    """
+    Responde con los bytes crudos de una columna BLOB.
+
+    - Si el cliente envía If-None-Match con el hash vigente, responde 304
+      sin leer el BLOB de la base de datos.
+    - En otro caso devuelve la imagen con Content-Type detectado, ETag y
+      Cache-Control de larga duración.
+    """
+    if request.if_none_match:
+        digest = db.session.query(hash_col).filter(criterio).scalar()
+        if digest and request.if_none_match.contains(digest):
+            return aplicar_cache(Response(status=304), digest)
+
+    fila = db.session.query(blob_col, hash_col).filter(criterio).first()
+    if fila is None or not fila[0]:
+        abort(404)
+
+    data, digest = fila
+    # Filas antiguas (anteriores a la columna de hash) se sirven igual
+    digest = digest or hash_blob(data)
+
+    response = Response(data, mimetype=sniff_content_type(data))
+    # Los BLOBs vienen de sitios externos: un SVG servido desde este origen
+    # podría ejecutar scripts. Sin sniffing y sin recursos ni scripts.
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+    return aplicar_cache(response, digest)
@@ -0,0 +1,250 @@
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Configuración (valores por defecto; se sobrescriben en config.py) ---
+PREFIJO = 'comitia'
+SQL_EN_LOG = 10           # Sentencias más lentas que se muestran por petición lenta
+LARGO_SQL_LOG = 500       # Caracteres de cada sentencia en el log
+# ---------------------
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SENTENCIAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BUCKETS_FILAS = (0, 1, 10, 100, 1000, 10000, 100000)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+INF = 'le="+Inf"'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador de Prometheus con etiquetas."""
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} counter']
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                lineas.append(f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(total)}')
+        return lineas
+
+
+class Histograma:
+    """Histograma de Prometheus (buckets acumulados, _sum y _count) con etiquetas."""
+
+    def __init__(self, nombre, ayuda, buckets, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(self.buckets), 0, 0]
+            conteos = serie[0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    conteos[i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        with self._lock:
+            series = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self._series.items())
+        for valores, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = _etiquetas(self.etiquetas, valores, f'le="{_numero(limite)}"')
+                lineas.append(f'{self.nombre}_bucket{le} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, INF)} {total}')
+            lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(suma)}')
+            lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {total}')
+        return lineas
+
+
+def _estado():
+    """Acumuladores de la petición en curso (None fuera de una petición medida)."""
+    return g.get('_metricas') if has_request_context() else None
+
+
+@contextmanager
+def cronometro(clave):
+    """
+    Suma a la petición en curso el tiempo del bloque en g._metricas[clave],
+    descontando el SQL ejecutado dentro (que ya se cuenta como tiempo de BD).
+    """
+    estado = _estado()
+    if estado is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    sql_inicio = estado['sql_segundos']
+    try:
+        yield
+    finally:
+        transcurrido = time.perf_counter() - inicio - (estado['sql_segundos'] - sql_inicio)
+        estado[clave] = estado.get(clave, 0.0) + max(transcurrido, 0.0)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if _estado() is not None and context is not None:
+        context._metricas_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_sql(conn, cursor, statement, parameters, context, executemany):
+    estado = _estado()
+    inicio = getattr(context, '_metricas_inicio', None)
+    if estado is None or inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    estado['sql_sentencias'] += 1
+    estado['sql_segundos'] += duracion
+    # rowcount de un SELECT es exacto con PyMySQL (lee el resultado completo);
+    # SQLite no lo informa (-1) y esas filas no se cuentan
+    if cursor.description is not None and cursor.rowcount and cursor.rowcount > 0:
+        estado['filas'] += cursor.rowcount
+    if estado['registro_sql'] is not None:
+        estado['registro_sql'].append((duracion, statement))
+
+
+class MetricasRespuestas:
+    """
+    Instrumentación por endpoint: tiempo total, sentencias y tiempo de SQL,
+    filas leídas, tiempo de serialización y bytes de la respuesta. Se
+    exponen como histogramas en /metrics (formato de texto de Prometheus).
+
+    Con METRICAS_LENTAS_MS se registran las peticiones más lentas que ese
+    umbral junto con sus sentencias SQL más lentas.
+
+    Los valores son del proceso: con varios workers, Prometheus debe leer
+    cada uno (o agregarlos por instancia).
+    """
+
+    def __init__(self, app=None):
+        self.umbral_lentas = None
+        self.peticiones = Contador(f'{PREFIJO}_peticiones_total', 'Peticiones atendidas.',
+                                   ('endpoint', 'metodo', 'estado'))
+        self.duracion = Histograma(f'{PREFIJO}_peticion_segundos', 'Tiempo total de la petición.',
+                                   BUCKETS_SEGUNDOS, ('endpoint',))
+        self.sql_sentencias = Histograma(f'{PREFIJO}_sql_sentencias', 'Sentencias SQL por petición.',
+                                         BUCKETS_SENTENCIAS, ('endpoint',))
+        self.sql_segundos = Histograma(f'{PREFIJO}_sql_segundos', 'Tiempo en la base de datos por petición.',
+                                       BUCKETS_SEGUNDOS, ('endpoint',))
+        self.filas = Histograma(f'{PREFIJO}_sql_filas', 'Filas leídas por petición (SELECT).',
+                                BUCKETS_FILAS, ('endpoint',))
+        self.serializacion = Histograma(f'{PREFIJO}_serializacion_segundos',
+                                        'Tiempo de serialización (filas a JSON) por petición.',
+                                        BUCKETS_SEGUNDOS, ('endpoint',))
+        self.bytes = Histograma(f'{PREFIJO}_respuesta_bytes', 'Bytes del cuerpo de la respuesta.',
+                                BUCKETS_BYTES, ('endpoint',))
+        self.lentas = Contador(f'{PREFIJO}_peticiones_lentas_total',
+                               'Peticiones por encima de METRICAS_LENTAS_MS.', ('endpoint',))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICAS_ACTIVAS', True)
+        app.config.setdefault('METRICAS_LENTAS_MS', None)
+        app.extensions['metricas'] = self
+        if not app.config['METRICAS_ACTIVAS']:
+            return
+        self.umbral_lentas = app.config['METRICAS_LENTAS_MS']
+        app.before_request(self._inicio)
+        # Se registra antes que la compresión: sus after_request corren en
+        # orden inverso, así que aquí se ven los bytes ya comprimidos
+        app.after_request(self._fin)
+        app.add_url_rule('/metrics', 'metricas', self.exponer)
+
+    def _inicio(self):
+        g._metricas = {
+            'inicio': time.perf_counter(),
+            'sql_sentencias': 0,
+            'sql_segundos': 0.0,
+            'filas': 0,
+            'serializacion': 0.0,
+            'registro_sql': [] if self.umbral_lentas is not None else None,
+        }
+
+    def _fin(self, response):
+        estado = g.pop('_metricas', None)
+        if estado is None or request.endpoint == 'metricas':
+            return response
+        duracion = time.perf_counter() - estado['inicio']
+        endpoint = request.endpoint or 'sin_ruta'
+
+        self.peticiones.inc(endpoint, request.method, str(response.status_code))
+        self.duracion.observar(duracion, endpoint)
+        self.sql_sentencias.observar(estado['sql_sentencias'], endpoint)
+        self.sql_segundos.observar(estado['sql_segundos'], endpoint)
+        self.filas.observar(estado['filas'], endpoint)
+        self.serializacion.observar(estado['serializacion'], endpoint)
+        if not response.is_streamed and response.content_length is not None:
+            self.bytes.observar(response.content_length, endpoint)
+
+        if self.umbral_lentas is not None and duracion * 1000 >= self.umbral_lentas:
+            self.lentas.inc(endpoint)
+            self._registrar_lenta(endpoint, duracion, estado, response)
+        return response
+
+    def _registrar_lenta(self, endpoint, duracion, estado, response):
+        sentencias = sorted(estado['registro_sql'], key=lambda s: s[0], reverse=True)[:SQL_EN_LOG]
+        lineas = [
+            f"Petición lenta: {request.method} {request.full_path.rstrip('?')} -> {response.status_code} "
+            f"({endpoint}) {duracion * 1000:.1f} ms; SQL {estado['sql_sentencias']} sentencias "
+            f"{estado['sql_segundos'] * 1000:.1f} ms, serialización {estado['serializacion'] * 1000:.1f} ms"
+        ]
+        for segundos, sentencia in sentencias:
+            texto = ' '.join(sentencia.split())
+            if len(texto) > LARGO_SQL_LOG:
+                texto = texto[:LARGO_SQL_LOG] + '...'
+            lineas.append(f"  {segundos * 1000:8.1f} ms  {texto}")
+        current_app.logger.warning('\n'.join(lineas))
+
+    def metricas(self):
+        return (self.peticiones, self.duracion, self.sql_sentencias, self.sql_segundos,
+                self.filas, self.serializacion, self.bytes, self.lentas)
+
+    def exponer(self):
+        """Vista de /metrics."""
+        lineas = []
+        for metrica in self.metricas():
+            lineas.extend(metrica.exponer())
+        return Response('\n'.join(lineas) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metricas = MetricasRespuestas()
@@ -0,0 +1,132 @@
+"""seguimiento de cambios, imagenes y cargas
+
+Cambios de esquema de la serie de rendimiento:
+- VersionDatos (invalidación de cachés e índices), CargasArchivo (puntos
+  de control de las cargas CSV), Eliminaciones (/api/sync) y
+  VariantesImagen (logos y fotos redimensionados).
+- fecha_actualizacion (indexada) en las tablas sincronizables.
+- Origen y hash de logos y fotos, huella de los logos y hash del
+  contenido extraído del HTML.
+- jne_id_simbolo único (clave de la sincronización incremental de
+  partidos) e índice en Mesas.id_centro.
+
+Las filas existentes quedan con fecha_actualizacion y hashes en NULL:
+los hashes se calculan con 'flask --app app completar-hashes'. Si hay
+jne_id_simbolo repetidos, hay que depurarlos antes de aplicarla.
+
+Revision ID: eed9a91862c6
+Revises: 407d8ed2e197
+Create Date: 2026-10-17 12:34:26.393386
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'eed9a91862c6'
+down_revision = '407d8ed2e197'
+branch_labels = None
+depends_on = None
+
+
+def fecha_actualizacion():
+    return sa.Column(
+        'fecha_actualizacion', sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'), nullable=True
+    )
+
+
+def upgrade():
+    op.create_table('VersionDatos',
+    sa.Column('nombre', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nombre')
+    )
+    op.create_table('CargasArchivo',
+    sa.Column('archivo', sa.String(length=255), nullable=False),
+    sa.Column('huella', sa.String(length=64), nullable=False),
+    sa.Column('filas', sa.Integer(), nullable=False),
+    sa.Column('completada', sa.Boolean(), nullable=False),
+    fecha_actualizacion(),
+    sa.PrimaryKeyConstraint('archivo')
+    )
+    op.create_index(op.f('ix_CargasArchivo_fecha_actualizacion'), 'CargasArchivo', ['fecha_actualizacion'], unique=False)
+    op.create_table('Eliminaciones',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('tabla', sa.String(length=50), nullable=False),
+    sa.Column('id_entidad', sa.String(length=36), nullable=False),
+    sa.Column('fecha', sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_Eliminaciones_fecha'), 'Eliminaciones', ['fecha'], unique=False)
+    op.create_table('VariantesImagen',
+    sa.Column('tipo', sa.String(length=20), nullable=False, comment="'partido' o 'candidato'"),
+    sa.Column('id_entidad', sa.String(length=36), nullable=False),
+    sa.Column('tamano', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('formato', sa.String(length=10), nullable=False, comment="'webp' o 'jpeg'"),
+    sa.Column('datos', mysql.MEDIUMBLOB(), nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('hash_origen', sa.String(length=64), nullable=False),
+    sa.Column('ancho', sa.Integer(), nullable=False),
+    sa.Column('alto', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tipo', 'id_entidad', 'tamano', 'formato')
+    )
+
+    op.add_column('CentrosVotacion', fecha_actualizacion())
+    op.create_index(op.f('ix_CentrosVotacion_fecha_actualizacion'), 'CentrosVotacion', ['fecha_actualizacion'], unique=False)
+
+    op.add_column('Mesas', fecha_actualizacion())
+    op.create_index(op.f('ix_Mesas_fecha_actualizacion'), 'Mesas', ['fecha_actualizacion'], unique=False)
+    op.create_index(op.f('ix_Mesas_id_centro'), 'Mesas', ['id_centro'], unique=False)
+
+    op.add_column('PartidosPoliticos', sa.Column('logo_hash', sa.String(length=64), nullable=True, comment='SHA-256 del logo (ETag / URL versionada)'))
+    op.add_column('PartidosPoliticos', sa.Column('logo_huella', sa.String(length=32), nullable=True, comment='pHash + dHash del logo (ver huella_util)'))
+    op.add_column('PartidosPoliticos', sa.Column('logo_url', sa.String(length=500), nullable=True))
+    op.add_column('PartidosPoliticos', sa.Column('logo_etag', sa.String(length=255), nullable=True))
+    op.add_column('PartidosPoliticos', sa.Column('logo_modificado', sa.String(length=64), nullable=True, comment='Cabecera Last-Modified'))
+    op.add_column('PartidosPoliticos', sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+    op.add_column('PartidosPoliticos', fecha_actualizacion())
+    op.create_index(op.f('ix_PartidosPoliticos_fecha_actualizacion'), 'PartidosPoliticos', ['fecha_actualizacion'], unique=False)
+    # Mismo nombre que le da MySQL con create_all(); en SQLite se recrea la tabla
+    with op.batch_alter_table('PartidosPoliticos') as batch_op:
+        batch_op.create_unique_constraint('jne_id_simbolo', ['jne_id_simbolo'])
+
+    op.add_column('candidatos', sa.Column('imagen_hash', sa.String(length=64), nullable=True))
+    op.add_column('candidatos', sa.Column('imagen_url', sa.String(length=500), nullable=True))
+    op.add_column('candidatos', sa.Column('imagen_etag', sa.String(length=255), nullable=True))
+    op.add_column('candidatos', sa.Column('imagen_modificado', sa.String(length=64), nullable=True))
+    op.add_column('candidatos', fecha_actualizacion())
+    op.add_column('candidatos', sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_candidatos_fecha_actualizacion'), 'candidatos', ['fecha_actualizacion'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('candidatos') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_candidatos_fecha_actualizacion'))
+        for columna in ('hash_contenido', 'fecha_actualizacion', 'imagen_modificado',
+                        'imagen_etag', 'imagen_url', 'imagen_hash'):
+            batch_op.drop_column(columna)
+
+    with op.batch_alter_table('PartidosPoliticos') as batch_op:
+        batch_op.drop_constraint('jne_id_simbolo', type_='unique')
+        batch_op.drop_index(batch_op.f('ix_PartidosPoliticos_fecha_actualizacion'))
+        for columna in ('fecha_actualizacion', 'hash_contenido', 'logo_modificado', 'logo_etag',
+                        'logo_url', 'logo_huella', 'logo_hash'):
+            batch_op.drop_column(columna)
+
+    with op.batch_alter_table('Mesas') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_Mesas_id_centro'))
+        batch_op.drop_index(batch_op.f('ix_Mesas_fecha_actualizacion'))
+        batch_op.drop_column('fecha_actualizacion')
+
+    with op.batch_alter_table('CentrosVotacion') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_CentrosVotacion_fecha_actualizacion'))
+        batch_op.drop_column('fecha_actualizacion')
+
+    op.drop_table('VariantesImagen')
+    op.drop_index(op.f('ix_Eliminaciones_fecha'), table_name='Eliminaciones')
+    op.drop_table('Eliminaciones')
+    op.drop_index(op.f('ix_CargasArchivo_fecha_actualizacion'), table_name='CargasArchivo')
+    op.drop_table('CargasArchivo')
+    op.drop_table('VersionDatos')
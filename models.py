@@ -1,13 +1,36 @@
 import uuid
 from extensions import db
 from sqlalchemy import String, Integer, Date, Enum, ForeignKey, Numeric, Text, DateTime
-from sqlalchemy.dialects.mysql import CHAR, MEDIUMBLOB
-from sqlalchemy.orm import relationship
-from datetime import datetime, timezone 
+from sqlalchemy.dialects.mysql import CHAR, MEDIUMBLOB, DATETIME
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, ColumnElement
+from sqlalchemy.orm import relationship, deferred, selectinload, contains_eager, object_session
+from datetime import datetime, timedelta, timezone 
+from media_util import hash_blob
+from serializacion_util import Serializable
+
+
+def ahora_utc():
+    """Fecha y hora UTC sin zona (así se guardan en las columnas DateTime)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def columna_actualizacion():
+    """
+    Columna 'fecha_actualizacion': se fija al insertar y se renueva en cada
+    UPDATE, tanto desde el ORM como en las sentencias masivas (insert /
+    update de la sincronización), porque default y onupdate son del Core.
+    En MySQL usa microsegundos para ordenar cambios dentro del mismo segundo.
+    """
+    return db.Column(
+        db.DateTime().with_variant(DATETIME(fsp=6), 'mysql'),
+        nullable=True, index=True, default=ahora_utc, onupdate=ahora_utc
+    )
 
 # --- Modelos de Usuarios y Ubicación ---
 
-class CentrosVotacion(db.Model):
+class CentrosVotacion(Serializable, db.Model):
     """
     Almacena los lugares físicos de votación (colegios, etc.).
     Usa UUID como clave primaria.
@@ -20,24 +43,18 @@ class CentrosVotacion(db.Model):
     distrito = db.Column(db.String(100))
     latitud = db.Column(db.Numeric(10, 8), nullable=True)
     longitud = db.Column(db.Numeric(11, 8), nullable=True)
+    fecha_actualizacion = columna_actualizacion()
     
     # Relación: Un centro de votación tiene muchas mesas
     mesas = relationship('Mesas', back_populates='centro_votacion', lazy=True)
 
-    def to_dict(self):
-        return {
-            'id_centro': self.id_centro,
-            'nombre': self.nombre,
-            'direccion': self.direccion,
-            'distrito': self.distrito,
-            'latitud': float(self.latitud) if self.latitud is not None else None,
-            'longitud': float(self.longitud) if self.longitud is not None else None,
-        }
+    # to_dict() (Serializable): latitud / longitud como float
+    __serializar__ = ('id_centro', 'nombre', 'direccion', 'distrito', 'latitud', 'longitud')
 
     def __repr__(self):
         return f'<CentrosVotacion {self.nombre}>'
 
-class Mesas(db.Model):
+class Mesas(Serializable, db.Model):
     """
     Almacena cada mesa de sufragio y su ubicación DENTRO del centro.
     Usa INT AUTO_INCREMENT como clave primaria (según solicitud).
@@ -49,7 +66,9 @@ class Mesas(db.Model):
     ubicacion_detalle = db.Column(db.String(255), nullable=True)
     
     # Clave Foránea: Enlace a CentrosVotacion usando CHAR(36)
-    id_centro = db.Column(CHAR(36), ForeignKey('CentrosVotacion.id_centro'), nullable=False)
+    # Índice explícito: MySQL lo crea con la FK, SQLite no (índice espacial, mesas de un centro)
+    id_centro = db.Column(CHAR(36), ForeignKey('CentrosVotacion.id_centro'), nullable=False, index=True)
+    fecha_actualizacion = columna_actualizacion()
     
     # Relaciones
     centro_votacion = relationship('CentrosVotacion', back_populates='mesas')
@@ -82,7 +101,7 @@ class Usuarios(db.Model):
 
 # --- Modelo de Partidos Políticos ---
 
-class PartidosPoliticos(db.Model):
+class PartidosPoliticos(Serializable, db.Model):
     """
     Almacena las agrupaciones políticas.
     Optimizado para los datos del JNE y para almacenar el logo como BLOB.
@@ -90,13 +109,22 @@ class PartidosPoliticos(db.Model):
     __tablename__ = 'PartidosPoliticos'
     
     id_partido = db.Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    jne_id_simbolo = db.Column(db.Integer, nullable=True, comment='ID interno del JNE (ej: /GetSimbolo/4)')
+    jne_id_simbolo = db.Column(db.Integer, nullable=True, unique=True, comment='ID interno del JNE (ej: /GetSimbolo/4)')
     nombre_partido = db.Column(db.String(255), nullable=False, index=True)
     siglas = db.Column(db.String(50), nullable=True)
     fecha_inscripcion = db.Column(db.Date, nullable=True)
     
     # --- Campo BLOB para el logo (para la IA) ---
-    logo_blob = db.Column(MEDIUMBLOB, nullable=True, comment='Datos binarios de la imagen del logo')
+    # Diferido: sólo se lee cuando se pide explícitamente (ver /api/media)
+    logo_blob = deferred(db.Column(MEDIUMBLOB, nullable=True, comment='Datos binarios de la imagen del logo'))
+    logo_hash = db.Column(db.String(64), nullable=True, comment='SHA-256 del logo (ETag / URL versionada)')
+    # Huella perceptual (pHash + dHash) para reconocer el símbolo desde una foto
+    logo_huella = db.Column(db.String(32), nullable=True, comment='pHash + dHash del logo (ver huella_util)')
+
+    # --- Origen del logo (para GET condicional en la sincronización incremental) ---
+    logo_url = db.Column(db.String(500), nullable=True)
+    logo_etag = db.Column(db.String(255), nullable=True)
+    logo_modificado = db.Column(db.String(64), nullable=True, comment='Cabecera Last-Modified')
     
     # --- Campos de información de contacto (del HTML/scraper) ---
     direccion_legal = db.Column(db.String(255), nullable=True)
@@ -115,12 +143,16 @@ class PartidosPoliticos(db.Model):
         default='Desconocido'
     )
 
+    # Hash de los campos extraídos del HTML (detecta cambios entre cargas)
+    hash_contenido = db.Column(db.String(64), nullable=True)
+    fecha_actualizacion = columna_actualizacion()
+
     def __repr__(self):
         return f'<PartidosPoliticos {self.siglas or self.nombre_partido}>'
     
 # --- Modelo de Candidato ---
 
-class Candidatos(db.Model):
+class Candidatos(Serializable, db.Model):
     __tablename__ = 'candidatos'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -132,8 +164,12 @@ class Candidatos(db.Model):
     # URL al perfil detallado en eleccionesperu.pe
     perfil_url = db.Column(db.String(500), unique=True) 
     
-    # BLOB para almacenar la foto descargada
-    imagen_blob = db.Column(MEDIUMBLOB, nullable=True)
+    # BLOB para almacenar la foto descargada (diferido, igual que logo_blob)
+    imagen_blob = deferred(db.Column(MEDIUMBLOB, nullable=True))
+    imagen_hash = db.Column(db.String(64), nullable=True)
+    imagen_url = db.Column(db.String(500), nullable=True)
+    imagen_etag = db.Column(db.String(255), nullable=True)
+    imagen_modificado = db.Column(db.String(64), nullable=True)
     partido_politico_id = db.Column(
         CHAR(36), 
         db.ForeignKey('PartidosPoliticos.id_partido'),
@@ -144,8 +180,408 @@ class Candidatos(db.Model):
     biografia = db.Column(db.Text, nullable=True)
     
     fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_actualizacion = columna_actualizacion()
+
+    # Hash de los campos extraídos del HTML (detecta cambios entre cargas)
+    hash_contenido = db.Column(db.String(64), nullable=True)
     
     partido_politico = relationship('PartidosPoliticos', backref=db.backref('candidatos', lazy=True))
 
     def __repr__(self):
-        return f'<Candidato {self.nombre_completo}>'
\ No newline at end of file
+        return f'<Candidato {self.nombre_completo}>'
+
+
+# --- Variantes de imagen ---
+
+class VariantesImagen(db.Model):
+    """
+    Versiones redimensionadas y recodificadas (sin metadatos EXIF/ICC) de
+    los logos y fotos, generadas al cargar los datos (ver imagen_util).
+    'tamano' es el lado mayor en píxeles; 0 es la imagen a tamaño original
+    y -1 marca una imagen que no se pudo decodificar (sin datos).
+    """
+    __tablename__ = 'VariantesImagen'
+
+    tipo = db.Column(db.String(20), primary_key=True, comment="'partido' o 'candidato'")
+    id_entidad = db.Column(db.String(36), primary_key=True)
+    tamano = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    formato = db.Column(db.String(10), primary_key=True, comment="'webp' o 'jpeg'")
+
+    datos = deferred(db.Column(MEDIUMBLOB, nullable=False))
+    hash = db.Column(db.String(64), nullable=False)
+    # Hash de la imagen de origen: la variante sigue la misma URL versionada
+    hash_origen = db.Column(db.String(64), nullable=False)
+    ancho = db.Column(db.Integer, nullable=False)
+    alto = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<VariantesImagen {self.tipo}/{self.id_entidad} {self.tamano} {self.formato}>'
+
+
+# --- Versión de los datos ---
+
+class VersionDatos(db.Model):
+    """
+    Contador de versión por conjunto de datos ('partidos', 'candidatos',
+    'centros', 'padron'). Los scrapers lo incrementan en la misma transacción en la
+    que cargan los datos; las cachés e índices en memoria lo comparan para
+    saber si deben invalidarse.
+    """
+    __tablename__ = 'VersionDatos'
+
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionDatos {self.nombre}={self.version}>'
+
+
+def leer_versiones():
+    """Devuelve {nombre: version} de todos los conjuntos de datos."""
+    return dict(db.session.query(VersionDatos.nombre, VersionDatos.version).all())
+
+
+async def leer_versiones_async(sesion):
+    """leer_versiones() con una AsyncSession (modo ASGI)."""
+    resultado = await sesion.execute(select(VersionDatos.nombre, VersionDatos.version))
+    return dict(resultado.all())
+
+
+def incrementar_version(*nombres):
+    """
+    Incrementa la versión de los conjuntos indicados dentro de la sesión
+    actual (se confirma con el commit de quien llama).
+    """
+    for nombre in nombres:
+        actualizados = db.session.query(VersionDatos).filter_by(nombre=nombre).update(
+            {VersionDatos.version: VersionDatos.version + 1},
+            synchronize_session=False
+        )
+        if not actualizados:
+            db.session.add(VersionDatos(nombre=nombre, version=1))
+
+
+# --- Cargas masivas desde CSV ---
+
+class CargasArchivo(db.Model):
+    """
+    Punto de control de cada carga CSV (carga_csv_util): filas del archivo
+    ya confirmadas. Se actualiza en la misma transacción que cada lote, así
+    una carga interrumpida se reanuda justo después del último lote confirmado.
+    """
+    __tablename__ = 'CargasArchivo'
+
+    archivo = db.Column(db.String(255), primary_key=True)   # '<tipo>:<nombre del archivo>'
+    huella = db.Column(db.String(64), nullable=False)       # Tamaño y cabecera: detecta otro archivo con el mismo nombre
+    filas = db.Column(db.Integer, nullable=False, default=0)
+    completada = db.Column(db.Boolean, nullable=False, default=False)
+    fecha_actualizacion = columna_actualizacion()
+
+    def __repr__(self):
+        return f'<CargasArchivo {self.archivo} {self.filas}>'
+
+
+# --- Registro de eliminaciones (tombstones) ---
+
+class Eliminaciones(db.Model):
+    """
+    Una fila por registro borrado de las tablas sincronizables, para que
+    /api/sync pueda avisar a los clientes qué deben quitar de su copia local.
+    Se conservan RETENCION_ELIMINACIONES_DIAS días.
+    """
+    __tablename__ = 'Eliminaciones'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    tabla = db.Column(db.String(50), nullable=False)
+    id_entidad = db.Column(db.String(36), nullable=False)
+    fecha = db.Column(db.DateTime().with_variant(DATETIME(fsp=6), 'mysql'), nullable=False, index=True, default=ahora_utc)
+
+    def __repr__(self):
+        return f'<Eliminaciones {self.tabla}/{self.id_entidad}>'
+
+
+RETENCION_ELIMINACIONES_DIAS = 30
+
+# Tablas con seguimiento de cambios (nombre en /api/sync -> modelo)
+MODELOS_SINCRONIZABLES = {
+    'partidos': PartidosPoliticos,
+    'candidatos': Candidatos,
+    'centros': CentrosVotacion,
+    'mesas': Mesas,
+}
+
+
+def _pendientes(session):
+    """Eliminaciones a insertar al confirmar la transacción de 'session'."""
+    return session.info.setdefault('eliminaciones', [])
+
+
+def registrar_eliminaciones(modelo, ids):
+    """
+    Registra el borrado de 'ids' de 'modelo'. Lo usan los borrados masivos
+    (query.delete), que no disparan los eventos del ORM; también descarta
+    los registros más antiguos que la retención. Las filas se insertan al
+    confirmar (ver _fechar_cambios). No confirma la transacción.
+    """
+    _pendientes(db.session).extend((modelo.__tablename__, str(i)) for i in ids)
+    db.session.query(Eliminaciones).filter(
+        Eliminaciones.fecha < ahora_utc() - timedelta(days=RETENCION_ELIMINACIONES_DIAS)
+    ).delete(synchronize_session=False)
+
+
+def _registrar_eliminacion(mapper, connection, target):
+    """Borrados hechos desde el ORM (session.delete)."""
+    _pendientes(object_session(target)).append(
+        (mapper.local_table.name, str(mapper.primary_key_from_instance(target)[0]))
+    )
+
+
+for _modelo in MODELOS_SINCRONIZABLES.values():
+    event.listen(_modelo, 'after_delete', _registrar_eliminacion)
+
+
+# --- Fecha de los cambios al confirmar ---
+# /api/sync entrega las filas con fecha_actualizacion posterior al token del
+# cliente, pero las filas se fechan al escribirse y los scrapers confirman
+# bastante después (logos, variantes, huellas). Una fila fechada antes de
+# emitir un token y confirmada después nunca se entregaría: la sesión anota
+# las claves de las filas que escribe y justo antes del COMMIT vuelve a
+# fechar sólo ésas (por clave, sin tocar las de otras transacciones) e
+# inserta las eliminaciones pendientes con la misma fecha.
+
+LOTE_FECHAS = 500   # Claves por UPDATE ... WHERE clave IN (...)
+
+_SINCRONIZABLES_POR_TABLA = {modelo.__tablename__: modelo for modelo in MODELOS_SINCRONIZABLES.values()}
+
+
+def _anotar(session, tabla, columna, valor):
+    session.info.setdefault('escritos', {}).setdefault((tabla, columna), set()).add(valor)
+
+
+def _clave_de(tabla, parametros):
+    """Columna que identifica la fila en los parámetros: la clave primaria o una columna única."""
+    for columna in tabla.primary_key.columns:
+        if columna.name in parametros:
+            return columna.name
+    for columna in tabla.columns:
+        if columna.unique and columna.name in parametros:
+            return columna.name
+    return None
+
+
+def _clave_del_filtro(filtro):
+    """(columna, valor) de un WHERE 'columna = valor', o None."""
+    if (isinstance(filtro, BinaryExpression) and filtro.operator is operators.eq
+            and isinstance(filtro.left, ColumnElement) and isinstance(filtro.right, BindParameter)):
+        nombre = getattr(filtro.left, 'name', None)
+        if nombre is not None:
+            return nombre, filtro.right.value
+    return None
+
+
+@event.listens_for(db.session, 'after_begin')
+def _inicio_transaccion(session, transaction, connection):
+    session.info.setdefault('inicio_transaccion', ahora_utc())
+
+
+@event.listens_for(db.session, 'after_flush')
+def _anotar_flush(session, flush_context):
+    for objeto in list(session.new) + [o for o in session.dirty if session.is_modified(o)]:
+        mapper = inspect(objeto).mapper
+        tabla = mapper.local_table.name
+        if tabla in _SINCRONIZABLES_POR_TABLA:
+            _anotar(session, tabla, mapper.primary_key[0].name, mapper.primary_key_from_instance(objeto)[0])
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _anotar_dml(estado):
+    if not (estado.is_insert or estado.is_update) or estado.session.info.get('fechando'):
+        return
+    tabla = getattr(estado.statement, 'table', None)
+    if getattr(tabla, 'name', None) not in _SINCRONIZABLES_POR_TABLA:
+        return
+    session = estado.session
+    parametros = estado.parameters
+    filas = parametros if isinstance(parametros, (list, tuple)) else [parametros] if parametros else []
+    columna = _clave_de(tabla, filas[0]) if filas else None
+    if columna is not None:
+        for fila in filas:
+            _anotar(session, tabla.name, columna, fila[columna])
+        return
+    clave = _clave_del_filtro(estado.statement.whereclause) if estado.is_update else None
+    if clave is not None:
+        _anotar(session, tabla.name, *clave)
+    else:
+        # Sentencia sin clave reconocible: se fecha lo escrito desde el inicio de la transacción
+        session.info.setdefault('tablas_sin_clave', set()).add(tabla.name)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _fechar_cambios(session):
+    session.flush()  # Lo pendiente se escribe ahora, no después de fechar
+    escritos = session.info.pop('escritos', {})
+    sin_clave = session.info.pop('tablas_sin_clave', set())
+    eliminaciones = session.info.pop('eliminaciones', [])
+    if not (escritos or sin_clave or eliminaciones):
+        return
+    ahora = ahora_utc()
+    session.info['fechando'] = True
+    try:
+        for (tabla, columna), valores in escritos.items():
+            modelo = _SINCRONIZABLES_POR_TABLA[tabla]
+            valores = list(valores)
+            for i in range(0, len(valores), LOTE_FECHAS):
+                session.execute(
+                    update(modelo).where(modelo.__table__.c[columna].in_(valores[i:i + LOTE_FECHAS]))
+                    .values(fecha_actualizacion=ahora),
+                    execution_options={'synchronize_session': False}
+                )
+        inicio = session.info.get('inicio_transaccion')
+        for tabla in sin_clave:
+            modelo = _SINCRONIZABLES_POR_TABLA[tabla]
+            session.execute(
+                update(modelo).where(modelo.fecha_actualizacion >= inicio).values(fecha_actualizacion=ahora),
+                execution_options={'synchronize_session': False}
+            )
+        if eliminaciones:
+            session.execute(
+                Eliminaciones.__table__.insert(),
+                [{'tabla': tabla, 'id_entidad': id_entidad, 'fecha': ahora} for tabla, id_entidad in eliminaciones]
+            )
+    finally:
+        session.info.pop('fechando', None)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _fin_transaccion(session, transaction):
+    if transaction.parent is None:
+        for clave in ('inicio_transaccion', 'escritos', 'tablas_sin_clave', 'eliminaciones'):
+            session.info.pop(clave, None)
+
+
+# --- Capa de consultas compartida ---
+# Todas las rutas de lectura pasan por aquí: los BLOB están diferidos en los
+# modelos y las relaciones se cargan por adelantado, así el número de
+# sentencias SQL por endpoint es constante sin importar el tamaño de las tablas.
+
+# Columnas que necesitan los listados de centros (mapa y app móvil)
+COLUMNAS_CENTRO = (
+    CentrosVotacion.id_centro,
+    CentrosVotacion.nombre,
+    CentrosVotacion.distrito,
+    CentrosVotacion.latitud,
+    CentrosVotacion.longitud,
+)
+
+
+def consulta_centros():
+    """Proyección por columnas de CentrosVotacion (sin instanciar objetos ORM)."""
+    return db.session.query(*COLUMNAS_CENTRO)
+
+
+# Columnas del listado de mesas (/api/mesas)
+COLUMNAS_MESA = (
+    Mesas.id_mesa,
+    Mesas.numero_mesa,
+    Mesas.ubicacion_detalle,
+    Mesas.id_centro,
+)
+
+
+def consulta_mesas():
+    """Proyección por columnas de Mesas."""
+    return db.session.query(*COLUMNAS_MESA)
+
+
+def consulta_centros_con_mesas():
+    """Centros con sus mesas precargadas en una segunda consulta (selectinload)."""
+    return CentrosVotacion.query.options(selectinload(CentrosVotacion.mesas))
+
+
+def consulta_partidos():
+    """Partidos políticos sin el logo (logo_blob es diferido)."""
+    return PartidosPoliticos.query
+
+
+def consulta_candidatos():
+    """
+    Candidatos con su partido en una sola consulta: el JOIN que ya filtraba
+    candidatos sin partido se reutiliza para poblar 'partido_politico'.
+    """
+    return db.session.query(Candidatos).join(
+        PartidosPoliticos,
+        Candidatos.partido_politico_id == PartidosPoliticos.id_partido
+    ).options(contains_eager(Candidatos.partido_politico))
+
+
+# Las mismas consultas como select() para la AsyncSession del modo ASGI
+# (admiten .filter(), .order_by() y .limit() igual que las de arriba)
+
+def seleccion_centros():
+    return select(*COLUMNAS_CENTRO)
+
+
+def seleccion_partidos():
+    return select(PartidosPoliticos)
+
+
+def seleccion_candidatos():
+    return select(Candidatos).join(
+        PartidosPoliticos,
+        Candidatos.partido_politico_id == PartidosPoliticos.id_partido
+    ).options(contains_eager(Candidatos.partido_politico))
+
+
+# --- Sincronización de hashes de imagen ---
+# Cada vez que se asigna un BLOB se recalcula su hash, así los endpoints de
+# listado pueden publicar la URL versionada sin leer la imagen.
+
+@event.listens_for(PartidosPoliticos.logo_blob, 'set')
+def _actualizar_logo_hash(target, value, oldvalue, initiator):
+    target.logo_hash = hash_blob(value)
+
+
+@event.listens_for(Candidatos.imagen_blob, 'set')
+def _actualizar_imagen_hash(target, value, oldvalue, initiator):
+    target.imagen_hash = hash_blob(value)
+
+
+# Filas con BLOB cargadas antes de las columnas de hash: (conjunto, modelo, id, blob, hash)
+_HASHES_IMAGEN = (
+    ('partidos', PartidosPoliticos, PartidosPoliticos.id_partido, PartidosPoliticos.logo_blob, PartidosPoliticos.logo_hash),
+    ('candidatos', Candidatos, Candidatos.id, Candidatos.imagen_blob, Candidatos.imagen_hash),
+)
+
+
+def completar_hashes(lote=100):
+    """
+    Calcula logo_hash / imagen_hash de las filas que tienen imagen pero no
+    hash (los listeners de arriba sólo cubren las asignaciones nuevas).
+    Lee los BLOBs de 'lote' en 'lote' y confirma cada lote; al final
+    incrementa la versión de los conjuntos tocados para invalidar las
+    cachés. Devuelve {conjunto: filas actualizadas}.
+    """
+    resultado = {}
+    for conjunto, modelo, id_col, blob_col, hash_col in _HASHES_IMAGEN:
+        total, ultimo = 0, None
+        while True:
+            query = db.session.query(id_col, blob_col).filter(hash_col.is_(None), blob_col.isnot(None))
+            if ultimo is not None:
+                query = query.filter(id_col > ultimo)
+            filas = query.order_by(id_col).limit(lote).all()
+            if not filas:
+                break
+            for id_entidad, blob in filas:
+                digest = hash_blob(blob)
+                if digest:
+                    db.session.query(modelo).filter(id_col == id_entidad).update(
+                        {hash_col: digest}, synchronize_session=False
+                    )
+                    total += 1
+            db.session.commit()
+            ultimo = filas[-1][0]
+        if total:
+            incrementar_version(conjunto)
+            db.session.commit()
+        resultado[conjunto] = total
+    return resultado
@@ -0,0 +1,149 @@
+import re
+from extensions import db
+from models import Usuarios, Mesas, CentrosVotacion
+from cache_util import CacheMemoria
+from indices_util import IndiceVersionado
+from serializacion_util import Serializador, a_float
+
+# --- Configuración ---
+INDICE_EN_MEMORIA = True      # Mesas y centros en dicts; DNIs consultados en una LRU
+MAX_DNI_EN_MEMORIA = 200000   # DNIs resueltos que se recuerdan
+TTL_DNI = 300                 # Las cargas del padrón cambian la versión 'padron'; el TTL cubre lo escrito fuera de ellas
+MAX_DNI_POR_LOTE = 5000       # DNIs por petición POST
+DNI_POR_CONSULTA = 1000       # Tamaño de cada IN (...) del lote
+# ---------------------
+
+_DNI = re.compile(r'\d{8}')
+_SIN_MESA = 0  # En la LRU: el DNI no existe o no tiene mesa asignada
+
+# Mesa y centro de cada ubicación (id_mesa sólo se usa como clave del índice)
+COLUMNAS_UBICACION = (
+    Mesas.id_mesa,
+    Mesas.numero_mesa,
+    Mesas.ubicacion_detalle,
+    CentrosVotacion.id_centro,
+    CentrosVotacion.nombre,
+    CentrosVotacion.direccion,
+    CentrosVotacion.distrito,
+    CentrosVotacion.latitud,
+    CentrosVotacion.longitud,
+)
+
+_serializar_centro = Serializador({
+    'id': 'id_centro',
+    'nombre': 'nombre',
+    'direccion': 'direccion',
+    'distrito': 'distrito',
+    'lat': ('latitud', a_float),
+    'lng': ('longitud', a_float),
+})
+
+
+def dni_valido(dni):
+    return isinstance(dni, str) and _DNI.fullmatch(dni) is not None
+
+
+def consulta_ubicaciones():
+    """Mesas con su centro: JOIN por la clave primaria de CentrosVotacion."""
+    return db.session.query(*COLUMNAS_UBICACION).join(
+        CentrosVotacion, Mesas.id_centro == CentrosVotacion.id_centro
+    )
+
+
+def _ubicacion(fila, centros):
+    """Ubicación serializada; el dict de cada centro se comparte entre sus mesas."""
+    centro = centros.get(fila.id_centro)
+    if centro is None:
+        centro = centros[fila.id_centro] = _serializar_centro(fila)
+    return {'numero_mesa': fila.numero_mesa, 'ubicacion_detalle': fila.ubicacion_detalle, 'centro': centro}
+
+
+class IndiceUbicaciones:
+    """
+    Todas las mesas (por id y por número) con su centro ya serializado.
+    Se reconstruye cuando cambia la versión de 'centros' (las cargas
+    escriben centros y mesas con la misma versión).
+    """
+
+    def __init__(self):
+        self.por_id = {}
+        self.por_numero = {}
+
+    def __len__(self):
+        return len(self.por_id)
+
+    def cargar(self):
+        centros = {}
+        for fila in consulta_ubicaciones():
+            ubicacion = _ubicacion(fila, centros)
+            self.por_id[fila.id_mesa] = ubicacion
+            self.por_numero[fila.numero_mesa] = ubicacion
+        return self
+
+
+_versionado = IndiceVersionado(('centros',), lambda anterior: IndiceUbicaciones().cargar())
+
+# LRU DNI -> id_mesa de los DNIs consultados (también los que no tienen
+# mesa): un DNI repetido no va a la base de datos y uno nuevo sólo lee
+# Usuarios por su índice único. Empieza vacía cuando una carga cambia el
+# padrón o las mesas.
+_versionado_dnis = IndiceVersionado(('centros', 'padron'), lambda anterior: CacheMemoria(MAX_DNI_EN_MEMORIA))
+
+
+def obtener_indice_ubicaciones():
+    """Devuelve el índice, reconstruyéndolo si cambió 'centros'."""
+    return _versionado.obtener()
+
+
+def obtener_dnis():
+    """Devuelve la LRU de DNIs, vacía de nuevo si cambió 'centros' o 'padron'."""
+    return _versionado_dnis.obtener()
+
+
+def _consultar_dnis(dnis):
+    """{dni: ubicación} con un JOIN Usuarios -> Mesas -> CentrosVotacion por claves indexadas."""
+    resultado, centros = {}, {}
+    for i in range(0, len(dnis), DNI_POR_CONSULTA):
+        filas = consulta_ubicaciones().add_columns(Usuarios.dni).join(
+            Usuarios, Usuarios.id_mesa == Mesas.id_mesa
+        ).filter(Usuarios.dni.in_(dnis[i:i + DNI_POR_CONSULTA])).all()
+        for fila in filas:
+            resultado[fila.dni] = _ubicacion(fila, centros)
+    return resultado
+
+
+def ubicaciones_por_dni(dnis):
+    """
+    {dni: ubicación (mesa y centro con coordenadas)} de los DNIs que tienen
+    mesa asignada; los demás no aparecen. 'dnis' ya validados y sin repetir.
+    """
+    if not INDICE_EN_MEMORIA:
+        return _consultar_dnis(dnis)
+
+    indice_actual = obtener_indice_ubicaciones()
+    dnis_conocidos = obtener_dnis()
+    resultado, pendientes = {}, []
+    for dni in dnis:
+        id_mesa = dnis_conocidos.get(dni)
+        if id_mesa is None:
+            pendientes.append(dni)
+        elif id_mesa in indice_actual.por_id:
+            resultado[dni] = indice_actual.por_id[id_mesa]
+
+    for i in range(0, len(pendientes), DNI_POR_CONSULTA):
+        lote = pendientes[i:i + DNI_POR_CONSULTA]
+        mesas = dict(db.session.query(Usuarios.dni, Usuarios.id_mesa).filter(Usuarios.dni.in_(lote)).all())
+        for dni in lote:
+            id_mesa = mesas.get(dni) or _SIN_MESA
+            dnis_conocidos.set(dni, id_mesa, TTL_DNI)
+            if id_mesa in indice_actual.por_id:
+                resultado[dni] = indice_actual.por_id[id_mesa]
+    return resultado
+
+
+def ubicacion_por_mesa(numero_mesa):
+    """Ubicación de una mesa por su número, o None si no existe."""
+    if INDICE_EN_MEMORIA:
+        return obtener_indice_ubicaciones().por_numero.get(numero_mesa)
+    fila = consulta_ubicaciones().filter(Mesas.numero_mesa == numero_mesa).first()
+    return _ubicacion(fila, {}) if fila is not None else None
@@ -0,0 +1,87 @@
+from urllib.parse import urlencode
+from flask import Response, request, stream_with_context
+from serializacion_util import dumps, respuesta_json
+
+# --- Configuración ---
+LIMITE_MAXIMO = 1000   # Máximo de filas por página
+FILAS_POR_LOTE = 500   # Tamaño del cursor del servidor en modo stream (yield_per)
+# ---------------------
+
+
+def leer_paginacion(tipo_cursor=str):
+    """
+    Lee los parámetros 'limit', 'cursor' y 'stream' de la petición.
+    Lanza ValueError si alguno no es válido (la ruta responde 400).
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'si')
+
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("'limit' debe ser mayor que 0")
+        limit = min(limit, LIMITE_MAXIMO)
+    if cursor is not None:
+        cursor = tipo_cursor(cursor)
+
+    return limit, cursor, stream
+
+
+def aplicar_keyset(query, columna_pk, cursor, limit):
+    """
+    Paginación por clave (keyset): WHERE pk > cursor ORDER BY pk LIMIT n.
+    Se pide una fila extra para saber si existe una página siguiente.
+    """
+    query = query.order_by(columna_pk)
+    if cursor is not None:
+        query = query.filter(columna_pk > cursor)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def respuesta_pagina(filas, serializar, clave_pk, limit):
+    """
+    Devuelve la página como lista JSON. Si hay más resultados, el cursor de
+    la siguiente página va en la cabecera X-Next-Cursor (y en Link rel=next).
+    """
+    siguiente = None
+    if limit is not None and len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = getattr(filas[-1], clave_pk)
+
+    response = respuesta_json([serializar(fila) for fila in filas])
+    if siguiente is not None:
+        args = request.args.to_dict()
+        args['cursor'] = siguiente
+        response.headers['X-Next-Cursor'] = str(siguiente)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
+
+
+def respuesta_stream(query, serializar, limit=None):
+    """
+    Escribe un arreglo JSON por fragmentos desde un generador. La consulta se
+    recorre con yield_per (cursor del lado del servidor), así la memoria usada
+    no depende del número de filas.
+    """
+    if limit is not None:
+        query = query.limit(limit)
+
+    def generar():
+        yield b'['
+        lote = []
+        separador = b''
+        for fila in query.yield_per(FILAS_POR_LOTE):
+            lote.append(serializar(fila))
+            if len(lote) >= FILAS_POR_LOTE:
+                # Un lote se codifica de una vez y se quitan sus corchetes
+                yield separador + dumps(lote)[1:-1]
+                separador = b','
+                lote = []
+        if lote:
+            yield separador + dumps(lote)[1:-1]
+        yield b']'
+
+    return Response(stream_with_context(generar()), mimetype='application/json')
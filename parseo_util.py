@@ -0,0 +1,379 @@
+import re
+from datetime import datetime
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree
+    LXML_DISPONIBLE = True
+except ImportError:  # lxml es opcional: se usa BeautifulSoup + html.parser
+    etree = None
+    LXML_DISPONIBLE = False
+
+# --- Configuración ---
+# 'lxml': análisis en streaming con lxml.etree.iterparse (si está instalado)
+# 'bs4':  BeautifulSoup con html.parser (comportamiento original)
+BACKEND_PREDETERMINADO = 'lxml' if LXML_DISPONIBLE else 'bs4'
+# ---------------------
+
+ID_TABLA_PARTIDOS = 'tblOrganizacionPolitica'
+CLASE_ITEM_CANDIDATO = 'vc_grid-item'
+
+RE_SIMBOLO = re.compile(r'/GetSimbolo/(\d+)')
+RE_FECHA = re.compile(r'Fecha de Inscripción:')
+RE_FONDO = re.compile(r"url\('([^']+)'\)")
+# Durante el parseo SoupStrainer ve el atributo 'class' completo, sin dividir
+RE_CLASE_ITEM = re.compile(r'(^|\s)' + CLASE_ITEM_CANDIDATO + r'(\s|$)')
+
+# Título del <span> de cada dato de contacto -> campo del partido
+CAMPOS_CONTACTO = (
+    ('Dirección', 'direccion_legal'),
+    ('Teléfonos', 'telefonos'),
+    ('Página web', 'sitio_web'),
+    ('Correo electrónico', 'email_contacto'),
+)
+
+
+class TablaNoEncontrada(Exception):
+    pass
+
+
+def resolver_backend(backend=None):
+    """Backend a usar; si se pide 'lxml' y no está instalado, cae a 'bs4'."""
+    backend = backend or BACKEND_PREDETERMINADO
+    if backend not in ('lxml', 'bs4'):
+        raise ValueError(f"Backend de parseo desconocido: {backend}")
+    if backend == 'lxml' and not LXML_DISPONIBLE:
+        return 'bs4'
+    return backend
+
+
+def _fecha_inscripcion(texto):
+    fecha_str = texto.replace('Fecha de Inscripción:', '').strip()
+    try:
+        # Convertir formato DD/MM/AAAA a un objeto Date de Python
+        return datetime.strptime(fecha_str, '%d/%m/%Y').date()
+    except ValueError:
+        print(f"Advertencia: No se pudo procesar la fecha '{fecha_str}'")
+        return None
+
+
+# --- Backend BeautifulSoup (html.parser) ---
+
+def _partidos_bs4(archivo, base_url):
+    # SoupStrainer: sólo se construye el árbol de la tabla de partidos
+    with open(archivo, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'html.parser', parse_only=SoupStrainer('table', id=ID_TABLA_PARTIDOS))
+
+    table = soup.find('table', id=ID_TABLA_PARTIDOS)
+    if not table:
+        raise TablaNoEncontrada(ID_TABLA_PARTIDOS)
+
+    for row in table.tbody.find_all('tr'):
+        partido = {}
+        # Las columnas son: N°, Organización Política, Información
+        cols = row.find_all('td')
+        if len(cols) != 3:
+            yield None
+            continue
+
+        col_org = cols[1]
+        img_tag = col_org.find('img')
+        if img_tag and img_tag.get('src'):
+            partido['logo_url'] = base_url + img_tag['src']
+            match = RE_SIMBOLO.search(img_tag['src'])
+            if match:
+                partido['jne_id_simbolo'] = int(match.group(1))
+
+        nombre_tag = col_org.find('span', title=True)
+        if nombre_tag:
+            partido['nombre_partido'] = nombre_tag.text.strip()
+
+        fecha_tag = col_org.find('span', string=RE_FECHA)
+        if fecha_tag:
+            partido['fecha_inscripcion'] = _fecha_inscripcion(fecha_tag.text)
+
+        col_info = cols[2]
+        for titulo, campo in CAMPOS_CONTACTO:
+            span = col_info.find('span', title=titulo)
+            if span and span.find_next('div'):
+                partido[campo] = span.find_next('div').text.strip()
+
+        for dt in col_info.find_all('dt'):
+            if 'Titular' in dt.text:
+                partido['personero_titular'] = dt.find_next_sibling('dd').text.strip()
+            elif 'Alterno' in dt.text:
+                partido['personero_alterno'] = dt.find_next_sibling('dd').text.strip()
+
+        yield partido
+
+
+def _candidatos_bs4(archivo, tipo_candidato):
+    with open(archivo, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'html.parser', parse_only=SoupStrainer('div', class_=RE_CLASE_ITEM))
+
+    for item in soup.select('div.' + CLASE_ITEM_CANDIDATO):
+        candidato = {}
+
+        name_tag = item.select_one('div.vc_gitem-post-data-source-post_title h4')
+        if name_tag:
+            candidato['nombre_candidato'] = name_tag.get_text(strip=True)
+
+        link_tag = item.select_one('a.vc_gitem-link')
+        if link_tag:
+            candidato['perfil_url'] = link_tag.get('href', None)
+
+        img_tag = item.select_one('img.vc_gitem-zone-img')
+        if img_tag:
+            candidato['imagen_url'] = img_tag.get('src', None)
+
+        if not candidato.get('imagen_url'):
+            style_div = item.select_one('div.vc_gitem-zone-a[style*="background-image"]')
+            if style_div:
+                match = RE_FONDO.search(style_div.get('style', ''))
+                if match:
+                    candidato['imagen_url'] = match.group(1)
+
+        candidato['tipo_candidato'] = tipo_candidato
+        yield candidato
+
+
+# --- Backend lxml (iterparse en streaming) ---
+
+def _xpath_clase(tag, clase):
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {clase} ')]"
+
+
+if LXML_DISPONIBLE:
+    X_TD = etree.XPath('.//td')
+    X_IMG = etree.XPath('.//img')
+    X_SPAN_TITULO = etree.XPath('.//span[@title]')
+    X_SPAN_HOJA = etree.XPath('.//span[not(*)]')
+    X_SPAN_CON_TITULO = etree.XPath('.//span[@title=$titulo]')
+    X_DIV_SIGUIENTE = etree.XPath('(descendant::div | following::div)[1]')
+    X_DT = etree.XPath('.//dt')
+    X_DD_HERMANO = etree.XPath('following-sibling::dd[1]')
+    X_NOMBRE = etree.XPath('.//' + _xpath_clase('div', 'vc_gitem-post-data-source-post_title') + '//h4')
+    X_LINK = etree.XPath('.//' + _xpath_clase('a', 'vc_gitem-link'))
+    X_IMAGEN = etree.XPath('.//' + _xpath_clase('img', 'vc_gitem-zone-img'))
+    X_FONDO = etree.XPath('.//' + _xpath_clase('div', 'vc_gitem-zone-a') + "[contains(@style, 'background-image')]")
+
+
+def _texto(el):
+    """Equivale a '.text' de BeautifulSoup."""
+    return ''.join(el.itertext())
+
+
+def _primero(resultado):
+    return resultado[0] if resultado else None
+
+
+def _tiene_clase(el, clase):
+    return clase in (el.get('class') or '').split()
+
+
+def _liberar(el):
+    """Libera el elemento ya procesado y sus hermanos anteriores."""
+    el.clear(keep_tail=True)
+    padre = el.getparent()
+    if padre is not None:
+        while el.getprevious() is not None:
+            del padre[0]
+
+
+def _iterparse(archivo, tag):
+    return etree.iterparse(
+        archivo, events=('end',), tag=tag, html=True,
+        encoding='utf-8', remove_comments=True, huge_tree=True
+    )
+
+
+def _partidos_lxml(archivo, base_url):
+    encontrada = False
+    for _, row in _iterparse(archivo, 'tr'):
+        tbody = row.getparent()
+        tabla = tbody.getparent() if tbody is not None else None
+        if tbody.tag != 'tbody' or tabla is None or tabla.get('id') != ID_TABLA_PARTIDOS:
+            continue
+        encontrada = True
+
+        partido = {}
+        cols = X_TD(row)
+        if len(cols) != 3:
+            _liberar(row)
+            yield None
+            continue
+
+        col_org = cols[1]
+        img_tag = _primero(X_IMG(col_org))
+        if img_tag is not None and img_tag.get('src'):
+            src = img_tag.get('src')
+            partido['logo_url'] = base_url + src
+            match = RE_SIMBOLO.search(src)
+            if match:
+                partido['jne_id_simbolo'] = int(match.group(1))
+
+        nombre_tag = _primero(X_SPAN_TITULO(col_org))
+        if nombre_tag is not None:
+            partido['nombre_partido'] = _texto(nombre_tag).strip()
+
+        for span in X_SPAN_HOJA(col_org):
+            if span.text and RE_FECHA.search(span.text):
+                partido['fecha_inscripcion'] = _fecha_inscripcion(span.text)
+                break
+
+        col_info = cols[2]
+        for titulo, campo in CAMPOS_CONTACTO:
+            span = _primero(X_SPAN_CON_TITULO(col_info, titulo=titulo))
+            div = _primero(X_DIV_SIGUIENTE(span)) if span is not None else None
+            if div is not None:
+                partido[campo] = _texto(div).strip()
+
+        for dt in X_DT(col_info):
+            texto_dt = _texto(dt)
+            if 'Titular' in texto_dt:
+                partido['personero_titular'] = _texto(X_DD_HERMANO(dt)[0]).strip()
+            elif 'Alterno' in texto_dt:
+                partido['personero_alterno'] = _texto(X_DD_HERMANO(dt)[0]).strip()
+
+        _liberar(row)
+        yield partido
+
+    if not encontrada:
+        raise TablaNoEncontrada(ID_TABLA_PARTIDOS)
+
+
+def _candidatos_lxml(archivo, tipo_candidato):
+    for _, item in _iterparse(archivo, 'div'):
+        if not _tiene_clase(item, CLASE_ITEM_CANDIDATO):
+            continue
+        candidato = {}
+
+        name_tag = _primero(X_NOMBRE(item))
+        if name_tag is not None:
+            candidato['nombre_candidato'] = ''.join(t.strip() for t in name_tag.itertext())
+
+        link_tag = _primero(X_LINK(item))
+        if link_tag is not None:
+            candidato['perfil_url'] = link_tag.get('href')
+
+        img_tag = _primero(X_IMAGEN(item))
+        if img_tag is not None:
+            candidato['imagen_url'] = img_tag.get('src')
+
+        if not candidato.get('imagen_url'):
+            style_div = _primero(X_FONDO(item))
+            if style_div is not None:
+                match = RE_FONDO.search(style_div.get('style', ''))
+                if match:
+                    candidato['imagen_url'] = match.group(1)
+
+        candidato['tipo_candidato'] = tipo_candidato
+        _liberar(item)
+        yield candidato
+
+
+# --- Interfaz usada por los scrapers ---
+
+def extraer_partidos(archivo, base_url, backend=None):
+    """
+    Itera las filas de la tabla 'tblOrganizacionPolitica' del HTML del JNE.
+    Produce un dict por partido, o None si la fila no tiene 3 columnas.
+    Lanza TablaNoEncontrada si el archivo no contiene la tabla.
+    """
+    if resolver_backend(backend) == 'lxml':
+        return _partidos_lxml(archivo, base_url)
+    return _partidos_bs4(archivo, base_url)
+
+
+def extraer_candidatos(archivo, tipo_candidato, backend=None):
+    """Itera las tarjetas 'div.vc_grid-item' del HTML de eleccionesperu.pe."""
+    if resolver_backend(backend) == 'lxml':
+        return _candidatos_lxml(archivo, tipo_candidato)
+    return _candidatos_bs4(archivo, tipo_candidato)
+
+
+# --- Benchmark: python parseo_util.py [--factor 100] [--repeticiones 3] ---
+
+ARCHIVOS_BENCHMARK = (
+    ('partidos_data.html', None),
+    ('alcaldes.html', 'Alcalde'),
+    ('gobernadores.html', 'Gobernador'),
+)
+
+
+def generar_sintetico(archivo, destino, factor):
+    """
+    Copia 'archivo' con su contenido repetido 'factor' veces: las filas del
+    <tbody> en el HTML de partidos y el documento completo en el de candidatos.
+    """
+    with open(archivo, 'r', encoding='utf-8') as f:
+        html = f.read()
+    inicio, fin = html.find('<tbody>'), html.rfind('</tbody>')
+    if inicio != -1 and fin != -1:
+        inicio += len('<tbody>')
+        html = html[:inicio] + html[inicio:fin] * factor + html[fin:]
+    else:
+        html = html * factor
+    with open(destino, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return destino
+
+
+def _extraer(archivo, tipo, backend):
+    if tipo is None:
+        return list(extraer_partidos(archivo, '', backend))
+    return list(extraer_candidatos(archivo, tipo, backend))
+
+
+def benchmark(archivos, repeticiones=3):
+    """Mide cada backend disponible y comprueba que la salida sea idéntica."""
+    import os
+    import time
+
+    backends = ['bs4'] + (['lxml'] if LXML_DISPONIBLE else [])
+    for archivo, tipo in archivos:
+        tiempos = {}
+        salidas = {}
+        for backend in backends:
+            mejor = None
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                salidas[backend] = _extraer(archivo, tipo, backend)
+                duracion = time.perf_counter() - inicio
+                mejor = duracion if mejor is None else min(mejor, duracion)
+            tiempos[backend] = mejor
+
+        kb = os.path.getsize(archivo) / 1024
+        filas = len(salidas['bs4'])
+        linea = f"{os.path.basename(archivo):32} {kb:9.0f} KB {filas:7} filas"
+        for backend in backends:
+            linea += f"  {backend}: {tiempos[backend] * 1000:8.1f} ms"
+        if 'lxml' in tiempos:
+            identica = salidas['lxml'] == salidas['bs4']
+            linea += f"  x{tiempos['bs4'] / tiempos['lxml']:.1f}  salida {'idéntica' if identica else 'DISTINTA'}"
+        print(linea)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    def _opcion(nombre, defecto):
+        if nombre in sys.argv:
+            return int(sys.argv[sys.argv.index(nombre) + 1])
+        return defecto
+
+    factor = _opcion('--factor', 100)
+    repeticiones = _opcion('--repeticiones', 3)
+    print(f"Backend predeterminado: {BACKEND_PREDETERMINADO}")
+
+    presentes = [(a, t) for a, t in ARCHIVOS_BENCHMARK if os.path.exists(a)]
+    benchmark(presentes, repeticiones)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        sinteticos = [
+            (generar_sintetico(a, os.path.join(carpeta, f"x{factor}_{os.path.basename(a)}"), factor), t)
+            for a, t in presentes
+        ]
+        benchmark(sinteticos, repeticiones)
@@ -0,0 +1,152 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from flask import g, has_app_context, has_request_context, current_app, request
+from flask_sqlalchemy.session import Session
+
+# Prefijo de las claves de SQLALCHEMY_BINDS que se generan para las réplicas
+PREFIJO_REPLICA = 'replica_'
+METODOS_LECTURA = ('GET', 'HEAD')
+
+_turno = itertools.count()
+_lock = threading.Lock()
+
+
+def configurar_replicas(app):
+    """
+    Convierte SQLALCHEMY_REPLICAS (lista de URIs) en binds 'replica_0',
+    'replica_1', ... de Flask-SQLAlchemy, con las opciones de
+    SQLALCHEMY_ENGINE_OPTIONS más SQLALCHEMY_REPLICAS_OPCIONES.
+    Se llama antes de db.init_app().
+    """
+    replicas = app.config.get('SQLALCHEMY_REPLICAS') or []
+    opciones = app.config.get('SQLALCHEMY_REPLICAS_OPCIONES') or {}
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    claves = []
+    for i, uri in enumerate(replicas):
+        clave = f'{PREFIJO_REPLICA}{i}'
+        binds[clave] = dict(opciones, url=uri)
+        claves.append(clave)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replicas'] = claves
+    if claves:
+        app.logger.info("Réplicas de lectura configuradas: %d", len(claves))
+
+
+def _marcar_lectura():
+    if request.method in METODOS_LECTURA:
+        g.db_lectura = True
+
+
+def lectura_en_replicas(blueprint):
+    """Las peticiones GET/HEAD del blueprint leen de las réplicas."""
+    blueprint.before_request(_marcar_lectura)
+    return blueprint
+
+
+@contextmanager
+def _lectura(valor):
+    anterior = g.get('db_lectura', False)
+    g.db_lectura = valor
+    try:
+        yield
+    finally:
+        g.db_lectura = anterior
+
+
+def en_escritor():
+    """
+    Fuerza el escritor dentro de una petición de lectura (p. ej. para leer
+    un dato recién escrito sin esperar a la replicación).
+    """
+    return _lectura(False)
+
+
+def en_replicas():
+    """Lee de las réplicas en una petición que no es GET (p. ej. consultas por lote vía POST)."""
+    return _lectura(True)
+
+
+class SesionEnrutada(Session):
+    """
+    Sesión que elige el engine de cada consulta:
+    - Las lecturas de una petición marcada (lectura_en_replicas) van a una
+      réplica, elegida por turnos (round-robin) al empezar la petición y
+      fija hasta que termina, para que todas sus consultas vean el mismo estado.
+    - Todo lo demás va al escritor (SQLALCHEMY_DATABASE_URI): scrapers,
+      cargas CLI, peticiones POST y cualquier flush o INSERT/UPDATE/DELETE,
+      aunque ocurra dentro de una petición GET.
+    """
+
+    def _usar_replica(self, clause):
+        if not (has_request_context() and g.get('db_lectura')):
+            return False
+        if self._flushing or self.info.get('escritura'):
+            return False
+        return not (clause is not None and getattr(clause, 'is_dml', False))
+
+    def _replica(self):
+        claves = current_app.extensions.get('replicas') if has_app_context() else None
+        if not claves:
+            return None
+        clave = self.info.get('replica')
+        if clave is None:
+            with _lock:
+                clave = claves[next(_turno) % len(claves)]
+            self.info['replica'] = clave
+        return self._db.engines[clave]
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._usar_replica(clause):
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        if self._flushing or (clause is not None and getattr(clause, 'is_dml', False)):
+            # Tras la primera escritura, el resto de la sesión lee del escritor
+            self.info['escritura'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# --- Prueba con SQLite: python replicas_util.py ---
+# Un archivo hace de escritor y otros dos de réplicas; cada uno tiene una
+# versión distinta en VersionDatos para ver de dónde lee cada petición.
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from flask import Blueprint, Flask, jsonify
+    from extensions import db
+    from models import VersionDatos, leer_versiones, incrementar_version
+
+    carpeta = tempfile.mkdtemp()
+    uris = [f"sqlite:///{os.path.join(carpeta, nombre)}.db" for nombre in ('escritor', 'replica0', 'replica1')]
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uris[0]
+    app.config['SQLALCHEMY_REPLICAS'] = uris[1:]
+    configurar_replicas(app)
+    db.init_app(app)
+
+    prueba = lectura_en_replicas(Blueprint('prueba', __name__))
+
+    @prueba.route('/version', methods=['GET', 'POST'])
+    def version():
+        if request.method == 'POST':
+            incrementar_version('prueba')
+            db.session.commit()
+        return jsonify(origen=str(db.session.get_bind().url).rsplit('/', 1)[-1], versiones=leer_versiones())
+
+    app.register_blueprint(prueba)
+
+    with app.app_context():
+        for i, engine in enumerate([db.engine] + [db.engines[c] for c in app.extensions['replicas']]):
+            VersionDatos.__table__.create(bind=engine)
+            with engine.begin() as conexion:
+                conexion.execute(VersionDatos.__table__.insert(), {'nombre': 'prueba', 'version': i * 100})
+
+    cliente = app.test_client()
+    for _ in range(4):
+        print('GET ', cliente.get('/version').get_json())
+    print('POST', cliente.post('/version').get_json())
+    with app.app_context():
+        print('Fuera de una petición (scrapers):', leer_versiones())
@@ -1,11 +1,13 @@
 import os
-import requests
-import re
-from bs4 import BeautifulSoup
-from datetime import datetime
+import sys
 from app import create_app  # Importa el factory de tu app Flask
 from extensions import db
-from models import PartidosPoliticos
+from models import PartidosPoliticos, incrementar_version, registrar_eliminaciones
+from descarga_util import Descargador
+from sincronizacion_util import sincronizar_tabla, IMAGEN_PARTIDO
+from parseo_util import extraer_partidos, resolver_backend, TablaNoEncontrada
+from huella_util import completar_huellas
+from bundle_util import regenerar_bundle
 
 #instalar dependencias: venv38/Scripts/activate && pip install -r requirements.txt
 #Ejecución: python scraper_util.py
@@ -17,127 +19,69 @@ BASE_JNE_URL = "https://sroppublico.jne.gob.pe"
 SOURCE_HTML_FILE = "partidos_data.html" 
 # ---------------------
 
-def parse_partidos_html(file_path):
+# Sesión HTTP compartida (pool de conexiones, reintentos y límite por host)
+descargador = Descargador()
+
+def parse_partidos_html(file_path, backend=None):
     """
     Analiza el archivo HTML guardado y extrae la información
     de la tabla de partidos políticos.
+
+    'backend' elige el parser ('lxml' o 'bs4'); por defecto lxml si está
+    instalado. Ambos producen la misma salida.
     """
-    print(f"Iniciando análisis de {file_path}...")
+    print(f"Iniciando análisis de {file_path} ({resolver_backend(backend)})...")
     
     if not os.path.exists(file_path):
         print(f"Error: No se encuentra el archivo '{file_path}'.")
         print("Por favor, guarda la respuesta HTML de la solicitud POST del JNE en este archivo.")
         return []
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Encontrar la tabla por su ID
-    table = soup.find('table', id='tblOrganizacionPolitica')
-    if not table:
+    partidos_data = []
+    try:
+        for partido in extraer_partidos(file_path, BASE_JNE_URL, backend):
+            if partido is None:
+                print("Advertencia: Se encontró una fila con formato inesperado. Omitiendo.")
+            elif 'nombre_partido' in partido:
+                partidos_data.append(partido)
+            else:
+                print("Advertencia: Se omitió una fila por no tener nombre de partido.")
+    except TablaNoEncontrada:
         print("Error: No se pudo encontrar la tabla con id='tblOrganizacionPolitica'.")
         return []
 
-    partidos_data = []
-    
-    # Iterar sobre las filas (tr) del cuerpo de la tabla (tbody)
-    for row in table.tbody.find_all('tr'):
-        partido = {}
-        # Las columnas son: N°, Organización Política, Información
-        cols = row.find_all('td')
-        
-        if len(cols) != 3:
-            print("Advertencia: Se encontró una fila con formato inesperado. Omitiendo.")
-            continue
-
-        # --- Columna 1: Organización Política (cols[1]) ---
-        col_org = cols[1]
-        
-        # Logo URL y JNE ID
-        img_tag = col_org.find('img')
-        if img_tag and img_tag.get('src'):
-            partido['logo_url'] = BASE_JNE_URL + img_tag['src']
-            # Extraer JNE ID del logo (ej: /Consulta/Simbolo/GetSimbolo/4)
-            match = re.search(r'/GetSimbolo/(\d+)', img_tag['src'])
-            if match:
-                partido['jne_id_simbolo'] = int(match.group(1))
-
-        # Nombre del Partido
-        nombre_tag = col_org.find('span', title=True)
-        if nombre_tag:
-            partido['nombre_partido'] = nombre_tag.text.strip()
-            
-        # Fecha Inscripción
-        # Buscamos el span que contenga el texto 'Fecha de Inscripción:'
-        fecha_tag = col_org.find('span', string=re.compile(r'Fecha de Inscripción:'))
-        if fecha_tag:
-            fecha_str = fecha_tag.text.replace('Fecha de Inscripción:', '').strip()
-            try:
-                # Convertir formato DD/MM/AAAA a un objeto Date de Python
-                partido['fecha_inscripcion'] = datetime.strptime(fecha_str, '%d/%m/%Y').date()
-            except ValueError:
-                print(f"Advertencia: No se pudo procesar la fecha '{fecha_str}'")
-                partido['fecha_inscripcion'] = None
-
-        # --- Columna 2: Información (cols[2]) ---
-        col_info = cols[2]
-        
-        # Dirección (glyphicon-map-marker)
-        dir_div = col_info.find('span', title='Dirección')
-        if dir_div and dir_div.find_next('div'):
-            partido['direccion_legal'] = dir_div.find_next('div').text.strip()
-
-        # Teléfonos (glyphicon-phone-alt)
-        tel_div = col_info.find('span', title='Teléfonos')
-        if tel_div and tel_div.find_next('div'):
-            partido['telefonos'] = tel_div.find_next('div').text.strip()
-
-        # Web (glyphicon-globe)
-        web_div = col_info.find('span', title='Página web')
-        if web_div and web_div.find_next('div'):
-            partido['sitio_web'] = web_div.find_next('div').text.strip()
-
-        # Email (glyphicon-envelope)
-        email_div = col_info.find('span', title='Correo electrónico')
-        if email_div and email_div.find_next('div'):
-            partido['email_contacto'] = email_div.find_next('div').text.strip()
-
-        # Personeros (glyphicon-user)
-        for dt in col_info.find_all('dt'):
-            if 'Titular' in dt.text:
-                partido['personero_titular'] = dt.find_next_sibling('dd').text.strip()
-            elif 'Alterno' in dt.text:
-                partido['personero_alterno'] = dt.find_next_sibling('dd').text.strip()
-
-        if 'nombre_partido' in partido:
-            partidos_data.append(partido)
-        else:
-            print("Advertencia: Se omitió una fila por no tener nombre de partido.")
-
     print(f"Se encontraron {len(partidos_data)} partidos válidos en el HTML.")
     return partidos_data
 
 def download_logo(url):
     """Descarga la imagen del logo y devuelve los datos binarios (BLOB)."""
-    if not url:
-        return None
-    try:
-        # Usamos stream=True para manejo eficiente
-        response = requests.get(url, timeout=10, stream=True)
-        response.raise_for_status() # Lanza error si la descarga falla
-        
-        # Retornamos el contenido binario
-        return response.content
-    except requests.RequestException as e:
-        print(f"Error al descargar logo {url}: {e}")
-        return None
-
-def populate_database(app):
+    return descargador.descargar(url)
+
+def registro_partido(data):
+    """Campos del modelo PartidosPoliticos a partir de un partido extraído del HTML."""
+    return {
+        'jne_id_simbolo': data.get('jne_id_simbolo'),
+        'nombre_partido': data.get('nombre_partido'),
+        'fecha_inscripcion': data.get('fecha_inscripcion'),
+        'logo_url': data.get('logo_url'),
+        'direccion_legal': data.get('direccion_legal'),
+        'telefonos': data.get('telefonos'),
+        'sitio_web': data.get('sitio_web'),
+        'email_contacto': data.get('email_contacto'),
+        'personero_titular': data.get('personero_titular'),
+        'personero_alterno': data.get('personero_alterno')
+        # 'siglas' e 'ideologia' se dejan por defecto (NULL o 'Desconocido')
+    }
+
+def populate_database(app, incremental=True):
     """
-    Usa el contexto de la app Flask para conectarse a la BD,
-    borrar datos antiguos e insertar los nuevos.
+    Usa el contexto de la app Flask para conectarse a la BD y sincronizar
+    los partidos con el HTML.
+
+    - incremental=True: compara por 'jne_id_simbolo' y sólo inserta,
+      actualiza o borra lo que cambió; los logos se revalidan con GET
+      condicional en lugar de descargarse de nuevo.
+    - incremental=False: borra todos los registros y los vuelve a cargar.
     """
     # app.app_context() asegura que estemos dentro de la aplicación Flask
     # para que 'db' (SQLAlchemy) sepa a qué BD conectarse.
@@ -148,36 +92,37 @@ def populate_database(app):
             print("No hay datos para poblar. Terminando.")
             return
 
+        # Los partidos sin 'jne_id_simbolo' sólo se insertan en la recarga
+        # completa; en la incremental se omiten y se informan en el resumen
+        registros = [registro_partido(data) for data in partidos_list]
+
         try:
-            print("Limpiando tabla 'PartidosPoliticos'...")
-            # Borra todos los registros existentes para evitar duplicados
-            num_deleted = db.session.query(PartidosPoliticos).delete()
-            print(f"Se eliminaron {num_deleted} registros antiguos.")
-            
-            print(f"Insertando {len(partidos_list)} partidos nuevos en la BD...")
-            for data in partidos_list:
-                # Descargar el logo y obtener los bytes (BLOB)
-                logo_blob = download_logo(data.get('logo_url'))
-                
-                # Crear la nueva instancia del modelo
-                nuevo_partido = PartidosPoliticos(
-                    jne_id_simbolo=data.get('jne_id_simbolo'),
-                    nombre_partido=data.get('nombre_partido'),
-                    fecha_inscripcion=data.get('fecha_inscripcion'),
-                    logo_blob=logo_blob, # Guardamos los datos binarios
-                    direccion_legal=data.get('direccion_legal'),
-                    telefonos=data.get('telefonos'),
-                    sitio_web=data.get('sitio_web'),
-                    email_contacto=data.get('email_contacto'),
-                    personero_titular=data.get('personero_titular'),
-                    personero_alterno=data.get('personero_alterno')
-                    # 'siglas' e 'ideologia' se dejan por defecto (NULL o 'Desconocido')
-                )
-                db.session.add(nuevo_partido)
-            
+            if not incremental:
+                print("Limpiando tabla 'PartidosPoliticos'...")
+                # Borra todos los registros existentes para evitar duplicados
+                ids = [fila[0] for fila in db.session.query(PartidosPoliticos.id_partido)]
+                registrar_eliminaciones(PartidosPoliticos, ids)
+                num_deleted = db.session.query(PartidosPoliticos).delete()
+                print(f"Se eliminaron {num_deleted} registros antiguos.")
+
+            print(f"Sincronizando {len(registros)} partidos con la BD...")
+            resumen = sincronizar_tabla(
+                PartidosPoliticos, 'jne_id_simbolo', registros, descargador, imagen=IMAGEN_PARTIDO,
+                insertar_sin_clave=not incremental
+            )
+
+            # Huellas de logos cargados antes de existir la columna
+            huellas = completar_huellas()
+
+            # Nueva versión de los datos: invalida cachés e índices en memoria
+            if resumen['insertados'] or resumen['actualizados'] or resumen['eliminados'] or huellas:
+                incrementar_version('partidos')
+
             # Confirmar la transacción
             db.session.commit()
             print("¡Base de datos poblada exitosamente!")
+            regenerar_bundle()
+            return resumen
             
         except Exception as e:
             # Si algo falla, revertir la transacción
@@ -187,6 +132,7 @@ def populate_database(app):
 if __name__ == "__main__":
     # Creamos una instancia de la app Flask para tener el contexto
     # de la base de datos (SQLAlchemy) según tu factory pattern en app.py
+    # Uso: python scraper_util.py [--completo]
     print("Creando contexto de la aplicación Flask...")
     app = create_app()
-    populate_database(app)
\ No newline at end of file
+    populate_database(app, incremental='--completo' not in sys.argv)
\ No newline at end of file
@@ -0,0 +1,193 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask import current_app
+from metricas_util import cronometro
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin 'pip install orjson' se usa el json de la stdlib
+    orjson = None
+
+
+def a_float(valor):
+    """Numeric (Decimal) -> float; None se mantiene."""
+    return float(valor) if valor is not None else None
+
+
+def a_iso(valor):
+    """date / datetime -> texto ISO 8601; None se mantiene."""
+    return valor.isoformat() if valor is not None else None
+
+
+def _tipo_python(tipo):
+    try:
+        return tipo.python_type
+    except NotImplementedError:
+        return object
+
+
+def _conversion_de_tipo(tipo):
+    python_type = _tipo_python(tipo)
+    if issubclass(python_type, Decimal):
+        return a_float
+    if issubclass(python_type, (date, datetime, time)):
+        return a_iso
+    return None
+
+
+class Serializador:
+    """
+    Convierte filas (objetos ORM o Row de una proyección) en dicts o tuplas
+    listos para JSON. El código de cada conjunto de campos se genera una
+    vez, como una función con todos los accesos escritos en línea (igual
+    que collections.namedtuple), en lugar de recorrer los campos por fila.
+
+    'campos' es {nombre_salida: especificacion}, donde la especificación es:
+    - 'atributo' o 'relacion.atributo': se copia tal cual;
+    - ('atributo', conversion): se aplica conversion(valor), p. ej. a_float;
+    - una función que recibe la fila (URLs, objetos anidados, otro Serializador).
+    """
+
+    def __init__(self, campos):
+        if not campos:
+            raise ValueError("El serializador necesita al menos un campo")
+        self.nombres = tuple(campos)
+        self.dict = self._compilar(campos, 'dict')
+        self.tupla = self._compilar(campos, 'tupla')
+
+    @classmethod
+    def de_columnas(cls, columnas):
+        """Serializador con el nombre y la conversión que indica el tipo de cada columna."""
+        campos = {}
+        for columna in columnas:
+            conversion = _conversion_de_tipo(columna.type)
+            campos[columna.key] = (columna.key, conversion) if conversion else columna.key
+        return cls(campos)
+
+    def _compilar(self, campos, forma):
+        espacio = {}
+        expresiones = []
+        for i, (nombre, spec) in enumerate(campos.items()):
+            if callable(spec):
+                espacio[f'_f{i}'] = spec
+                expr = f'_f{i}(fila)'
+            else:
+                atributo, conversion = spec if isinstance(spec, tuple) else (spec, None)
+                if not all(parte.isidentifier() for parte in atributo.split('.')):
+                    raise ValueError(f"Atributo no válido en el campo '{nombre}': {atributo!r}")
+                expr = f'fila.{atributo}'
+                if conversion is not None:
+                    espacio[f'_c{i}'] = conversion
+                    expr = f'_c{i}({expr})'
+            expresiones.append(f'{nombre!r}: {expr}' if forma == 'dict' else expr)
+
+        cuerpo = '{%s}' % ', '.join(expresiones) if forma == 'dict' else '(%s,)' % ', '.join(expresiones)
+        exec(f'def serializar(fila):\n    return {cuerpo}\n', espacio)
+        return espacio['serializar']
+
+    def __call__(self, fila):
+        return self.dict(fila)
+
+    def lista(self, filas):
+        with cronometro('serializacion'):
+            return list(map(self.dict, filas))
+
+    def columnar(self, filas):
+        """Formato columnar: nombres una vez y cada fila como lista."""
+        with cronometro('serializacion'):
+            return {'columnas': list(self.nombres), 'filas': list(map(self.tupla, filas))}
+
+
+class Serializable:
+    """
+    Mixin de los modelos: to_dict() con un Serializador generado a partir
+    de las columnas (sin los BLOBs). '__serializar__' limita los campos.
+    """
+
+    __serializar__ = None
+
+    @classmethod
+    def serializador(cls):
+        if '_serializador' not in cls.__dict__:
+            columnas = [
+                c for c in cls.__table__.columns
+                if not issubclass(_tipo_python(c.type), bytes)
+                and (cls.__serializar__ is None or c.key in cls.__serializar__)
+            ]
+            cls._serializador = Serializador.de_columnas(columnas)
+        return cls._serializador
+
+    def to_dict(self):
+        return self.serializador().dict(self)
+
+
+def _por_defecto(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    raise TypeError(f'Tipo no serializable a JSON: {type(valor).__name__}')
+
+
+def dumps(datos):
+    """JSON compacto en UTF-8 (bytes): orjson si está instalado, si no la stdlib."""
+    with cronometro('serializacion'):
+        if orjson is not None:
+            return orjson.dumps(datos, default=_por_defecto)
+        return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=_por_defecto).encode('utf-8')
+
+
+def respuesta_json(datos, status=200):
+    """Equivalente a jsonify() con el codificador de este módulo."""
+    return current_app.response_class(dumps(datos), status=status, mimetype='application/json')
+
+
+# --- Benchmark: python serializacion_util.py ---
+
+if __name__ == "__main__":
+    import random
+    import timeit
+    from types import SimpleNamespace
+
+    random.seed(0)
+
+    def antes(c):
+        # Serialización escrita a mano que usaban las rutas
+        return {
+            "id": c.id_centro,
+            "nombre": c.nombre,
+            "distrito": c.distrito,
+            "lat": float(c.latitud) if c.latitud is not None else None,
+            "lng": float(c.longitud) if c.longitud is not None else None
+        }
+
+    despues = Serializador({
+        'id': 'id_centro',
+        'nombre': 'nombre',
+        'distrito': 'distrito',
+        'lat': ('latitud', a_float),
+        'lng': ('longitud', a_float),
+    })
+
+    print(f"Codificador: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    for n in (10000, 100000):
+        filas = [
+            SimpleNamespace(
+                id_centro=f'{i:036d}', nombre=f'I.E. {random.randint(1, 9999)}', distrito='Surquillo',
+                latitud=Decimal(f'-12.{random.randint(0, 99999999):08d}'),
+                longitud=Decimal(f'-77.{random.randint(0, 99999999):08d}'),
+            )
+            for i in range(n)
+        ]
+        assert [antes(f) for f in filas[:100]] == despues.lista(filas[:100])
+
+        def medir(funcion):
+            return min(timeit.repeat(funcion, number=1, repeat=3)) / n * 1e6
+
+        t_antes = medir(lambda: json.dumps([antes(f) for f in filas]))
+        t_despues = medir(lambda: dumps(despues.lista(filas)))
+        t_columnar = medir(lambda: dumps(despues.columnar(filas)))
+        print(f"  {n:6} filas: a mano + json {t_antes:.2f} µs/fila, "
+              f"generado + {'orjson' if orjson else 'json'} {t_despues:.2f} µs/fila, "
+              f"columnar {t_columnar:.2f} µs/fila")
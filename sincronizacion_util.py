@@ -0,0 +1,187 @@
+import hashlib
+import json
+from collections import namedtuple
+from sqlalchemy import update
+from extensions import db
+from models import registrar_eliminaciones
+from media_util import hash_blob
+from carga_masiva_util import insertar_en_lotes
+from imagen_util import actualizar_variantes
+from huella_util import huella_guardada
+
+# --- Configuración ---
+TAM_LOTE_BORRADO = 500
+# ---------------------
+
+# Nombres de los atributos de imagen de un modelo
+# 'tipo' identifica sus variantes en VariantesImagen; 'huella' (opcional) es
+# el atributo donde se guarda la huella perceptual de la imagen
+EspecImagen = namedtuple('EspecImagen', 'blob hash url etag modificado tipo huella', defaults=(None,))
+
+IMAGEN_PARTIDO = EspecImagen('logo_blob', 'logo_hash', 'logo_url', 'logo_etag', 'logo_modificado', 'partido', 'logo_huella')
+IMAGEN_CANDIDATO = EspecImagen('imagen_blob', 'imagen_hash', 'imagen_url', 'imagen_etag', 'imagen_modificado', 'candidato')
+
+
+def hash_contenido(campos):
+    """SHA-256 de los campos extraídos (orden estable, fechas como texto)."""
+    texto = json.dumps(campos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _imagen_distinta(descarga, actual):
+    """True si la descarga trae bytes distintos a los guardados."""
+    if descarga is None or not descarga.contenido:
+        return False
+    return actual is None or hash_blob(descarga.contenido) != actual[6]
+
+
+def _campos_imagen(imagen, descarga):
+    campos = {
+        imagen.blob: descarga.contenido,
+        imagen.hash: hash_blob(descarga.contenido),
+        imagen.etag: descarga.etag,
+        imagen.modificado: descarga.modificado,
+    }
+    if imagen.huella:
+        campos[imagen.huella] = huella_guardada(descarga.contenido)
+    return campos
+
+
+def sincronizar_tabla(modelo, clave, registros, descargador, imagen=None, revalidar_imagenes=True,
+                      insertar_sin_clave=False):
+    """
+    Sincroniza 'modelo' con los registros extraídos, por clave natural.
+
+    - registros: lista de dicts {atributo: valor}; deben incluir 'clave' y,
+      si hay imagen, la URL en el atributo imagen.url.
+    - Inserta los nuevos, actualiza sólo los que cambiaron (hash_contenido),
+      borra los que ya no aparecen y conserva la clave primaria del resto.
+    - Las imágenes nuevas se descargan; las ya conocidas se revalidan con
+      GET condicional (ETag / Last-Modified) y un 304 no transfiere bytes.
+    - Después se generan las variantes de tamaño de las imágenes nuevas o
+      cambiadas (imagen_util.actualizar_variantes).
+    - Los registros sin clave no se pueden comparar: con insertar_sin_clave
+      (recarga completa, tabla recién vaciada) se insertan como antes; si
+      no, se omiten y se cuentan en resumen['sin_clave']. Las filas de la
+      tabla sin clave tampoco se tocan.
+
+    No confirma la transacción. Devuelve el resumen de cambios.
+    """
+    pk = modelo.__mapper__.primary_key[0]
+    col_clave = getattr(modelo, clave)
+    columnas = [pk, col_clave, modelo.hash_contenido]
+    if imagen:
+        columnas += [
+            getattr(modelo, imagen.url),
+            getattr(modelo, imagen.etag),
+            getattr(modelo, imagen.modificado),
+            getattr(modelo, imagen.hash),
+        ]
+
+    # Estado actual sin leer BLOBs: clave natural -> fila
+    existentes = {fila[1]: fila for fila in db.session.query(*columnas).filter(col_clave.isnot(None))}
+
+    nuevos, modificados, sin_cambios, nuevos_sin_clave = [], [], [], []
+    peticiones = {}
+    vistos = set()
+    omitidos = 0
+    for campos in registros:
+        valor_clave = campos.get(clave)
+        if valor_clave is None or valor_clave == '':
+            if not insertar_sin_clave:
+                omitidos += 1
+                continue
+            nuevos_sin_clave.append((dict(campos, **{clave: None}), hash_contenido(campos)))
+            if imagen and campos.get(imagen.url):
+                peticiones[campos[imagen.url]] = (None, None)
+            continue
+        if valor_clave in vistos:
+            continue
+        vistos.add(valor_clave)
+        firma = hash_contenido(campos)
+        actual = existentes.get(valor_clave)
+
+        if actual is None:
+            nuevos.append((campos, firma))
+        elif actual[2] != firma:
+            modificados.append((actual, campos, firma))
+        else:
+            sin_cambios.append((actual, campos))
+
+        if imagen and campos.get(imagen.url):
+            url = campos[imagen.url]
+            if actual is not None and actual[3] == url:
+                if revalidar_imagenes or actual[2] != firma:
+                    peticiones.setdefault(url, (actual[4], actual[5]))
+            else:
+                peticiones[url] = (None, None)
+
+    descargas = descargador.descargar_todos_condicional(peticiones) if imagen else {}
+
+    # --- Inserciones (executemany por lotes) ---
+    def fila_nueva(campos, firma):
+        fila = dict(campos, hash_contenido=firma)
+        if imagen:
+            descarga = descargas.get(campos.get(imagen.url))
+            if descarga is not None and descarga.contenido:
+                fila.update(_campos_imagen(imagen, descarga))
+        return fila
+
+    insertar_en_lotes(modelo, [fila_nueva(c, f) for c, f in nuevos], clave=clave)
+    # Sin clave no hay upsert: cada registro es una fila nueva
+    insertar_en_lotes(modelo, [fila_nueva(c, f) for c, f in nuevos_sin_clave])
+
+    # --- Actualizaciones (UPDATE por clave primaria, sin cargar objetos) ---
+    cambios = []
+    for actual, campos, firma in modificados:
+        fila = dict(campos, hash_contenido=firma)
+        fila[pk.key] = actual[0]
+        if imagen:
+            descarga = descargas.get(campos.get(imagen.url))
+            if _imagen_distinta(descarga, actual):
+                fila.update(_campos_imagen(imagen, descarga))
+        cambios.append(fila)
+
+    # Filas sin cambios cuya imagen sí cambió en el servidor (200 en vez de 304)
+    imagenes_nuevas = 0
+    if imagen:
+        for actual, campos in sin_cambios:
+            descarga = descargas.get(campos.get(imagen.url))
+            if _imagen_distinta(descarga, actual):
+                fila = {pk.key: actual[0]}
+                fila.update(_campos_imagen(imagen, descarga))
+                cambios.append(fila)
+                imagenes_nuevas += 1
+
+    # Agrupar por conjunto de columnas (executemany exige claves homogéneas)
+    por_columnas = {}
+    for fila in cambios:
+        por_columnas.setdefault(tuple(sorted(fila)), []).append(fila)
+    for filas in por_columnas.values():
+        db.session.execute(update(modelo), filas)
+
+    # --- Borrados: filas que ya no aparecen en la fuente ---
+    ausentes = [fila[0] for valor, fila in existentes.items() if valor not in vistos]
+    for i in range(0, len(ausentes), TAM_LOTE_BORRADO):
+        lote = ausentes[i:i + TAM_LOTE_BORRADO]
+        db.session.query(modelo).filter(pk.in_(lote)).delete(synchronize_session=False)
+    # Borrado masivo: no pasa por los eventos del ORM, se registra aquí
+    registrar_eliminaciones(modelo, ausentes)
+
+    # --- Variantes redimensionadas (WebP / JPEG) de las imágenes nuevas o cambiadas ---
+    if imagen:
+        actualizar_variantes(imagen.tipo, modelo, imagen.blob, imagen.hash)
+
+    resumen = {
+        'insertados': len(nuevos) + len(nuevos_sin_clave),
+        'actualizados': len(modificados) + imagenes_nuevas,
+        'eliminados': len(ausentes),
+        'sin_cambios': len(sin_cambios) - imagenes_nuevas,
+        'sin_clave': omitidos,
+    }
+    print(f"{modelo.__tablename__}: {resumen['insertados']} insertados, {resumen['actualizados']} actualizados, "
+          f"{resumen['eliminados']} eliminados, {resumen['sin_cambios']} sin cambios.")
+    if omitidos:
+        print(f"Advertencia: {modelo.__tablename__}: se omitieron {omitidos} registros sin '{clave}' "
+              f"(no se pueden comparar; una recarga completa los inserta).")
+    return resumen
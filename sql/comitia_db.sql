@@ -7,6 +7,9 @@ COLLATE utf8mb4_unicode_ci;
 
 USE comitia_db;
 
+-- Este script crea el esquema de la última migración (migrations/): en una
+-- base creada con él, marcarla con 'flask --app app db stamp head'.
+
 -- -----------------------------------------------------
 -- Configuración del Motor de Almacenamiento
 -- -----------------------------------------------------
@@ -21,7 +24,11 @@ CREATE TABLE IF NOT EXISTS CentrosVotacion (
   direccion VARCHAR(255) NOT NULL,
   distrito VARCHAR(100),
   latitud DECIMAL(10, 8), 
-  longitud DECIMAL(11, 8)
+  longitud DECIMAL(11, 8),
+  fecha_actualizacion DATETIME(6) NULL,
+
+  -- Cambios desde un token (/api/sync)
+  INDEX ix_CentrosVotacion_fecha_actualizacion (fecha_actualizacion)
 ) COMMENT='Lugares físicos de votación (colegios, etc.)';
 
 
@@ -33,9 +40,11 @@ CREATE TABLE IF NOT EXISTS Mesas (
   id_centro CHAR(36) NOT NULL,
   numero_mesa VARCHAR(10) NOT NULL UNIQUE,
   ubicacion_detalle VARCHAR(255), 
+  fecha_actualizacion DATETIME(6) NULL,
   
   -- Índice para acelerar las búsquedas por centro
   INDEX idx_id_centro (id_centro), 
+  INDEX ix_Mesas_fecha_actualizacion (fecha_actualizacion),
   
   FOREIGN KEY (id_centro) REFERENCES CentrosVotacion(id_centro)
     ON DELETE RESTRICT -- Opcional: previene borrar un centro si tiene mesas
@@ -71,12 +80,17 @@ CREATE TABLE IF NOT EXISTS Usuarios (
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS PartidosPoliticos (
   id_partido CHAR(36) PRIMARY KEY DEFAULT (UUID()),
-  jne_id_simbolo INT NULL COMMENT 'ID interno del JNE (ej: /GetSimbolo/4)',
+  jne_id_simbolo INT NULL UNIQUE COMMENT 'ID interno del JNE (ej: /GetSimbolo/4)',
   nombre_partido VARCHAR(255) NOT NULL,
   siglas VARCHAR(50) NULL,
   fecha_inscripcion DATE NULL,
   
   logo_blob MEDIUMBLOB NULL COMMENT 'Datos binarios de la imagen del logo',
+  logo_hash VARCHAR(64) NULL COMMENT 'SHA-256 del logo (ETag / URL versionada)',
+  logo_huella VARCHAR(32) NULL COMMENT 'pHash + dHash del logo (ver huella_util)',
+  logo_url VARCHAR(500) NULL,
+  logo_etag VARCHAR(255) NULL,
+  logo_modificado VARCHAR(64) NULL COMMENT 'Cabecera Last-Modified',
   nombre_candidato_principal VARCHAR(255) NULL COMMENT 'Nombre del candidato principal',
   foto_candidato_principal MEDIUMBLOB NULL COMMENT 'Foto del candidato principal',
   
@@ -90,11 +104,94 @@ CREATE TABLE IF NOT EXISTS PartidosPoliticos (
   
   ideologia ENUM('Izquierda', 'CentroIzquierda', 'Centro', 'CentroDerecha', 'Derecha', 'Otro', 'Desconocido') NULL DEFAULT 'Desconocido',
 
+  hash_contenido VARCHAR(64) NULL COMMENT 'Hash de los campos extraídos del HTML',
+  fecha_actualizacion DATETIME(6) NULL,
+
   -- Índice para acelerar búsquedas por nombre (como en models.py)
-  INDEX idx_nombre_partido (nombre_partido)
+  INDEX idx_nombre_partido (nombre_partido),
+  INDEX ix_PartidosPoliticos_fecha_actualizacion (fecha_actualizacion)
   
 ) COMMENT='Agrupaciones políticas. Logos guardados como BLOB.';
 
+
+-- -----------------------------------------------------
+-- Tabla: candidatos
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS candidatos (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  nombre_completo VARCHAR(255) NOT NULL,
+  tipo_candidatura VARCHAR(11) NULL COMMENT 'Gobernador o Alcalde',
+  perfil_url VARCHAR(500) NULL UNIQUE,
+
+  imagen_blob MEDIUMBLOB NULL,
+  imagen_hash VARCHAR(64) NULL,
+  imagen_url VARCHAR(500) NULL,
+  imagen_etag VARCHAR(255) NULL,
+  imagen_modificado VARCHAR(64) NULL,
+
+  partido_politico_id CHAR(36) NULL,
+  region VARCHAR(50) NULL,
+  biografia TEXT NULL,
+  fecha_creacion DATETIME NULL,
+  fecha_actualizacion DATETIME(6) NULL,
+  hash_contenido VARCHAR(64) NULL COMMENT 'Hash de los campos extraídos del HTML',
+
+  INDEX ix_candidatos_fecha_actualizacion (fecha_actualizacion),
+
+  FOREIGN KEY (partido_politico_id) REFERENCES PartidosPoliticos(id_partido)
+) COMMENT='Candidatos regionales y municipales.';
+
+
+-- -----------------------------------------------------
+-- Tabla: VariantesImagen
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS VariantesImagen (
+  tipo VARCHAR(20) NOT NULL COMMENT '''partido'' o ''candidato''',
+  id_entidad VARCHAR(36) NOT NULL,
+  tamano INT NOT NULL COMMENT 'Lado mayor en píxeles (0 = tamaño original)',
+  formato VARCHAR(10) NOT NULL COMMENT '''webp'' o ''jpeg''',
+  datos MEDIUMBLOB NOT NULL,
+  hash VARCHAR(64) NOT NULL,
+  hash_origen VARCHAR(64) NOT NULL,
+  ancho INT NOT NULL,
+  alto INT NOT NULL,
+  PRIMARY KEY (tipo, id_entidad, tamano, formato)
+) COMMENT='Logos y fotos redimensionados y sin metadatos (ver imagen_util).';
+
+
+-- -----------------------------------------------------
+-- Tabla: VersionDatos
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS VersionDatos (
+  nombre VARCHAR(50) PRIMARY KEY,
+  version INT NOT NULL DEFAULT 0
+) COMMENT='Versión de cada conjunto de datos: invalida cachés e índices en memoria.';
+
+
+-- -----------------------------------------------------
+-- Tabla: CargasArchivo
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS CargasArchivo (
+  archivo VARCHAR(255) PRIMARY KEY,
+  huella VARCHAR(64) NOT NULL,
+  filas INT NOT NULL DEFAULT 0,
+  completada BOOL NOT NULL DEFAULT FALSE,
+  fecha_actualizacion DATETIME(6) NULL,
+  INDEX ix_CargasArchivo_fecha_actualizacion (fecha_actualizacion)
+) COMMENT='Punto de control de las cargas CSV (carga_csv_util).';
+
+
+-- -----------------------------------------------------
+-- Tabla: Eliminaciones
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS Eliminaciones (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  tabla VARCHAR(50) NOT NULL,
+  id_entidad VARCHAR(36) NOT NULL,
+  fecha DATETIME(6) NOT NULL,
+  INDEX ix_Eliminaciones_fecha (fecha)
+) COMMENT='Registros borrados de las tablas sincronizables (/api/sync).';
+
 INSERT INTO CentrosVotacion (id_centro, nombre, direccion, distrito, latitud, longitud)
 VALUES (
   UUID(),
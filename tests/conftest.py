@@ -0,0 +1,30 @@
+import pytest
+from benchmark import crear_app
+from benchmark.generador import generar
+
+# Datos sintéticos pequeños: las pruebas cuentan consultas y filas, no miden tiempos
+TAMANO = dict(partidos=5, candidatos=100, centros=50, usuarios=100, bytes_logo=64, bytes_foto=64)
+
+
+@pytest.fixture(scope='session')
+def uri(tmp_path_factory):
+    """
+    Archivo SQLite con datos sintéticos, compartido por todas las pruebas.
+    Es uno solo porque los índices en memoria (búsqueda, mapa, padrón) son
+    del proceso y se invalidan por VersionDatos: dos bases distintas con la
+    misma versión se confundirían.
+    """
+    ruta = tmp_path_factory.mktemp('bd') / 'comitia.db'
+    uri = f'sqlite:///{ruta}'
+    app = crear_app(uri)
+    with app.app_context():
+        generar(**TAMANO)
+    return uri
+
+
+@pytest.fixture
+def crear(uri):
+    """Fábrica de apps sobre la base de pruebas; los argumentos sobrescriben Config."""
+    def fabrica(cache_activa=False, **config):
+        return crear_app(uri, cache_activa, **config)
+    return fabrica
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+
+from asgi_util import ServidorAsgi
+
+
+def _get(servidor, ruta, consulta=b''):
+    """GET por la interfaz ASGI; devuelve (estado, cabeceras)."""
+    mensajes = []
+
+    async def recibir():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def enviar(mensaje):
+        mensajes.append(mensaje)
+
+    async def peticion():
+        scope = {'type': 'http', 'method': 'GET', 'path': ruta, 'query_string': consulta,
+                 'headers': [], 'http_version': '1.1', 'scheme': 'http', 'root_path': ''}
+        await servidor(scope, recibir, enviar)
+        await servidor.escritor.dispose()
+
+    asyncio.run(peticion())
+    inicio = mensajes[0]
+    return inicio['status'], {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in inicio['headers']}
+
+
+def test_vista_async_comparte_la_cache_con_la_sincrona(crear):
+    app = crear(cache_activa=True)
+    estado, cabeceras = _get(ServidorAsgi(app), '/mapa/api/centros', b'distrito=Surquillo')
+    assert estado == 200 and cabeceras['x-cache'] == 'MISS'
+    assert app.test_client().get('/mapa/api/centros?distrito=Surquillo').headers['X-Cache'] == 'HIT'
@@ -0,0 +1,66 @@
+import json
+import pytest
+from sqlalchemy import func
+from benchmark import crear_app
+from benchmark.carga import ejecutar, medir_cliente, PERCENTILES
+from benchmark.generador import generar
+from extensions import db
+from models import Candidatos, CentrosVotacion, Mesas, PartidosPoliticos, Usuarios, leer_versiones
+
+PEQUENO = dict(partidos=3, candidatos=40, centros=10, mesas_por_centro=(2, 4), usuarios=25,
+               bytes_logo=100, bytes_foto=50)
+
+
+@pytest.fixture
+def app_aparte(tmp_path):
+    """Otra base, para no vaciar la compartida (generar() borra los datos)."""
+    return crear_app(f"sqlite:///{tmp_path / 'generada.db'}", cache_activa=False)
+
+
+def _contar(modelo):
+    return db.session.query(func.count()).select_from(modelo).scalar()
+
+
+def _muestra():
+    return (
+        [tuple(p) for p in db.session.query(PartidosPoliticos.id_partido, PartidosPoliticos.nombre_partido)
+         .order_by(PartidosPoliticos.jne_id_simbolo)],
+        [tuple(c) for c in db.session.query(Candidatos.nombre_completo, Candidatos.region).order_by(Candidatos.id)],
+        [tuple(u) for u in db.session.query(Usuarios.dni, Usuarios.id_mesa).order_by(Usuarios.dni)],
+    )
+
+
+def test_generador_produce_lo_pedido(app_aparte):
+    with app_aparte.app_context():
+        resumen = generar(semilla=1, **PEQUENO)
+        assert _contar(PartidosPoliticos) == resumen['partidos'] == 3
+        assert _contar(Candidatos) == resumen['candidatos'] == 40
+        assert _contar(CentrosVotacion) == resumen['centros'] == 10
+        assert _contar(Usuarios) == resumen['usuarios'] == 25
+        assert 2 * 10 <= _contar(Mesas) == resumen['mesas'] <= 4 * 10
+        assert {len(b) for (b,) in db.session.query(Candidatos.imagen_blob)} == {50}
+        assert {len(b) for (b,) in db.session.query(PartidosPoliticos.logo_blob)} == {100}
+        versiones = leer_versiones()
+
+        # Misma semilla, mismos datos; y se invalidan cachés e índices otra vez
+        muestra = _muestra()
+        generar(semilla=1, **PEQUENO)
+        assert _muestra() == muestra
+        assert all(leer_versiones()[c] > versiones[c] for c in ('partidos', 'candidatos', 'centros'))
+
+        generar(semilla=2, **PEQUENO)
+        assert _muestra() != muestra
+
+
+def test_medicion_por_escenario(crear):
+    app = crear()
+    resultado = medir_cliente(app, '/api/partidos', repeticiones=5, calentamiento=1)
+    assert resultado['peticiones'] == 5 and resultado['errores'] == 0
+    assert all(f'p{p}_ms' in resultado for p in PERCENTILES)
+    assert resultado['sql_por_peticion'] >= 1 and resultado['bytes_por_respuesta'] > 0
+
+    assert medir_cliente(app, '/api/no-existe', repeticiones=2, calentamiento=0)['errores'] == 2
+
+    informe = ejecutar(app, escenarios=(('partidos', '/api/partidos'),), repeticiones=2)
+    assert informe['filas']['PartidosPoliticos'] > 0
+    assert json.loads(json.dumps(informe))['resultados']['partidos']['cliente']['peticiones'] == 2
@@ -0,0 +1,48 @@
+import glob
+import os
+import pytest
+import bundle_util
+from bundle_util import construir_bundle
+
+
+@pytest.fixture
+def app(crear, tmp_path):
+    app = crear(BUNDLE_DIR=str(tmp_path))
+    with app.app_context():
+        construir_bundle()
+    return app
+
+
+def test_bundle_reemplazado_durante_la_peticion_se_vuelve_a_resolver(app, tmp_path, monkeypatch):
+    # Un .meta más reciente cuyos archivos ya no existen, como si _limpiar lo
+    # borrara entre la lectura del .meta y send_file
+    vigente = glob.glob(str(tmp_path / 'bundle-*.meta'))[0]
+    viejo = tmp_path / 'bundle-viejo.meta'
+    viejo.write_bytes(open(vigente, 'rb').read().replace(b'"version": "', b'"version": "viejo-', 1))
+    os.utime(viejo, (os.path.getmtime(vigente) + 10,) * 2)
+
+    original = bundle_util.send_file
+
+    def send_file(ruta, **kwargs):
+        if viejo.exists():
+            viejo.unlink()
+        return original(ruta, **kwargs)
+
+    monkeypatch.setattr(bundle_util, 'send_file', send_file)
+    response = app.test_client().get('/api/bundle')
+    assert response.status_code == 200
+    assert response.headers['X-Bundle-Version'] in vigente
+
+
+def test_bundle_borrado_sin_reemplazo_responde_503(app, tmp_path, monkeypatch):
+    original = bundle_util.send_file
+
+    def send_file(ruta, **kwargs):
+        for datos in glob.glob(str(tmp_path / 'bundle-*.json*')):
+            os.remove(datos)
+        return original(ruta, **kwargs)
+
+    monkeypatch.setattr(bundle_util, 'send_file', send_file)
+    response = app.test_client().get('/api/bundle')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
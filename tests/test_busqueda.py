@@ -0,0 +1,24 @@
+from busqueda_util import IndiceBusqueda
+
+
+def _documento(clave, titulo):
+    return (('candidato', clave), {'titulo': titulo}, ((titulo, 3.0),))
+
+
+def test_sin_tildes_y_por_ranking():
+    indice = IndiceBusqueda()
+    indice.sincronizar([_documento(1, 'José Pérez Cañete'), _documento(2, 'Joselyn Paz')])
+    assert [r['id'] for r in indice.buscar('jose perez')] == [1]
+    assert [r['id'] for r in indice.buscar('jose')] == [1, 2]  # Exacto antes que prefijo
+
+
+def test_la_copia_se_sincroniza_sin_tocar_el_publicado():
+    publicado = IndiceBusqueda()
+    publicado.sincronizar([_documento(1, 'Ana Quispe'), _documento(2, 'Luis Mamani')])
+
+    nuevo = publicado.copia()
+    assert nuevo.sincronizar([_documento(1, 'Ana Quispe'), _documento(3, 'Rosa Mamani')]) == (1, 0, 1)
+
+    assert [r['id'] for r in publicado.buscar('mamani')] == [2]
+    assert [r['id'] for r in nuevo.buscar('mamani')] == [3]
+    assert [r['id'] for r in nuevo.buscar('ana')] == [1]
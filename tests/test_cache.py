@@ -0,0 +1,69 @@
+from cache_util import cache
+from extensions import db
+from models import incrementar_version
+
+
+class BackendCompartido:
+    """Stand-in del backend Redis: un dict que comparten varias apps (workers)."""
+
+    nombre = 'compartido'
+
+    def __init__(self):
+        self.datos = {}
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+    def set(self, clave, valor, ttl):
+        self.datos[clave] = valor
+
+    def limpiar(self):
+        self.datos.clear()
+
+    def __len__(self):
+        return len(self.datos)
+
+
+def test_hit_miss_y_contadores(crear):
+    cliente = crear(cache_activa=True).test_client()
+    antes = cache.estadisticas()
+
+    primera = cliente.get('/api/partidos?limit=2')
+    segunda = cliente.get('/api/partidos?limit=2')
+
+    assert primera.headers['X-Cache'] == 'MISS'
+    assert segunda.headers['X-Cache'] == 'HIT'
+    assert segunda.get_data() == primera.get_data()
+    despues = cache.estadisticas()
+    assert despues['misses'] - antes['misses'] == 1
+    assert despues['hits'] - antes['hits'] == 1
+
+
+def test_argumentos_normalizados(crear):
+    cliente = crear(cache_activa=True).test_client()
+    cliente.get('/api/candidatos?limit=3&region=')
+    assert cliente.get('/api/candidatos?limit=3').headers['X-Cache'] == 'HIT'
+
+
+def test_version_invalida(crear):
+    app = crear(cache_activa=True)
+    cliente = app.test_client()
+    cliente.get('/api/candidatos?limit=5')
+    assert cliente.get('/api/candidatos?limit=5').headers['X-Cache'] == 'HIT'
+
+    # Lo que hacen los scrapers al confirmar una carga
+    with app.app_context():
+        incrementar_version('candidatos')
+        db.session.commit()
+
+    assert cliente.get('/api/candidatos?limit=5').headers['X-Cache'] == 'MISS'
+
+
+def test_backend_compartido_entre_workers(crear):
+    compartido = BackendCompartido()
+    worker_1 = crear(CACHE_BACKEND=compartido).test_client()
+    worker_2 = crear(CACHE_BACKEND=compartido).test_client()
+
+    assert worker_1.get('/mapa/api/centros').headers['X-Cache'] == 'MISS'
+    assert worker_2.get('/mapa/api/centros').headers['X-Cache'] == 'HIT'
+    assert len(compartido) == 1
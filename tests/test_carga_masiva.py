@@ -0,0 +1,54 @@
+import pytest
+from extensions import db
+from models import PartidosPoliticos
+from carga_masiva_util import insertar_en_lotes
+
+BASE = 900000
+
+
+@pytest.fixture
+def sesion(crear):
+    """Contexto de la app; todo lo escrito se descarta al terminar."""
+    with crear().app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def _nuevos(sesion):
+    return {
+        p.jne_id_simbolo: (p.nombre_partido, p.siglas)
+        for p in sesion.query(PartidosPoliticos).filter(PartidosPoliticos.jne_id_simbolo >= BASE)
+    }
+
+
+def test_upsert_por_lotes(sesion):
+    filas = [{'jne_id_simbolo': BASE + i, 'nombre_partido': f'Nuevo {i}'} for i in range(7)]
+    # Repite una clave de un lote anterior, con otro conjunto de columnas
+    filas.append({'jne_id_simbolo': BASE, 'nombre_partido': 'Repetido', 'siglas': 'R'})
+
+    resumen = insertar_en_lotes(PartidosPoliticos, filas, clave='jne_id_simbolo', tam_lote=3)
+    assert resumen['filas'] == 8 and resumen['lotes'] == 3
+
+    nuevos = _nuevos(sesion)
+    assert len(nuevos) == 7
+    assert nuevos[BASE] == ('Repetido', 'R')
+    assert nuevos[BASE + 6] == ('Nuevo 6', None)
+
+
+def test_duplicados_del_lote_gana_el_ultimo(sesion):
+    filas = [
+        {'jne_id_simbolo': BASE, 'nombre_partido': 'Primero'},
+        {'jne_id_simbolo': BASE, 'nombre_partido': 'Último'},
+    ]
+    assert insertar_en_lotes(PartidosPoliticos, filas, clave='jne_id_simbolo')['filas'] == 1
+    assert _nuevos(sesion) == {BASE: ('Último', None)}
+
+
+def test_sin_actualizar_conserva_los_existentes(sesion):
+    insertar_en_lotes(PartidosPoliticos, [{'jne_id_simbolo': BASE, 'nombre_partido': 'Original'}], clave='jne_id_simbolo')
+    insertar_en_lotes(
+        PartidosPoliticos,
+        [{'jne_id_simbolo': BASE, 'nombre_partido': 'Cambio'}, {'jne_id_simbolo': BASE + 1, 'nombre_partido': 'Otro'}],
+        clave='jne_id_simbolo', actualizar=False
+    )
+    assert _nuevos(sesion) == {BASE: ('Original', None), BASE + 1: ('Otro', None)}
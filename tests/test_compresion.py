@@ -0,0 +1,70 @@
+import gzip
+import json
+import pytest
+from compresion_util import compresion, comprimir, brotli
+
+
+def _json(response):
+    datos = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        datos = gzip.decompress(datos)
+    elif response.headers.get('Content-Encoding') == 'br':
+        datos = brotli.decompress(datos)
+    return json.loads(datos)
+
+
+@pytest.mark.parametrize('aceptadas, esperada', [
+    ('gzip', 'gzip'),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    pytest.param('br, gzip', 'br', marks=pytest.mark.skipif(brotli is None, reason='brotli no instalado')),
+])
+def test_negociacion(crear, aceptadas, esperada):
+    cliente = crear().test_client()
+    plano = cliente.get('/api/candidatos')
+    response = cliente.get('/api/candidatos', headers={'Accept-Encoding': aceptadas})
+    assert response.headers.get('Content-Encoding') == esperada
+    assert 'Accept-Encoding' in response.vary
+    assert _json(response) == _json(plano)
+
+
+def test_respuestas_pequenas_no_se_comprimen(crear):
+    cliente = crear(COMPRESION_MINIMO_BYTES=10 ** 9).test_client()
+    response = cliente.get('/api/candidatos', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_stream_comprimido(crear):
+    cliente = crear().test_client()
+    response = cliente.get('/api/candidatos?stream=1', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in response.headers
+    assert _json(response) == _json(cliente.get('/api/candidatos?stream=1'))
+
+
+def test_etag_por_codificacion_y_304(crear):
+    cliente = crear(cache_activa=True).test_client()
+    gz = {'Accept-Encoding': 'gzip'}
+
+    primera = cliente.get('/api/candidatos', headers=gz)
+    plano = cliente.get('/api/candidatos')
+    etag = primera.headers['ETag']
+    assert etag.endswith('-gzip"') and plano.headers['ETag'] != etag
+
+    antes = compresion.estadisticas()
+    segunda = cliente.get('/api/candidatos', headers=gz)
+    assert segunda.get_data() == primera.get_data()
+    assert compresion.estadisticas()['hits'] == antes['hits'] + 1  # No se volvió a comprimir
+
+    revalidada = cliente.get('/api/candidatos', headers=dict(gz, **{'If-None-Match': etag}))
+    assert revalidada.status_code == 304 and revalidada.get_data() == b''
+    assert revalidada.headers['ETag'] == etag
+    # El ETag de otra codificación no sirve para esta representación
+    sin_comprimir = cliente.get('/api/candidatos', headers={'If-None-Match': etag})
+    assert sin_comprimir.status_code == 200
+    assert cliente.get('/api/candidatos', headers={'If-None-Match': plano.headers['ETag']}).status_code == 304
+
+
+def test_comprimir_gzip_es_estandar():
+    datos = b'{"a": 1}' * 500
+    assert gzip.decompress(comprimir(datos, 'gzip', 6)) == datos
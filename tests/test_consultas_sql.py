@@ -0,0 +1,47 @@
+import pytest
+from benchmark.carga import contar_sql
+from benchmark.generador import generar
+from extensions import db
+from conftest import TAMANO
+
+# Sentencias SQL por petición, sin caché de respuestas: una sola consulta
+# con JOIN y sin BLOBs, tenga la tabla 100 o 1 000 000 de filas
+SENTENCIAS = {
+    '/api/partidos': 1,
+    '/api/candidatos': 1,
+    '/mapa/api/centros': 1,
+}
+
+
+def contar(app, url):
+    """(sentencias SQL, elementos de la respuesta) de un GET a 'url'."""
+    cliente = app.test_client()
+    cliente.get(url)  # Calienta índices y conexiones
+    with contar_sql(app) as contador:
+        response = cliente.get(url)
+        datos = response.get_json()
+    assert response.status_code == 200
+    return contador['sentencias'], len(datos)
+
+
+@pytest.mark.parametrize('url', SENTENCIAS)
+def test_sentencias_por_endpoint(crear, url):
+    sentencias, _ = contar(crear(), url)
+    assert sentencias == SENTENCIAS[url]
+
+
+def test_sentencias_no_crecen_con_las_tablas(crear):
+    app = crear()
+    antes = {url: contar(app, url) for url in SENTENCIAS}
+
+    with app.app_context():
+        generar(**{k: v * 3 if k not in ('bytes_logo', 'bytes_foto') else v for k, v in TAMANO.items()})
+    try:
+        for url, (sentencias, filas) in antes.items():
+            sentencias_despues, filas_despues = contar(app, url)
+            assert filas_despues > filas
+            assert sentencias_despues == sentencias
+    finally:
+        with app.app_context():
+            generar(**TAMANO)
+            db.session.remove()
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from descarga_util import Descargador
+
+LATENCIA = 0.05                   # Segundos por respuesta del servidor de prueba
+IMAGENES = 42
+PNG = b'\x89PNG\r\n\x1a\n' + os.urandom(2048)
+
+
+class _Servidor(BaseHTTPRequestHandler):
+    """
+    Stand-in de JNE / eleccionesperu.pe:
+    /img/<n>       imagen de prueba con ETag (responde 304 si coincide)
+    /grande        imagen de 1 MB
+    /falla/<n>     503 las primeras <n> veces (con Retry-After si se pide ?ra=)
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, estado, cuerpo=b'', cabeceras=None):
+        self.send_response(estado)
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        time.sleep(LATENCIA)
+        ruta, _, consulta = self.path.partition('?')
+        if ruta.startswith('/img/'):
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._responder(304)
+            return self._responder(200, PNG, {'Content-Type': 'image/png', 'ETag': '"v1"'})
+        if ruta == '/grande':
+            return self._responder(200, b'\0' * (1024 * 1024))
+        if ruta.startswith('/falla/'):
+            with self.server.lock:
+                self.server.intentos[self.path] = self.server.intentos.get(self.path, 0) + 1
+                intento = self.server.intentos[self.path]
+            if intento <= int(ruta.rsplit('/', 1)[1]):
+                cabeceras = {'Retry-After': consulta[3:]} if consulta.startswith('ra=') else {}
+                return self._responder(503, b'', cabeceras)
+            return self._responder(200, PNG)
+        self._responder(404)
+
+
+@pytest.fixture(scope='module')
+def servidor():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Servidor)
+    httpd.daemon_threads = True
+    httpd.intentos, httpd.lock = {}, threading.Lock()
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_descarga_concurrente_con_valores_por_defecto(servidor):
+    urls = [f'{servidor}/img/{i}' for i in range(IMAGENES)]
+    descargador = Descargador()
+    inicio = time.perf_counter()
+    resultados = descargador.descargar_todos(urls)
+    segundos = time.perf_counter() - inicio
+    descargador.cerrar()
+
+    assert all(resultados[url] == PNG for url in urls)
+    # En serie serían IMAGENES * LATENCIA (2.1 s); con 8 a la vez, ~6 rondas
+    assert segundos < IMAGENES * LATENCIA / 3
+
+
+def test_limite_por_host_opcional(servidor):
+    descargador = Descargador(max_por_segundo_host=20)
+    inicio = time.perf_counter()
+    descargador.descargar_todos([f'{servidor}/img/limite-{i}' for i in range(10)])
+    descargador.cerrar()
+    assert time.perf_counter() - inicio >= 9 / 20
+
+
+def test_tope_de_tamano(servidor):
+    descargador = Descargador(max_bytes=64 * 1024)
+    assert descargador.descargar(f'{servidor}/grande') is None
+    assert descargador.descargar(f'{servidor}/img/0') == PNG
+
+
+def test_reintenta_con_backoff(servidor):
+    descargador = Descargador(backoff_base=0.01)
+    assert descargador.descargar(f'{servidor}/falla/2') == PNG
+    assert descargador.descargar(f'{servidor}/falla/9') is None
+
+
+def test_retry_after_acotado(servidor):
+    descargador = Descargador(max_retry_after=0.1)
+    inicio = time.perf_counter()
+    assert descargador.descargar(f'{servidor}/falla/1?ra=3600') == PNG
+    assert time.perf_counter() - inicio < 2
+
+
+def test_get_condicional(servidor):
+    descargador = Descargador()
+    primera = descargador.descargar_condicional(f'{servidor}/img/1')
+    segunda = descargador.descargar_condicional(f'{servidor}/img/1', etag=primera.etag)
+    assert primera.contenido == PNG and primera.etag == '"v1"'
+    assert segunda.no_modificado and segunda.contenido is None
@@ -0,0 +1,16 @@
+import logging
+import main.routes
+
+
+def test_error_interno_no_expone_el_detalle(crear, monkeypatch, caplog):
+    def falla():
+        raise RuntimeError("password=secreto en la cadena de conexión")
+    monkeypatch.setattr(main.routes, 'consulta_partidos', falla)
+
+    with caplog.at_level(logging.ERROR):
+        response = crear().test_client().get('/api/partidos')
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Error interno del servidor"}
+    # El detalle y la traza quedan en el log de la app
+    registro = next(r for r in caplog.records if r.getMessage() == "Error en /api/partidos")
+    assert registro.exc_info[0] is RuntimeError
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from espacial_util import IndiceEspacial, haversine_km
+
+
+def _indice(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return IndiceEspacial([
+        SimpleNamespace(id_centro=str(i), nombre=f'Centro {i}', distrito=None,
+                        latitud=rng.uniform(-18, -1), longitud=rng.uniform(-81, -69))
+        for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize('n', [20, 2000])
+@pytest.mark.parametrize('punto', [(-12.1, -77.03), (0, 0), (90, 180), (-90, -180), (-5.5, -70.2)])
+def test_cercanos_igual_a_fuerza_bruta(n, punto):
+    indice = _indice(n)
+    esperado = np.sort(haversine_km(*punto, indice.lats, indice.lngs))[:7]
+    obtenido = [c['distancia_km'] for c in indice.cercanos(*punto, k=7)]
+    assert np.allclose(obtenido, np.round(esperado, 4), atol=1e-3)
+
+
+@pytest.mark.parametrize('consulta', [
+    'lat=nan&lng=0', 'lat=inf&lng=0', 'lat=95&lng=0', 'lat=0&lng=-181', 'lat=x&lng=0', 'lng=0', 'lat=0&lng=0&k=x',
+])
+def test_cercanos_rechaza_coordenadas_invalidas(crear, consulta):
+    response = crear().test_client().get(f'/mapa/api/centros/cercanos?{consulta}')
+    assert response.status_code == 400
+
+
+def test_bbox_se_trunca_y_lo_avisa(crear, monkeypatch):
+    monkeypatch.setattr('mapa.routes.MAX_CENTROS_BBOX', 10)
+    cliente = crear().test_client()
+    response = cliente.get('/mapa/api/centros/bbox?bbox=-180,-90,180,90')
+    assert len(response.get_json()) == 10 and response.headers['X-Truncado'] == 'true'
+
+    response = cliente.get('/mapa/api/centros/bbox?bbox=-77.0301,-12.0001,-77.03,-12')
+    assert response.get_json() == [] and 'X-Truncado' not in response.headers
+
+
+@pytest.mark.parametrize('consulta', ['z=6', 'z=6&bbox=', 'z=6&bbox=0,0,1', 'z=x&bbox=-82,-19,-68,0'])
+def test_clusters_exigen_bbox_valido(crear, consulta):
+    assert crear().test_client().get(f'/mapa/api/clusters?{consulta}').status_code == 400
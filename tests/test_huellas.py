@@ -0,0 +1,97 @@
+import io
+import numpy as np
+import pytest
+import huella_util
+from extensions import db
+from models import PartidosPoliticos
+from huella_util import (
+    IndiceLogos, completar_huellas, construir_indice_logos, distancias_hamming, huella, _empaquetar,
+    BITS_HUELLA, HUELLA_NO_SOPORTADA, K_MAXIMO
+)
+
+
+@pytest.fixture
+def sesion(crear):
+    """Contexto de la app; todo lo escrito se descarta al terminar."""
+    with crear().app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def test_logo_no_soportado_no_se_vuelve_a_decodificar(sesion, monkeypatch):
+    # Los logos sintéticos son bytes aleatorios tras una cabecera PNG: no se decodifican
+    sesion.query(PartidosPoliticos).update({PartidosPoliticos.logo_huella: None}, synchronize_session=False)
+    llamadas = []
+    original = huella_util.huella
+    monkeypatch.setattr(huella_util, 'huella', lambda data: llamadas.append(1) or original(data))
+
+    assert completar_huellas() == 0
+    con_logo = sesion.query(PartidosPoliticos).filter(PartidosPoliticos.logo_hash.isnot(None)).count()
+    marcados = sesion.query(PartidosPoliticos).filter_by(logo_huella=HUELLA_NO_SOPORTADA).count()
+    assert con_logo and marcados == con_logo == len(llamadas)
+    assert len(construir_indice_logos()) == 0
+
+    llamadas.clear()
+    completar_huellas()
+    assert llamadas == []
+
+
+def _con_bits_cambiados(huella, n):
+    """La huella con sus n bits menos significativos invertidos."""
+    return f'{int(huella, 16) ^ ((1 << n) - 1):032x}'
+
+
+def test_distancias_hamming_igual_a_contar_bits():
+    rng = np.random.default_rng(0)
+    huellas = [f'{a:016x}{b:016x}' for a, b in rng.integers(0, 2**63, size=(50, 2), dtype=np.uint64)]
+    consulta = huellas[0]
+    esperado = [bin(int(h, 16) ^ int(consulta, 16)).count('1') for h in huellas]
+    assert distancias_hamming(_empaquetar(huellas), _empaquetar([consulta])[0]).tolist() == esperado
+
+
+def test_buscar_ordena_por_distancia():
+    consulta = 'f0f0f0f0f0f0f0f00f0f0f0f0f0f0f0f'
+    distancias = [40, 3, 0, 17, 90, 3]
+    indice = IndiceLogos([
+        (f'p{i}', f'Partido {i}', None, f'hash{i}', _con_bits_cambiados(consulta, d))
+        for i, d in enumerate(distancias)
+    ] + [('sin', 'Sin huella', None, None, HUELLA_NO_SOPORTADA)])
+    assert len(indice) == len(distancias)
+
+    resultados = indice.buscar(consulta, k=4)
+    assert [(r['id_partido'], r['distancia']) for r in resultados] == [('p2', 0), ('p1', 3), ('p5', 3), ('p3', 17)]
+    assert resultados[0]['similitud'] == 1.0
+    assert resultados[3]['similitud'] == round(1 - 17 / BITS_HUELLA, 4)
+    assert len(indice.buscar(consulta, k=K_MAXIMO)) == len(distancias)
+
+
+def _logo(forma, color):
+    from PIL import Image, ImageDraw
+    imagen = Image.new('RGB', (200, 200), 'white')
+    dibujo = ImageDraw.Draw(imagen)
+    if forma == 'circulo':
+        dibujo.ellipse((30, 30, 170, 170), fill=color)
+    elif forma == 'barras':
+        for x in range(20, 200, 40):
+            dibujo.rectangle((x, 10, x + 18, 190), fill=color)
+    else:
+        dibujo.polygon([(100, 10), (190, 190), (10, 190)], fill=color)
+    return imagen
+
+
+def _bytes(imagen, formato='PNG', **opciones):
+    buffer = io.BytesIO()
+    imagen.save(buffer, formato, **opciones)
+    return buffer.getvalue()
+
+
+def test_foto_del_simbolo_reconoce_su_partido():
+    pytest.importorskip('PIL')
+    logos = {'circulo': _logo('circulo', 'red'), 'barras': _logo('barras', 'blue'), 'triangulo': _logo('triangulo', 'green')}
+    indice = IndiceLogos([(nombre, nombre, None, None, huella(_bytes(imagen))) for nombre, imagen in logos.items()])
+
+    for nombre, imagen in logos.items():
+        # Foto reducida y recomprimida en JPEG
+        foto = _bytes(imagen.resize((120, 120)), 'JPEG', quality=60)
+        mejor = indice.buscar(huella(foto), k=3)
+        assert mejor[0]['id_partido'] == nombre and mejor[0]['distancia'] < mejor[1]['distancia']
@@ -0,0 +1,87 @@
+import io
+import pytest
+from flask import current_app
+import imagen_util
+from extensions import db
+from models import Candidatos, VariantesImagen
+from media_util import hash_blob
+from imagen_util import actualizar_variantes, generar_variantes, FORMATOS, TAMANOS, TAMANO_SIN_VARIANTES
+
+
+@pytest.fixture
+def sesion(crear):
+    """Contexto de la app; todo lo escrito se descarta al terminar."""
+    with crear().app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def test_imagen_no_decodificable_queda_marcada(sesion, monkeypatch):
+    # Las fotos sintéticas son bytes aleatorios tras una cabecera JPEG: no se decodifican
+    llamadas = []
+    original = imagen_util.generar_variantes
+    monkeypatch.setattr(imagen_util, 'generar_variantes', lambda data: llamadas.append(1) or original(data))
+
+    assert actualizar_variantes('candidato', Candidatos, 'imagen_blob', 'imagen_hash') == 0
+    con_imagen = sesion.query(Candidatos).filter(Candidatos.imagen_hash.isnot(None)).count()
+    marcas = sesion.query(VariantesImagen).filter_by(tipo='candidato', tamano=TAMANO_SIN_VARIANTES).count()
+    assert con_imagen and marcas == con_imagen == len(llamadas)
+
+    # La carga siguiente no vuelve a leer ni decodificar esas imágenes
+    llamadas.clear()
+    actualizar_variantes('candidato', Candidatos, 'imagen_blob', 'imagen_hash')
+    assert llamadas == []
+
+
+def _jpeg_rotado(ancho, alto):
+    """JPEG con orientación EXIF 6 (girado 90°) y un comentario."""
+    from PIL import Image
+    imagen = Image.new('RGB', (ancho, alto), (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    imagen.save(buffer, 'JPEG', exif=exif, comment=b'metadatos')
+    return buffer.getvalue()
+
+
+def test_variantes_sin_metadatos_y_sin_ampliar():
+    Image = pytest.importorskip('PIL.Image')
+    variantes = {(v['tamano'], v['formato']): v for v in generar_variantes(_jpeg_rotado(400, 300))}
+    assert set(variantes) == {(t, f) for t in TAMANOS for f in FORMATOS}
+    # Se aplica la orientación: 400x300 girado queda 300x400
+    assert [(variantes[(t, 'webp')]['ancho'], variantes[(t, 'webp')]['alto']) for t in TAMANOS] == [
+        (48, 64), (192, 256), (300, 400)
+    ]
+    for v in variantes.values():
+        with Image.open(io.BytesIO(v['datos'])) as imagen:
+            assert imagen.format == v['formato'].upper()
+            assert imagen.size == (v['ancho'], v['alto'])
+            assert not imagen.getexif() and 'comment' not in imagen.info
+
+    pequenas = generar_variantes(_jpeg_rotado(40, 30))
+    assert {(v['ancho'], v['alto']) for v in pequenas} == {(30, 40)}
+
+
+def test_size_sirve_la_variante_segun_accept(sesion):
+    Image = pytest.importorskip('PIL.Image')
+    from main.routes import media_candidato
+    candidato = sesion.query(Candidatos).order_by(Candidatos.id).first()
+    datos = _jpeg_rotado(400, 300)
+    sesion.query(Candidatos).filter_by(id=candidato.id).update(
+        {Candidatos.imagen_blob: datos, Candidatos.imagen_hash: hash_blob(datos)}, synchronize_session=False
+    )
+    actualizar_variantes('candidato', Candidatos, 'imagen_blob', 'imagen_hash')
+
+    def pedir(consulta, **cabeceras):
+        with current_app.test_request_context(f'/api/media/candidato/{candidato.id}?{consulta}', headers=cabeceras):
+            return current_app.make_response(media_candidato(candidato.id))
+
+    webp = pedir('size=64', Accept='image/webp,image/*')
+    assert webp.mimetype == 'image/webp' and 'Accept' in webp.vary
+    assert Image.open(io.BytesIO(webp.get_data())).size == (48, 64)
+    assert pedir('size=256', Accept='image/png').mimetype == 'image/jpeg'
+    assert pedir('size=256&formato=jpeg', Accept='image/webp').mimetype == 'image/jpeg'
+    assert pedir('size=64', Accept='image/webp', **{'If-None-Match': webp.headers['ETag']}).status_code == 304
+    assert pedir('size=128').status_code == 400
+    # Sin ?size= se sirve el original tal cual
+    assert pedir('').get_data() == datos
@@ -0,0 +1,32 @@
+from carga_csv_util import CargaElectores, cargar_csv
+from extensions import db
+from models import Mesas, Usuarios, incrementar_version
+
+DNI = '99999999'
+
+
+def test_carga_del_padron_invalida_dnis_y_cache(crear, tmp_path):
+    app = crear(cache_activa=True, BUNDLE_DIR=str(tmp_path / 'bundle'))
+    cliente = app.test_client()
+
+    # Un DNI sin mesa queda en la LRU (y la respuesta en la caché)
+    assert cliente.get(f'/mapa/api/centros?dni={DNI}').get_json() == []
+    assert cliente.get(f'/mapa/api/donde-voto?dni={DNI}').status_code == 404
+
+    with app.app_context():
+        mesa = db.session.query(Mesas).order_by(Mesas.id_mesa).first()
+        numero_mesa, id_centro = mesa.numero_mesa, mesa.id_centro
+    ruta = tmp_path / 'padron.csv'
+    ruta.write_text(f'dni,numero_mesa\n{DNI},{numero_mesa}\n', encoding='utf-8')
+
+    try:
+        with app.app_context():
+            assert cargar_csv(CargaElectores(), str(ruta))['escritas'] == 1
+
+        assert [c['id'] for c in cliente.get(f'/mapa/api/centros?dni={DNI}').get_json()] == [id_centro]
+        assert cliente.get(f'/mapa/api/donde-voto?dni={DNI}').get_json()['numero_mesa'] == numero_mesa
+    finally:
+        with app.app_context():
+            db.session.query(Usuarios).filter_by(dni=DNI).delete()
+            incrementar_version('padron')
+            db.session.commit()
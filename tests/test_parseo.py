@@ -0,0 +1,47 @@
+import os
+import pytest
+from parseo_util import (
+    ARCHIVOS_BENCHMARK, LXML_DISPONIBLE, TablaNoEncontrada, extraer_partidos, extraer_candidatos,
+    generar_sintetico
+)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_URL = 'https://sroppublico.jne.gob.pe'
+
+requiere_lxml = pytest.mark.skipif(not LXML_DISPONIBLE, reason='lxml no instalado')
+
+
+def _extraer(archivo, tipo, backend):
+    if tipo is None:
+        return list(extraer_partidos(archivo, BASE_URL, backend))
+    return list(extraer_candidatos(archivo, tipo, backend))
+
+
+@requiere_lxml
+@pytest.mark.parametrize('nombre, tipo', ARCHIVOS_BENCHMARK)
+def test_lxml_y_bs4_producen_lo_mismo(nombre, tipo):
+    archivo = os.path.join(RAIZ, nombre)
+    esperado = _extraer(archivo, tipo, 'bs4')
+    assert esperado and any(esperado)
+    assert _extraer(archivo, tipo, 'lxml') == esperado
+
+
+@requiere_lxml
+def test_lxml_y_bs4_coinciden_en_documentos_grandes(tmp_path):
+    archivo = generar_sintetico(os.path.join(RAIZ, 'alcaldes.html'), str(tmp_path / 'alcaldes.html'), 20)
+    esperado = _extraer(archivo, 'Alcalde', 'bs4')
+    assert len(esperado) == 20 * len(_extraer(os.path.join(RAIZ, 'alcaldes.html'), 'Alcalde', 'bs4'))
+    assert _extraer(archivo, 'Alcalde', 'lxml') == esperado
+
+
+@pytest.mark.parametrize('backend', ['bs4', pytest.param('lxml', marks=requiere_lxml)])
+def test_sin_tabla_de_partidos(tmp_path, backend):
+    archivo = tmp_path / 'vacio.html'
+    archivo.write_text('<html><body><p>Mantenimiento</p></body></html>', encoding='utf-8')
+    with pytest.raises(TablaNoEncontrada):
+        list(extraer_partidos(str(archivo), BASE_URL, backend))
+
+
+def test_backend_desconocido():
+    with pytest.raises(ValueError):
+        extraer_partidos('partidos_data.html', BASE_URL, 'html5lib')
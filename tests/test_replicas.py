@@ -0,0 +1,70 @@
+import shutil
+import sqlite3
+import pytest
+from sqlalchemy import update
+from extensions import db
+from models import PartidosPoliticos
+from replicas_util import en_escritor
+
+
+@pytest.fixture
+def app(crear, uri, tmp_path):
+    """
+    App con dos réplicas: copias del archivo de pruebas en las que los
+    partidos se llaman 'replica0' / 'replica1', para ver de dónde se leyó.
+    """
+    replicas = []
+    for i in range(2):
+        ruta = tmp_path / f'replica{i}.db'
+        shutil.copy(uri.removeprefix('sqlite:///'), ruta)
+        with sqlite3.connect(ruta) as conexion:
+            conexion.execute('UPDATE PartidosPoliticos SET nombre_partido = ?', (f'replica{i}',))
+        replicas.append(f'sqlite:///{ruta}')
+    return crear(SQLALCHEMY_REPLICAS=replicas)
+
+
+def _origen():
+    return str(db.session.get_bind().url).rsplit('/', 1)[-1]
+
+
+def test_get_lee_de_las_replicas_por_turnos(app):
+    cliente = app.test_client()
+    origenes = [{p['nombre_partido'] for p in cliente.get('/api/partidos').get_json()} for _ in range(4)]
+    assert all(len(o) == 1 for o in origenes)
+    origenes = [o.pop() for o in origenes]
+    assert set(origenes) == {'replica0', 'replica1'}
+    assert origenes[0] != origenes[1] and origenes[:2] == origenes[2:]
+
+
+def test_fuera_de_peticion_usa_el_escritor(app):
+    # Scrapers y cargas CLI: contexto de app sin petición
+    with app.app_context():
+        assert _origen() == 'comitia.db'
+
+
+@pytest.mark.parametrize('metodo, esperado', [('GET', 'replica'), ('HEAD', 'replica'), ('POST', 'comitia.db')])
+def test_metodo_de_la_peticion(app, metodo, esperado):
+    with app.test_request_context('/api/partidos', method=metodo):
+        app.preprocess_request()
+        assert _origen().startswith(esperado)
+
+
+def test_escritura_en_get_pasa_al_escritor(app):
+    with app.test_request_context('/api/partidos'):
+        app.preprocess_request()
+        assert _origen().startswith('replica')
+        with en_escritor():
+            assert _origen() == 'comitia.db'
+        assert _origen().startswith('replica')
+
+        sentencia = update(PartidosPoliticos).where(PartidosPoliticos.id_partido == None).values(siglas='x')
+        assert str(db.session.get_bind(clause=sentencia).url).endswith('comitia.db')
+        # Tras escribir, el resto de la sesión lee lo escrito
+        assert _origen() == 'comitia.db'
+
+
+def test_sync_lee_del_escritor(app):
+    # Las réplicas tienen otros nombres: /api/sync debe ver los del escritor
+    partidos = app.test_client().get('/api/sync').get_json()['cambios']['partidos']
+    columna = partidos['columnas'].index('nombre_partido')
+    assert not {fila[columna] for fila in partidos['filas']} & {'replica0', 'replica1'}
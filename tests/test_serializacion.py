@@ -0,0 +1,66 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+import serializacion_util
+from extensions import db
+from models import CentrosVotacion, PartidosPoliticos
+from serializacion_util import Serializador, a_float, a_iso, dumps
+
+FILA = SimpleNamespace(
+    id=7, nombre='Ñaña', latitud=Decimal('-12.12345678'), fecha=date(2024, 5, 1), partido=SimpleNamespace(siglas='PX'),
+)
+
+SERIALIZADOR = Serializador({
+    'id': 'id',
+    'nombre': 'nombre',
+    'lat': ('latitud', a_float),
+    'fecha': ('fecha', a_iso),
+    'siglas': 'partido.siglas',
+    'url': lambda fila: f'/api/{fila.id}',
+})
+
+
+def test_dict_tupla_y_columnar():
+    esperado = {'id': 7, 'nombre': 'Ñaña', 'lat': -12.12345678, 'fecha': '2024-05-01', 'siglas': 'PX', 'url': '/api/7'}
+    assert SERIALIZADOR(FILA) == esperado
+    assert SERIALIZADOR.tupla(FILA) == tuple(esperado.values())
+    assert SERIALIZADOR.lista([FILA, FILA]) == [esperado, esperado]
+    assert SERIALIZADOR.columnar([FILA]) == {'columnas': list(esperado), 'filas': [tuple(esperado.values())]}
+    assert SERIALIZADOR(SimpleNamespace(**dict(vars(FILA), latitud=None, fecha=None)))['lat'] is None
+
+
+@pytest.mark.parametrize('campos', [{}, {'x': 'a; import os'}, {'x': 'a..b'}, {'x': ('1a', a_float)}])
+def test_campos_invalidos(campos):
+    with pytest.raises(ValueError):
+        Serializador(campos)
+
+
+def test_to_dict_de_los_modelos(crear):
+    with crear().app_context():
+        centro = db.session.query(CentrosVotacion).first()
+        assert set(centro.to_dict()) == set(CentrosVotacion.__serializar__)
+        assert isinstance(centro.to_dict()['latitud'], float)
+
+        partido = db.session.query(PartidosPoliticos).first()
+        datos = partido.to_dict()
+        assert 'logo_blob' not in datos and datos['id_partido'] == partido.id_partido
+        json.dumps(datos)  # Sólo tipos de JSON
+
+
+def test_dumps_igual_con_y_sin_orjson(monkeypatch):
+    datos = {'texto': 'Cañete', 'decimal': Decimal('1.5'), 'fecha': datetime(2024, 5, 1, 8, 30), 'lista': [1, None, True]}
+    esperado = {'texto': 'Cañete', 'decimal': 1.5, 'fecha': '2024-05-01T08:30:00', 'lista': [1, None, True]}
+    salidas = [dumps(datos)]
+    monkeypatch.setattr(serializacion_util, 'orjson', None)
+    salidas.append(dumps(datos))
+    assert all(json.loads(s) == esperado for s in salidas)
+    assert salidas[0] == salidas[1]
+
+
+def test_rutas_usan_el_serializador(crear):
+    cliente = crear().test_client()
+    centros = cliente.get('/mapa/api/centros').get_json()
+    assert centros and set(centros[0]) == {'id', 'nombre', 'distrito', 'lat', 'lng'}
+    assert all(isinstance(c['lat'], float) for c in centros)
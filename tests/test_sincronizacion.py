@@ -0,0 +1,43 @@
+import pytest
+from extensions import db
+from models import PartidosPoliticos
+from sincronizacion_util import sincronizar_tabla
+
+
+@pytest.fixture
+def sesion(crear):
+    """Contexto de la app; todo lo escrito se descarta al terminar."""
+    with crear().app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def _registros(sesion):
+    return [
+        {'jne_id_simbolo': jne, 'nombre_partido': nombre}
+        for jne, nombre in sesion.query(PartidosPoliticos.jne_id_simbolo, PartidosPoliticos.nombre_partido)
+        if jne is not None
+    ]
+
+
+def _sin_clave(sesion):
+    return sesion.query(PartidosPoliticos).filter(PartidosPoliticos.jne_id_simbolo.is_(None)).count()
+
+
+def test_incremental_informa_los_registros_sin_clave(sesion):
+    antes = sesion.query(PartidosPoliticos).count()
+    registros = _registros(sesion) + [{'jne_id_simbolo': None, 'nombre_partido': 'Sin símbolo'}]
+    resumen = sincronizar_tabla(PartidosPoliticos, 'jne_id_simbolo', registros, None)
+    assert resumen['sin_clave'] == 1 and resumen['insertados'] == 0 and resumen['eliminados'] == 0
+    assert sesion.query(PartidosPoliticos).count() == antes
+
+
+def test_recarga_completa_inserta_los_registros_sin_clave(sesion):
+    sin_clave = _sin_clave(sesion)
+    registros = _registros(sesion) + [
+        {'jne_id_simbolo': None, 'nombre_partido': 'Sin símbolo A'},
+        {'jne_id_simbolo': None, 'nombre_partido': 'Sin símbolo B'},
+    ]
+    resumen = sincronizar_tabla(PartidosPoliticos, 'jne_id_simbolo', registros, None, insertar_sin_clave=True)
+    assert resumen['sin_clave'] == 0 and resumen['insertados'] == 2
+    assert _sin_clave(sesion) == sin_clave + 2
@@ -0,0 +1,96 @@
+import time
+from datetime import timedelta
+import pytest
+from sqlalchemy import update
+import delta_util
+from carga_masiva_util import insertar_en_lotes
+from delta_util import cambios_desde, leer_token
+from extensions import db
+from models import CentrosVotacion, Candidatos, PartidosPoliticos, ahora_utc, registrar_eliminaciones
+
+
+def test_cambios_se_fechan_al_confirmar(crear, monkeypatch):
+    # Un cliente sincroniza mientras la transacción sigue abierta: la fila
+    # confirmada después debe llegarle en la siguiente llamada, sin margen
+    monkeypatch.setattr(delta_util, 'MARGEN_SEGUNDOS', 0)
+    with crear().app_context():
+        centro = db.session.query(CentrosVotacion).order_by(CentrosVotacion.id_centro).first()
+        nombre = centro.nombre
+        centro.nombre = f'{nombre} (editado)'
+        db.session.flush()
+        time.sleep(0.01)
+        token = ahora_utc()
+        time.sleep(0.01)
+        db.session.commit()
+        try:
+            filas = cambios_desde(token)['cambios']['centros']['filas']
+            assert centro.id_centro in {fila[0] for fila in filas}
+        finally:
+            centro.nombre = nombre
+            db.session.commit()
+
+
+def test_escrituras_masivas_se_fechan_por_clave(crear, monkeypatch):
+    # Upsert por clave natural, UPDATE executemany por clave primaria,
+    # query.update por id y borrados masivos: sólo esas filas se refechan
+    monkeypatch.setattr(delta_util, 'MARGEN_SEGUNDOS', 0)
+    with crear().app_context():
+        candidatos = db.session.query(Candidatos.id, Candidatos.region).order_by(Candidatos.id).limit(3).all()
+        partido = db.session.query(PartidosPoliticos.id_partido, PartidosPoliticos.siglas).first()
+        antes = dict(db.session.query(Candidatos.id, Candidatos.fecha_actualizacion))
+
+        insertar_en_lotes(PartidosPoliticos, [{'jne_id_simbolo': 987654, 'nombre_partido': 'Partido de prueba'}],
+                          clave='jne_id_simbolo')
+        db.session.execute(update(Candidatos), [{'id': candidatos[0].id, 'region': 'PRUEBA'}])
+        db.session.query(PartidosPoliticos).filter_by(id_partido=partido.id_partido).update(
+            {PartidosPoliticos.siglas: 'PRB'}, synchronize_session=False
+        )
+        registrar_eliminaciones(Candidatos, [candidatos[1].id])
+        db.session.flush()
+        time.sleep(0.01)
+        token = ahora_utc()
+        time.sleep(0.01)
+        db.session.commit()
+
+        try:
+            resultado = cambios_desde(token)
+            partidos = resultado['cambios']['partidos']
+            siglas = partidos['columnas'].index('siglas')
+            assert {fila[siglas] for fila in partidos['filas']} == {'PRB', None}
+            assert [fila[0] for fila in resultado['cambios']['candidatos']['filas']] == [candidatos[0].id]
+            assert resultado['eliminados']['candidatos'] == [str(candidatos[1].id)]
+            despues = dict(db.session.query(Candidatos.id, Candidatos.fecha_actualizacion))
+            assert {i for i in antes if antes[i] != despues[i]} == {candidatos[0].id}
+        finally:
+            db.session.query(PartidosPoliticos).filter_by(jne_id_simbolo=987654).delete()
+            db.session.query(PartidosPoliticos).filter_by(id_partido=partido.id_partido).update(
+                {PartidosPoliticos.siglas: partido.siglas}, synchronize_session=False
+            )
+            db.session.execute(update(Candidatos), [{'id': candidatos[0].id, 'region': candidatos[0].region}])
+            db.session.commit()
+
+
+def test_sin_escrituras_no_se_refecha(crear):
+    with crear().app_context():
+        antes = db.session.query(CentrosVotacion.fecha_actualizacion).order_by(CentrosVotacion.id_centro).all()
+        db.session.commit()
+        assert db.session.query(CentrosVotacion.fecha_actualizacion).order_by(CentrosVotacion.id_centro).all() == antes
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('2026-03-01T10:00:00.000000', '2026-03-01 10:00:00'),
+    ('2026-03-01T10:00:00Z', '2026-03-01 10:00:00'),
+    ('2026-03-01T10:00:00+00:00', '2026-03-01 10:00:00'),
+    ('2026-03-01T05:00:00-05:00', '2026-03-01 10:00:00'),
+])
+def test_leer_token_normaliza_a_utc(texto, esperado):
+    fecha = leer_token(texto)
+    assert fecha.tzinfo is None and str(fecha) == esperado
+
+
+@pytest.mark.parametrize('since, estado', [
+    ((ahora_utc() + timedelta(minutes=1)).isoformat() + 'Z', 200),
+    ('ayer', 400),
+])
+def test_api_sync_token(crear, since, estado):
+    assert crear().test_client().get('/api/sync', query_string={'since': since}).status_code == estado